@@ -15,8 +15,65 @@ SUPPORTED_VIDEO_TYPES = {
 }
 
 MODEL = 'Facenet512'
+EMBEDDING_SIZE = 512  # Dimension of MODEL embeddings
+EMBEDDING_DTYPE = 'float32'  # Precision of stored embeddings, 'float16' halves the size
 BACKEND = 'retinaface'
 DISTANCE_METRIC = 'cosine'
+MATCH_TOP_K = 30  # Max similar clients shown to a moderator (nearest first)
+
+# Clients keep a face per stored image and their centroid: centroids are searched with a wider threshold,
+# then at most CENTROID_CANDIDATES clients are re-ranked by their nearest face
+CENTROID_MARGIN = 1.2  # Multiplier of the MODEL threshold for centroids
+CENTROID_CANDIDATES = 100
+CLIENT_FACES_LIMIT = 20  # Faces stored per client, later images only move the centroid
+
+# Face inference runs out of the event loop: 'thread' or 'process' pool (every worker keeps its own models in memory)
+INFERENCE_EXECUTOR = 'thread'
+INFERENCE_WORKERS = 1
+INFERENCE_QUEUE_SIZE = 8  # Photos waiting for a worker, new ones are rejected with a "try later" message
+INFERENCE_BATCH_SIZE = 32  # Faces embedded by one forward pass in bulk recognition (find_faces_batch)
+DETECTOR_MAX_SIDE = 1280  # Photos are downscaled to this size for face detection, boxes are mapped back to the original
+IMAGE_BUFFERS_SIZE = 256 * 1024 * 1024  # Bytes of downloaded photos kept in memory (core.misc.image_buffers)
+
+# Locks of the FSM data and messages of a user: 'memory' - one bot process, 'redis' - several processes
+LOCKS_BACKEND = 'memory'
+REDIS_LOCK_TIMEOUT = 60  # Seconds, a redis lock of a crashed process expires
+
+# Roles of the users are cached in each bot process, changes made by the bot invalidate them at once.
+# ROLES_BROADCAST publishes invalidations to the other processes by redis pub/sub (several bot processes)
+ROLES_CACHE_TTL = 60  # Seconds, changes made in the db directly are seen after it
+ROLES_BROADCAST = False
+
+USERNAMES_FLUSH_INTERVAL = 60  # Seconds between writes of the changed usernames of moderators and admins
+
+CLIENT_PROFILE_CACHE_TTL = 30  # Seconds a loaded client profile (images, videos, visits, services) is reused
+
+# Database pool metrics (core.database.pool_metrics) are logged every POOL_METRICS_INTERVAL seconds,
+# a checkout waiting longer than POOL_SLOW_WAIT seconds is logged at once
+POOL_METRICS_INTERVAL = 5 * 60
+POOL_SLOW_WAIT = 0.5
+
+# Old menus and galleries are deleted in the background (core.message_ref.message_cleaner) by deleteMessages per chat
+CLEANUP_RETRIES = 5  # Attempts of a failed request (network and server errors, flood control)
+CLEANUP_BACKOFF = 1  # Seconds before the first retry, doubled on every next one
+
+# Faces found on a photo are cached in redis by telegram file_unique_id and by the hash of the pixels,
+# resent photos skip the inference. Expired keys are evicted first (redis maxmemory-policy volatile-lru)
+FACE_CACHE_TTL = 7 * 24 * 60 * 60  # Seconds since the last use
+
+READY_FILE = MEDIA_DIR / 'ready'  # Exists while models are warm and the bot is polling (health check)
+
+# Where faces are matched: 'index' - in the embedding index below,
+# 'pgvector' - in postgres (needs the vector extension and its migration)
+FACE_STORAGE = 'index'
+
+# Embedding index: 'exact' - brute-force scan, 'ivf' - approximate search for large databases
+INDEX_BACKEND = 'exact'
+INDEX_PATH = MEDIA_DIR / 'embedding_index.npz'
+
+IVF_NLIST = 1024  # Number of clusters
+IVF_NPROBE = 16  # Clusters scanned per query (more - better recall, slower search)
+IVF_TOP_K = 64  # Candidates re-ranked exactly by DISTANCE_METRIC
 
 if not MEDIA_DIR.exists():
 	MEDIA_DIR.mkdir()
@@ -1 +1,2 @@
 from .main import engine, session_maker
+from .pool import pool_metrics
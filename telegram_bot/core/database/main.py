@@ -1,6 +1,30 @@
+from uuid import uuid4
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from core.env import PostgresKeys
+from .pool import InstrumentedPool
+
+# Prepared statements cached per connection by the sqlalchemy dialect and by asyncpg itself
+connect_args = {
+	'prepared_statement_cache_size': PostgresKeys.STATEMENT_CACHE_SIZE,
+	'statement_cache_size': PostgresKeys.STATEMENT_CACHE_SIZE,
+}
+if not PostgresKeys.PREPARED_STATEMENTS:
+	# Statements aren't reused, unique names don't clash on server connections shared by pgbouncer
+	connect_args = {
+		'prepared_statement_cache_size': 0,
+		'statement_cache_size': 0,
+		'prepared_statement_name_func': lambda: f'__asyncpg_{uuid4()}__',
+	}
 
-engine = create_async_engine(PostgresKeys.URL)
+engine = create_async_engine(
+	PostgresKeys.URL,
+	poolclass=InstrumentedPool,
+	pool_size=PostgresKeys.POOL_SIZE,
+	max_overflow=PostgresKeys.MAX_OVERFLOW,
+	pool_timeout=PostgresKeys.POOL_TIMEOUT,
+	pool_pre_ping=PostgresKeys.POOL_PRE_PING,
+	connect_args=connect_args,
+)
 session_maker: async_sessionmaker[AsyncSession] = async_sessionmaker(bind=engine, expire_on_commit=False)
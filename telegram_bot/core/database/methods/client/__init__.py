@@ -1,3 +1,4 @@
-from .get import get_all_clients, get_client, get_client_by_phone, load_clients_profile_images, client_have_visit
-from .create import create_client
+from .get import get_all_clients, get_all_clients_id, get_clients_face_count, get_all_face_centroids, get_clients_faces, find_similar_clients, get_client, get_clients, get_client_by_phone, get_clients_profile_paths, client_have_visit, get_client_profile
+from .create import create_client, create_clients
+from .update import add_client_face
 from .delete import delete_client
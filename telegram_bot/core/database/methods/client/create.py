@@ -1,20 +1,143 @@
-from pathlib import Path
+from datetime import datetime
+from itertools import chain
 
+import numpy as np
+from sqlalchemy import insert
+
+from core.config import CLIENT_FACES_LIMIT, FACE_STORAGE, MEDIA_DIR
 from core.database import session_maker
-from core.database.methods.image import create_image_from_path
-from core.database.models import Client
+from core.database.methods.image import create_image
+from core.database.models import Client, FaceEmbedding, Image, Service, Visit
+from core.embeddings import embedding_index, face_gallery
+from core.image_hosting.utils import store_image
 
 
-async def create_client(temp_face_image_path: str | Path, face_encoding: dict) -> Client:
-	""" Create a new client with the provided image path and encoding """
+async def create_client(image: bytes, face_encoding: dict, base_name: str) -> Client:
+	""" Create a new client with the downloaded profile image and encoding """
 
-	profile_photo = await create_image_from_path(temp_face_image_path)
+	profile_photo = await create_image(image, base_name)
 
 	async with session_maker() as session:
-		client = Client(face_encoding=face_encoding, profile_picture=profile_photo)
+		client = Client(face_encoding=face_encoding, profile_picture=profile_photo,
+		                face_centroid=face_encoding['embedding'], face_count=1)
+		client.faces.append(FaceEmbedding(image_id=profile_photo.id, embedding=face_encoding['embedding']))
+		if FACE_STORAGE == 'pgvector':
+			client.face_vector = face_encoding['embedding']
 
 		session.add(client)
 		await session.commit()
 
 		await session.refresh(client)
-		return client
+
+	if embedding_index.loaded:
+		embedding_index.add(client.id, face_encoding['embedding'], client.face_count)
+
+	return client
+
+
+async def create_clients(entries: list[dict]) -> list[int]:
+	"""
+		Create clients with a profile image, a visit and its service in one transaction (bulk import).
+		Every table gets one multi-row INSERT ... RETURNING instead of a session and refreshes per row.
+		:param entries: dicts with image_path, face_encoding, location_id, date, service_title
+		                and optional images - other photos of the client, added to the visit,
+		                with faces - face encodings on these photos (None if unknown), added to the client faces.
+		:return: ids of the created clients in order of entries.
+	"""
+
+	if not entries:
+		return []
+
+	for entry in entries:
+		if entry.get('faces') is not None and len(entry['faces']) != len(entry.get('images', ())):
+			raise ValueError(f'{len(entry["faces"])} faces are given for {len(entry.get("images", ()))} images of {entry["image_path"]}')
+
+	image_paths = [store_image(entry['image_path'], MEDIA_DIR) for entry in entries]
+	visit_images = [[store_image(path, MEDIA_DIR) for path in entry.get('images', ())] for entry in entries]
+
+	try:
+		async with session_maker() as session, session.begin():
+			images_id = await session.scalars(
+				insert(Image).returning(Image.id, sort_by_parameter_order=True),
+				[{'path': str(path.absolute()), 'url': None, 'hosting_data': {}} for path in image_paths]
+			)
+
+			images_id = images_id.all()
+			centroids = [_client_centroid(entry) for entry in entries]
+
+			clients = []
+			for entry, image_id, (centroid, face_count) in zip(entries, images_id, centroids):
+				client = Client.face_columns(entry['face_encoding'])
+				client.update(profile_picture_id=image_id, face_centroid=centroid, face_count=face_count)
+				if FACE_STORAGE == 'pgvector':
+					client['face_vector'] = centroid
+
+				clients.append(client)
+
+			clients_id = (await session.scalars(
+				insert(Client).returning(Client.id, sort_by_parameter_order=True), clients
+			)).all()
+
+			visits_id = await session.scalars(
+				insert(Visit).returning(Visit.id, sort_by_parameter_order=True),
+				[{'client_id': client_id, 'location_id': entry['location_id'], 'date': entry['date']}
+				 for entry, client_id in zip(entries, clients_id)]
+			)
+
+			visits_id = visits_id.all()
+
+			now = datetime.utcnow()
+			await session.execute(
+				insert(Service),
+				[{'visit_id': visit_id, 'title': entry['service_title'], 'date': now}
+				 for entry, visit_id in zip(entries, visits_id)]
+			)
+
+			images = [{'path': str(path.absolute()), 'url': None, 'hosting_data': {}, 'visit_id': visit_id}
+			          for paths, visit_id in zip(visit_images, visits_id) for path in paths]
+			visit_images_id = (await session.scalars(
+				insert(Image).returning(Image.id, sort_by_parameter_order=True), images
+			)).all() if images else []
+
+			if len(visit_images_id) != len(images):
+				raise ValueError(f'{len(visit_images_id)} ids are returned for {len(images)} visit images')
+
+			faces = []
+			start = 0
+			for entry, client_id, image_id, paths in zip(entries, clients_id, images_id, visit_images):
+				# Ids of the visit images of the entry are in order of its images (sort_by_parameter_order)
+				entry_images_id = visit_images_id[start:start + len(paths)]
+				start += len(paths)
+
+				extra_faces = entry.get('faces') or [None] * len(paths)
+				client_faces = [(image_id, entry['face_encoding']), *zip(entry_images_id, extra_faces, strict=True)]
+
+				faces += [{'client_id': client_id, 'image_id': face_image_id, 'embedding': face['embedding']}
+				          for face_image_id, face in client_faces if face is not None][:CLIENT_FACES_LIMIT]
+
+			await session.execute(insert(FaceEmbedding), faces)
+	except Exception:
+		for path in chain(image_paths, *visit_images):
+			path.unlink(missing_ok=True)
+
+		raise
+
+	if embedding_index.loaded:
+		for entry, client_id, (centroid, face_count) in zip(entries, clients_id, centroids):
+			embedding_index.add(client_id, centroid, face_count)
+			face_gallery.set(client_id, [face['embedding'] for face in _client_faces(entry)][:CLIENT_FACES_LIMIT])
+
+	return clients_id
+
+
+def _client_faces(entry: dict) -> list[dict]:
+	""" Known faces of the client entry of create_clients: the profile face first """
+
+	return [entry['face_encoding'], *(face for face in entry.get('faces') or () if face is not None)]
+
+
+def _client_centroid(entry: dict) -> tuple[np.ndarray, int]:
+	""" Returns the centroid of the faces of the client entry and their number """
+
+	embeddings = np.asarray([face['embedding'] for face in _client_faces(entry)], dtype=np.float32)
+	return embeddings.reshape(len(embeddings), -1).mean(axis=0), len(embeddings)
@@ -2,7 +2,9 @@ from sqlalchemy import delete
 
 from core.database import session_maker
 from core.database.models import Client
+from core.embeddings import embedding_index, face_gallery
 from core.misc.adapters import str2int
+from core.misc.client_profiles import client_profiles
 
 
 async def delete_client(client_id: str | int) -> Client:
@@ -14,3 +16,7 @@ async def delete_client(client_id: str | int) -> Client:
 		query = delete(Client).where(Client.id == client_id)
 		await session.execute(query)
 		await session.commit()
+
+	embedding_index.remove(client_id)
+	face_gallery.remove(client_id)
+	client_profiles.invalidate(client_id)
@@ -1,11 +1,16 @@
+import math
+
+import numpy as np
 import phonenumbers
 from phonenumbers import PhoneNumber
 from sqlalchemy import select, exists
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, load_only, selectinload
 
+from core.config import DISTANCE_METRIC, MATCH_TOP_K
 from core.database import session_maker
-from core.database.models import Client, Visit
+from core.database.models import Client, FaceEmbedding, Image, Visit
 from core.misc.adapters import str2int
+from core.misc.client_profiles import ClientProfile, client_profiles
 
 
 async def get_all_clients() -> list[Client]:
@@ -15,6 +20,92 @@ async def get_all_clients() -> list[Client]:
 		return result.all()
 
 
+async def get_all_clients_id() -> list[int]:
+	async with session_maker() as session:
+		query = select(Client.id)
+		result = await session.scalars(query)
+		return result.all()
+
+
+async def get_clients_face_count() -> list[tuple[int, int]]:
+	""" Returns (client_id, face_count) of all clients: the face_count is the version of the client centroid """
+
+	async with session_maker() as session:
+		query = select(Client.id, Client.face_count)
+		result = await session.execute(query)
+		return result.tuples().all()
+
+
+async def get_all_face_centroids(clients_id: list[int] = None) -> list[tuple[int, np.ndarray, int]]:
+	""" Returns (client_id, face_centroid, face_count) of all (or given) clients without loading relationships """
+
+	async with session_maker() as session:
+		query = select(Client.id, Client.face_centroid, Client.face_count)
+		if clients_id is not None:
+			query = query.where(Client.id.in_(clients_id))
+
+		result = await session.execute(query)
+		return result.tuples().all()
+
+
+async def get_clients_faces(clients_id: list[int] = None) -> list[tuple[int, np.ndarray]]:
+	""" Returns (client_id, embedding) of every face of all (or given) clients with several faces """
+
+	async with session_maker() as session:
+		query = (select(FaceEmbedding.client_id, FaceEmbedding.embedding)
+		         .join(Client, Client.id == FaceEmbedding.client_id)
+		         .where(Client.face_count > 1))
+		if clients_id is not None:
+			query = query.where(FaceEmbedding.client_id.in_(clients_id))
+
+		result = await session.execute(query)
+		return result.tuples().all()
+
+
+async def find_similar_clients(embedding: list[float], threshold: float,
+                               distance_metric: str = DISTANCE_METRIC, limit: int = MATCH_TOP_K) -> list[tuple[int, float]]:
+	""" Returns (client_id, distance) of the nearest face centroids closer than threshold (pgvector storage) """
+
+	match distance_metric:
+		case 'cosine':
+			distance = Client.face_vector.cosine_distance(embedding)
+		case 'euclidean_l2':
+			# Distance between normalized vectors is sqrt(2 * cosine distance), the same order uses the cosine index
+			distance = Client.face_vector.cosine_distance(embedding)
+			threshold = threshold ** 2 / 2
+		case 'euclidean':
+			distance = Client.face_vector.l2_distance(embedding)
+		case _:
+			raise ValueError("Invalid distance_metric passed - ", distance_metric)
+
+	async with session_maker() as session:
+		query = (select(Client.id, distance.label('distance'))
+		         .where(distance < threshold)
+		         .order_by(distance)
+		         .limit(limit))
+
+		result = await session.execute(query)
+		similar = result.tuples().all()
+
+	if distance_metric == 'euclidean_l2':
+		return [(client_id, math.sqrt(2 * distance)) for client_id, distance in similar]
+
+	return similar
+
+
+async def get_clients(clients_id: list[int | str]) -> list[Client]:
+	""" Returns clients by ids in the same order (missing clients are skipped) """
+
+	clients_id = list(str2int(*clients_id))
+
+	async with session_maker() as session:
+		query = select(Client).where(Client.id.in_(clients_id))
+		result = await session.scalars(query)
+		clients = {client.id: client for client in result.all()}
+
+	return [clients[client_id] for client_id in clients_id if client_id in clients]
+
+
 async def get_client(client_id: int | str, with_profile_image=False) -> Client | None:
 	client_id, = str2int(client_id)
 
@@ -40,15 +131,15 @@ async def get_client_by_phone(phone_number: PhoneNumber, with_profile_image=Fals
 		return await session.scalar(query)
 
 
-async def load_clients_profile_images(clients: list[Client]) -> list[Client]:
-	""" Returns a list of clients with profile image """
-
-	clients_id = [client.id for client in clients]
+async def get_clients_profile_paths(clients_id: list[int]) -> dict[int, str]:
+	""" Returns paths of the profile pictures by client ids (clients without a profile picture are skipped) """
 
 	async with session_maker() as session:
-		query = select(Client).where(Client.id.in_(clients_id)).options(joinedload(Client.profile_picture))
-		result = await session.scalars(query)
-		return result.all()
+		query = (select(Client.id, Image.path)
+		         .join(Image, Image.id == Client.profile_picture_id)
+		         .where(Client.id.in_(clients_id)))
+		result = await session.execute(query)
+		return dict(result.tuples().all())
 
 
 async def client_have_visit(client_id: int | str) -> bool:
@@ -57,3 +148,48 @@ async def client_have_visit(client_id: int | str) -> bool:
 	async with session_maker() as session:
 		query = exists(Client.visits).where(Client.id == client_id).select()
 		return await session.scalar(query)
+
+
+async def get_client_profile(client_id: int | str) -> ClientProfile | None:
+	"""
+		Returns images, videos, visits with locations and services of the client (None if it doesn't exist).
+		Everything is loaded by one session with a fixed number of queries and cached for CLIENT_PROFILE_CACHE_TTL.
+	"""
+
+	client_id, = str2int(client_id)
+
+	profile = client_profiles.get(client_id)
+	if profile is not None:
+		return profile
+
+	generation = client_profiles.generation
+
+	async with session_maker() as session:
+		query = (select(Client)
+		         .where(Client.id == client_id)
+		         .options(load_only(Client.id, Client.profile_picture_id),
+		                  selectinload(Client.visits).options(
+			                  joinedload(Visit.location),
+			                  selectinload(Visit.images),
+			                  selectinload(Visit.videos),
+			                  selectinload(Visit.services)
+		                  )))
+		client = await session.scalar(query)
+
+	if client is None:
+		return None
+
+	images = {} if client.profile_picture is None else {client.profile_picture.id: client.profile_picture}
+	for visit in client.visits:
+		images.update((image.id, image) for image in visit.images)
+
+	profile = ClientProfile(
+		client_id,
+		images=list(images.values()),
+		videos=[video for visit in client.visits for video in visit.videos],
+		visits=list(client.visits),
+		services=[service for visit in client.visits for service in visit.services]
+	)
+
+	client_profiles.set(profile, generation)
+	return profile
@@ -0,0 +1,43 @@
+import numpy as np
+from sqlalchemy import func, insert, select, update
+
+from core.config import CLIENT_FACES_LIMIT, FACE_STORAGE
+from core.database import session_maker
+from core.database.models import Client, FaceEmbedding
+from core.misc.adapters import str2int
+
+
+async def add_client_face(client_id: int | str, embedding: list[float], image_id: int | str = None) -> tuple[np.ndarray, int, list[np.ndarray]] | None:
+	"""
+		Add a face of the client found on the image and move the client centroid to it.
+		The face itself is stored only while the client has less than CLIENT_FACES_LIMIT faces.
+		:return: the new centroid, the number of its faces and all stored faces of the client, None if the client doesn't exist.
+	"""
+
+	client_id, = str2int(client_id)
+	if image_id is not None:
+		image_id, = str2int(image_id)
+
+	async with session_maker() as session, session.begin():
+		query = select(Client.face_centroid, Client.face_count).where(Client.id == client_id).with_for_update()
+		client = (await session.execute(query)).first()
+		if client is None:
+			return None
+
+		# Running mean of the faces
+		face_count = client.face_count + 1
+		centroid = np.asarray(client.face_centroid, dtype=np.float64)
+		centroid = (centroid + (np.asarray(embedding, dtype=np.float64).reshape(-1) - centroid) / face_count).astype(np.float32)
+
+		values = {'face_centroid': centroid, 'face_count': face_count}
+		if FACE_STORAGE == 'pgvector':
+			values['face_vector'] = centroid
+
+		await session.execute(update(Client).where(Client.id == client_id).values(**values))
+
+		stored = await session.scalar(select(func.count(FaceEmbedding.id)).where(FaceEmbedding.client_id == client_id))
+		if stored < CLIENT_FACES_LIMIT:
+			await session.execute(insert(FaceEmbedding).values(client_id=client_id, image_id=image_id, embedding=embedding))
+
+		faces = await session.scalars(select(FaceEmbedding.embedding).where(FaceEmbedding.client_id == client_id))
+		return centroid, face_count, faces.all()
@@ -1,3 +1,3 @@
 from .get import get_image_by_id, get_client_images
-from .create import create_image_from_path
+from .create import create_image, create_image_from_path
 from .update import set_visit2image
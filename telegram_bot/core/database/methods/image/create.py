@@ -3,8 +3,9 @@ from pathlib import Path
 from core.config import MEDIA_DIR
 from core.database import session_maker
 from core.database.models import Image
-from core.image_hosting.utils import store_image
+from core.image_hosting.utils import store_image, store_image_bytes
 from core.misc.adapters import str2int
+from core.misc.client_profiles import client_profiles
 
 
 async def create_image_from_path(path: str | Path, visit_id: int | str = None) -> Image:
@@ -19,6 +20,18 @@ async def create_image_from_path(path: str | Path, visit_id: int | str = None) -
 	new_path = store_image(path, MEDIA_DIR)
 	data = {}
 
+	return await _create_image(new_path, visit_id, data)
+
+
+async def create_image(data: bytes, base_name: str, visit_id: int | str = None) -> Image:
+	""" Write the downloaded image to media dir and create an image entry """
+
+	new_path = store_image_bytes(data, MEDIA_DIR, base_name[-5:])
+	return await _create_image(new_path, visit_id)
+
+
+async def _create_image(new_path: Path, visit_id: int | str = None, data: dict = None) -> Image:
+	data = data or {}
 	url = data.get('url')
 
 	async with session_maker() as session:
@@ -32,4 +45,8 @@ async def create_image_from_path(path: str | Path, visit_id: int | str = None) -
 		await session.commit()
 
 		await session.refresh(image)
-		return image
+
+	if image.visit_id is not None:
+		client_profiles.invalidate_visit(image.visit_id)
+
+	return image
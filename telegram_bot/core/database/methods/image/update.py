@@ -3,6 +3,7 @@ from sqlalchemy import update
 from core.database import session_maker
 from core.database.models import Image
 from core.misc.adapters import str2int
+from core.misc.client_profiles import client_profiles
 
 
 async def set_visit2image(image_id: int | str, visit_id: int | str):
@@ -14,3 +15,5 @@ async def set_visit2image(image_id: int | str, visit_id: int | str):
 		query = update(Image).where(Image.id == image_id).values(visit_id=visit_id)
 		await session.execute(query)
 		await session.commit()
+
+	client_profiles.invalidate_visit(visit_id)
@@ -3,6 +3,7 @@ from datetime import datetime
 from core.database import session_maker
 from core.database.models import Service
 from core.misc.adapters import str2int
+from core.misc.client_profiles import client_profiles
 
 
 async def create_visit_service(visit_id: int | str, title: str) -> Service:
@@ -17,4 +18,5 @@ async def create_visit_service(visit_id: int | str, title: str) -> Service:
 		await session.commit()
 		await session.refresh(service)
 
-		return service
+	client_profiles.invalidate_visit(visit_id)
+	return service
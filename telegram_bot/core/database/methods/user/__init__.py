@@ -1,4 +1,4 @@
-from .check import check_if_admin, check_if_moderator, check_if_moderator_or_admin
+from .check import check_if_admin, check_if_moderator, check_if_moderator_or_admin, get_roles
 from .get import get_all_moderators, get_moderator, get_moderator_with_location, get_tg_user_location
 from .create import create_or_set_moderator
-from .update import change_location, delete_moderator, update_username
+from .update import change_location, delete_moderator, update_username, update_usernames
@@ -1,31 +1,38 @@
-from sqlalchemy import and_, exists, or_
+from sqlalchemy import select
 
 from core.database import session_maker
 from core.database.models import User
+from core.misc.adapters import str2int
+from core.misc.roles_cache import Roles, roles_cache
 
 
-async def check_if_moderator(telegram_id: int) -> bool:
+async def get_roles(telegram_id: int | str) -> Roles:
+	""" Roles of the telegram user, the db is queried only when they aren't cached """
+
+	telegram_id, = str2int(telegram_id)
+
+	roles = roles_cache.get(telegram_id)
+	if roles is not None:
+		return roles
+
+	generation = roles_cache.generation
 	async with session_maker() as session:
-		query = exists(User).where(and_(
-			User.is_moderator,
-			User.telegram_id == telegram_id
-		)).select()
-		return await session.scalar(query)
+		query = select(User.is_admin, User.is_moderator).where(User.telegram_id == telegram_id)
+		user = (await session.execute(query)).first()
+
+	roles = Roles(bool(user.is_admin), bool(user.is_moderator)) if user is not None else Roles()
+	roles_cache.set(telegram_id, roles, generation)
+	return roles
+
+
+async def check_if_moderator(telegram_id: int) -> bool:
+	return (await get_roles(telegram_id)).is_moderator
 
 
 async def check_if_admin(telegram_id: int) -> bool:
-	async with session_maker() as session:
-		query = exists(User).where(and_(
-			User.is_admin,
-			User.telegram_id == telegram_id
-		)).select()
-		return await session.scalar(query)
+	return (await get_roles(telegram_id)).is_admin
 
 
 async def check_if_moderator_or_admin(telegram_id: int) -> bool:
-	async with session_maker() as session:
-		query = exists(User).where(and_(
-			or_(User.is_moderator, User.is_admin),
-			User.telegram_id == telegram_id
-		)).select()
-		return await session.scalar(query)
+	roles = await get_roles(telegram_id)
+	return roles.is_moderator or roles.is_admin
@@ -2,6 +2,7 @@ from sqlalchemy import select
 
 from core.database import session_maker
 from core.database.models import User
+from core.misc.roles_cache import roles_cache
 
 
 async def create_or_set_moderator(telegram_id: int, location_id: int) -> bool:
@@ -21,11 +22,13 @@ async def create_or_set_moderator(telegram_id: int, location_id: int) -> bool:
 			user.is_moderator = True
 			user.location_id = location_id
 			await session.commit()
+			await roles_cache.invalidate(telegram_id)
 
 			return True
 
 		user = User(telegram_id=telegram_id, is_moderator=True, location_id=location_id)
 		session.add(user)
 		await session.commit()
+		await roles_cache.invalidate(telegram_id)
 
 		return True
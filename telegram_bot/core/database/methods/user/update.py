@@ -1,8 +1,9 @@
-from sqlalchemy import update
+from sqlalchemy import bindparam, update
 
 from core.database import session_maker
 from core.database.models import User
 from core.misc.adapters import str2int
+from core.misc.roles_cache import roles_cache
 
 
 async def update_username(telegram_id: int | str, username: str) -> None:
@@ -16,6 +17,22 @@ async def update_username(telegram_id: int | str, username: str) -> None:
 		await session.commit()
 
 
+async def update_usernames(usernames: dict[int, str | None]) -> None:
+	""" Update usernames of several users by telegram_id in one transaction """
+
+	if not usernames:
+		return
+
+	table = User.__table__
+	query = update(table).where(table.c.telegram_id == bindparam('b_telegram_id')).values(username=bindparam('b_username'))
+
+	async with session_maker() as session:
+		await session.execute(query, [
+			{'b_telegram_id': telegram_id, 'b_username': username} for telegram_id, username in usernames.items()
+		])
+		await session.commit()
+
+
 async def delete_moderator(telegram_id: int = 0) -> None:
 	""" Set is_moderator to False """
 
@@ -26,6 +43,8 @@ async def delete_moderator(telegram_id: int = 0) -> None:
 		await session.execute(query)
 		await session.commit()
 
+	await roles_cache.invalidate(telegram_id)
+
 
 async def change_location(telegram_id: int | str, location_id: int | str) -> None:
 	""" Set new location_id """
@@ -36,3 +55,5 @@ async def change_location(telegram_id: int | str, location_id: int | str) -> Non
 		query = update(User).where(User.telegram_id == telegram_id).values(location_id=location_id)
 		await session.execute(query)
 		await session.commit()
+
+	await roles_cache.invalidate(telegram_id)
@@ -3,6 +3,7 @@ from pathlib import Path
 from core.database import session_maker
 from core.database.models import Video
 from core.misc.adapters import str2int
+from core.misc.client_profiles import client_profiles
 
 
 async def create_video_from_path(path: str | Path, visit_id: int | str) -> Video:
@@ -23,4 +24,5 @@ async def create_video_from_path(path: str | Path, visit_id: int | str) -> Video
 		# # Send video to yandex cloud in another thread
 		# _ = asyncio.create_task(_send_video2cloud(video.id, path))
 
-		return video
+	client_profiles.invalidate_visit(visit_id)
+	return video
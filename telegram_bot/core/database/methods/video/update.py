@@ -3,6 +3,7 @@ from sqlalchemy import update
 from core.database import session_maker
 from core.database.models import Video
 from core.misc.adapters import str2int
+from core.misc.client_profiles import client_profiles
 
 
 async def update_video_fields(video_id: str | int, **kwargs):
@@ -20,6 +21,9 @@ async def update_video_fields(video_id: str | int, **kwargs):
 		return
 
 	async with session_maker() as session:
-		query = update(Video).where(Video.id == video_id).values(**values)
-		await session.execute(query)
+		query = update(Video).where(Video.id == video_id).values(**values).returning(Video.visit_id)
+		visit_id = await session.scalar(query)
 		await session.commit()
+
+	if visit_id is not None:
+		client_profiles.invalidate_visit(visit_id)
@@ -3,6 +3,7 @@ from datetime import datetime
 from core.database import session_maker
 from core.database.models import Visit
 from core.misc.adapters import str2int
+from core.misc.client_profiles import client_profiles
 
 
 async def create_visit(client_id: int | str, location_id: int | str) -> Visit:
@@ -17,4 +18,6 @@ async def create_visit(client_id: int | str, location_id: int | str) -> Visit:
 		await session.commit()
 
 		await session.refresh(visit)
-		return visit
+
+	client_profiles.invalidate(client_id)
+	return visit
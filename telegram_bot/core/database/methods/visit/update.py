@@ -5,6 +5,7 @@ from sqlalchemy import update
 from core.database import session_maker
 from core.database.models import Visit
 from core.misc.adapters import str2int
+from core.misc.client_profiles import client_profiles
 
 
 async def update_visit_name(visit_id: int | str, name: str) -> None:
@@ -15,6 +16,8 @@ async def update_visit_name(visit_id: int | str, name: str) -> None:
 		await session.execute(query)
 		await session.commit()
 
+	client_profiles.invalidate_visit(visit_id)
+
 
 async def update_visit_social_media(visit_id: int | str, social_media: str) -> None:
 	visit_id, = str2int(visit_id)
@@ -24,6 +27,8 @@ async def update_visit_social_media(visit_id: int | str, social_media: str) -> N
 		await session.execute(query)
 		await session.commit()
 
+	client_profiles.invalidate_visit(visit_id)
+
 
 async def update_visit_phone_number(visit_id: int | str, phone_number: PhoneNumber) -> None:
 	visit_id, = str2int(visit_id)
@@ -34,3 +39,5 @@ async def update_visit_phone_number(visit_id: int | str, phone_number: PhoneNumb
 
 		await session.execute(query)
 		await session.commit()
+
+	client_profiles.invalidate_visit(visit_id)
@@ -0,0 +1,118 @@
+"""binary face embedding
+
+Revision ID: 424dfd882c29
+Revises: bab29725a16c
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+from typing import Iterator
+
+from core.embeddings.codec import decode_embedding, encode_embedding
+
+
+# revision identifiers, used by Alembic.
+revision = '424dfd882c29'
+down_revision = 'bab29725a16c'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+clients = sa.table(
+	'clients',
+	sa.column('id', sa.Integer),
+	sa.column('face_encoding', sa.JSON),
+	sa.column('face_embedding', sa.LargeBinary),
+	sa.column('face_x', sa.Integer),
+	sa.column('face_y', sa.Integer),
+	sa.column('face_w', sa.Integer),
+	sa.column('face_h', sa.Integer),
+	sa.column('face_confidence', sa.Float),
+)
+
+
+def iter_batches(columns: list) -> Iterator[list]:
+	""" Yields rows of clients ordered by id in batches (keyset pagination) """
+
+	connection = op.get_bind()
+	last_id = 0
+
+	while True:
+		query = (sa.select(clients.c.id, *columns)
+		         .where(clients.c.id > last_id)
+		         .order_by(clients.c.id)
+		         .limit(BATCH_SIZE))
+		rows = connection.execute(query).all()
+		if not rows:
+			return
+
+		yield rows
+		last_id = rows[-1].id
+
+
+def upgrade() -> None:
+	op.add_column('clients', sa.Column('face_embedding', sa.LargeBinary(), nullable=True))
+	op.add_column('clients', sa.Column('face_x', sa.Integer(), nullable=True))
+	op.add_column('clients', sa.Column('face_y', sa.Integer(), nullable=True))
+	op.add_column('clients', sa.Column('face_w', sa.Integer(), nullable=True))
+	op.add_column('clients', sa.Column('face_h', sa.Integer(), nullable=True))
+	op.add_column('clients', sa.Column('face_confidence', sa.Float(), nullable=True))
+
+	connection = op.get_bind()
+	update = (clients.update()
+	          .where(clients.c.id == sa.bindparam('_id'))
+	          .values(face_embedding=sa.bindparam('face_embedding'),
+	                  face_x=sa.bindparam('face_x'), face_y=sa.bindparam('face_y'),
+	                  face_w=sa.bindparam('face_w'), face_h=sa.bindparam('face_h'),
+	                  face_confidence=sa.bindparam('face_confidence')))
+
+	for rows in iter_batches([clients.c.face_encoding]):
+		params = []
+		for row in rows:
+			facial_area = row.face_encoding.get('facial_area') or {}
+			params.append({
+				'_id': row.id,
+				'face_embedding': encode_embedding(row.face_encoding['embedding']),
+				'face_x': facial_area.get('x'),
+				'face_y': facial_area.get('y'),
+				'face_w': facial_area.get('w'),
+				'face_h': facial_area.get('h'),
+				'face_confidence': row.face_encoding.get('face_confidence'),
+			})
+
+		connection.execute(update, params)
+
+	op.alter_column('clients', 'face_embedding', nullable=False)
+	op.drop_column('clients', 'face_encoding')
+
+
+def downgrade() -> None:
+	op.add_column('clients', sa.Column('face_encoding', sa.JSON(), nullable=True))
+
+	connection = op.get_bind()
+	update = (clients.update()
+	          .where(clients.c.id == sa.bindparam('_id'))
+	          .values(face_encoding=sa.bindparam('face_encoding')))
+
+	columns = [clients.c.face_embedding, clients.c.face_x, clients.c.face_y,
+	           clients.c.face_w, clients.c.face_h, clients.c.face_confidence]
+	for rows in iter_batches(columns):
+		connection.execute(update, [{
+			'_id': row.id,
+			'face_encoding': {
+				'embedding': decode_embedding(row.face_embedding).astype(float).tolist(),
+				'facial_area': {'x': row.face_x, 'y': row.face_y, 'w': row.face_w, 'h': row.face_h},
+				'face_confidence': row.face_confidence,
+			},
+		} for row in rows])
+
+	op.alter_column('clients', 'face_encoding', nullable=False)
+	op.drop_column('clients', 'face_confidence')
+	op.drop_column('clients', 'face_h')
+	op.drop_column('clients', 'face_w')
+	op.drop_column('clients', 'face_y')
+	op.drop_column('clients', 'face_x')
+	op.drop_column('clients', 'face_embedding')
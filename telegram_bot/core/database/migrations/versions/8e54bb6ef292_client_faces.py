@@ -0,0 +1,48 @@
+"""client faces
+
+Revision ID: 8e54bb6ef292
+Revises: 424dfd882c29
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = '8e54bb6ef292'
+down_revision = '424dfd882c29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.create_table('face_embeddings',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('client_id', sa.Integer(), nullable=False),
+		sa.Column('image_id', sa.Integer(), nullable=True),
+		sa.Column('embedding', sa.LargeBinary(), nullable=False),
+		sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+		sa.ForeignKeyConstraint(['image_id'], ['images.id'], ondelete='SET NULL'),
+		sa.PrimaryKeyConstraint('id')
+	)
+	op.create_index(op.f('ix_face_embeddings_client_id'), 'face_embeddings', ['client_id'], unique=False)
+
+	op.add_column('clients', sa.Column('face_centroid', sa.LargeBinary(), nullable=True))
+	op.add_column('clients', sa.Column('face_count', sa.Integer(), server_default='1', nullable=False))
+
+	# Every client has one face so far: the profile one is its centroid
+	op.execute('INSERT INTO face_embeddings (client_id, image_id, embedding) '
+	           'SELECT id, profile_picture_id, face_embedding FROM clients ORDER BY id')
+	op.execute('UPDATE clients SET face_centroid = face_embedding')
+
+	op.alter_column('clients', 'face_centroid', nullable=False)
+
+
+def downgrade() -> None:
+	op.drop_column('clients', 'face_count')
+	op.drop_column('clients', 'face_centroid')
+
+	op.drop_index(op.f('ix_face_embeddings_client_id'), table_name='face_embeddings')
+	op.drop_table('face_embeddings')
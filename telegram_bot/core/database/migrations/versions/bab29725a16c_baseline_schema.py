@@ -0,0 +1,106 @@
+"""baseline schema
+
+Revision ID: bab29725a16c
+Revises: 
+Create Date: 2026-10-18 11:00:00.000000
+
+The schema the bot created before migrations were added. It is the root of the core branch: on an empty database
+`alembic upgrade core@head` creates everything.
+A database that already has these tables (created by the bot, or migrated by revisions of its own that aren't
+in this repository) must not run this revision, mark it as applied instead and upgrade from there:
+
+	alembic stamp --purge bab29725a16c
+	alembic upgrade core@head
+
+--purge drops the unknown revisions from alembic_version. Check first that the tables match this revision.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+
+# revision identifiers, used by Alembic.
+revision = 'bab29725a16c'
+down_revision = None
+branch_labels = ('core',)
+depends_on = None
+
+
+def upgrade() -> None:
+	op.create_table('locations',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('address', sa.String(length=255), nullable=True),
+		sa.PrimaryKeyConstraint('id')
+	)
+	# clients.profile_picture_id refers to images, whose visits refer to clients: its foreign key is added at the end
+	op.create_table('clients',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('profile_picture_id', sa.Integer(), nullable=True),
+		sa.Column('face_encoding', sa.JSON(), nullable=False),
+		sa.PrimaryKeyConstraint('id')
+	)
+	op.create_table('users',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+		sa.Column('username', sa.String(length=255), nullable=True),
+		sa.Column('is_moderator', sa.Boolean(), nullable=True),
+		sa.Column('is_admin', sa.Boolean(), nullable=True),
+		sa.Column('location_id', sa.Integer(), nullable=False),
+		sa.ForeignKeyConstraint(['location_id'], ['locations.id']),
+		sa.PrimaryKeyConstraint('id'),
+		sa.UniqueConstraint('telegram_id')
+	)
+	op.create_table('visits',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('date', sa.DateTime(), nullable=True),
+		sa.Column('name', sa.String(length=255), nullable=True),
+		sa.Column('social_media', sa.String(length=255), nullable=True),
+		sa.Column('phone_number', sqlalchemy_utils.PhoneNumberType(), nullable=True),
+		sa.Column('location_id', sa.Integer(), nullable=False),
+		sa.Column('client_id', sa.Integer(), nullable=False),
+		sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+		sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ondelete='RESTRICT'),
+		sa.PrimaryKeyConstraint('id')
+	)
+	op.create_index(op.f('ix_visits_phone_number'), 'visits', ['phone_number'], unique=False)
+	op.create_table('images',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('path', sa.String(length=255), nullable=False),
+		sa.Column('url', sa.String(length=255), nullable=True),
+		sa.Column('hosting_data', sa.JSON(), nullable=True),
+		sa.Column('visit_id', sa.Integer(), nullable=True),
+		sa.ForeignKeyConstraint(['visit_id'], ['visits.id'], ondelete='SET NULL'),
+		sa.PrimaryKeyConstraint('id')
+	)
+	op.create_table('services',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('title', sa.String(length=255), nullable=True),
+		sa.Column('date', sa.DateTime(), nullable=True),
+		sa.Column('visit_id', sa.Integer(), nullable=True),
+		sa.ForeignKeyConstraint(['visit_id'], ['visits.id'], ondelete='CASCADE'),
+		sa.PrimaryKeyConstraint('id')
+	)
+	op.create_table('videos',
+		sa.Column('id', sa.Integer(), nullable=False),
+		sa.Column('path', sa.String(length=255), nullable=False),
+		sa.Column('url', sa.String(length=255), nullable=True),
+		sa.Column('cloud_data', sa.JSON(), nullable=True),
+		sa.Column('visit_id', sa.Integer(), nullable=False),
+		sa.ForeignKeyConstraint(['visit_id'], ['visits.id'], ondelete='SET NULL'),
+		sa.PrimaryKeyConstraint('id')
+	)
+	op.create_foreign_key('clients_profile_picture_id_fkey', 'clients', 'images',
+	                      ['profile_picture_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+	op.drop_constraint('clients_profile_picture_id_fkey', 'clients', type_='foreignkey')
+	op.drop_table('videos')
+	op.drop_table('services')
+	op.drop_table('images')
+	op.drop_index(op.f('ix_visits_phone_number'), table_name='visits')
+	op.drop_table('visits')
+	op.drop_table('users')
+	op.drop_table('clients')
+	op.drop_table('locations')
@@ -0,0 +1,61 @@
+"""pgvector face_vector
+
+Revision ID: ed0bd5dd5c12
+Revises: 
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy_utils
+
+from core.database.models.types import Vector
+from core.embeddings.codec import decode_embedding
+
+
+# revision identifiers, used by Alembic.
+revision = 'ed0bd5dd5c12'
+down_revision = None
+branch_labels = ('pgvector',)
+depends_on = '8e54bb6ef292'  # Optional branch over the core schema: alembic upgrade pgvector@head
+
+BATCH_SIZE = 1000
+
+clients = sa.table(
+	'clients',
+	sa.column('id', sa.Integer),
+	sa.column('face_centroid', sa.LargeBinary),
+	sa.column('face_vector', Vector(512)),
+)
+
+
+def upgrade() -> None:
+	# Needs the pgvector package on the postgres server (see postgres/Dockerfile)
+	op.execute('CREATE EXTENSION IF NOT EXISTS vector')
+
+	op.add_column('clients', sa.Column('face_vector', Vector(512), nullable=True))
+
+	# Centroids are packed bytea, they are unpacked here: postgres has no cast from bytea to vector
+	connection = op.get_bind()
+	update = (clients.update()
+	          .where(clients.c.id == sa.bindparam('_id'))
+	          .values(face_vector=sa.bindparam('face_vector', type_=Vector(512))))
+	last_id = 0
+
+	while True:
+		rows = connection.execute(sa.select(clients.c.id, clients.c.face_centroid)
+		                          .where(clients.c.id > last_id)
+		                          .order_by(clients.c.id)
+		                          .limit(BATCH_SIZE)).all()
+		if not rows:
+			break
+
+		connection.execute(update, [{'_id': row.id, 'face_vector': decode_embedding(row.face_centroid)} for row in rows])
+		last_id = rows[-1].id
+
+	op.execute('CREATE INDEX ix_clients_face_vector ON clients USING hnsw (face_vector vector_cosine_ops)')
+
+
+def downgrade() -> None:
+	op.execute('DROP INDEX IF EXISTS ix_clients_face_vector')
+	op.drop_column('clients', 'face_vector')
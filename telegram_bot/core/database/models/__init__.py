@@ -6,6 +6,7 @@ from .service import Service
 from .visit import Visit
 from .user import User
 from .client import Client
+from .face_embedding import FaceEmbedding
 
 __all__ = (
 	"Base",
@@ -16,4 +17,5 @@ __all__ = (
 	"Visit",
 	"User",
 	"Client",
+	"FaceEmbedding",
 )
@@ -1,15 +1,24 @@
 import numpy as np
-from sqlalchemy import Integer, Column, ForeignKey, JSON
-from sqlalchemy.orm import Mapped, relationship
+from sqlalchemy import Integer, Column, Float, ForeignKey
+from sqlalchemy.orm import Mapped, deferred, relationship
 
+from core.config import EMBEDDING_SIZE, FACE_STORAGE
 from . import Base
+from .types import Embedding, Vector
 
 
 class Client(Base):
 	"""
 		Таблица уникальных клиентов (уникальность - разные лица).
 		:param profile_picture: One-to-one relationship to Image for profile picture.
-		:param face_encoding: 128-мерный массив numpy в байтовом представлении, кодирующий лицо клиента.
+		:param face_embedding: Эмбеддинг лица клиента, упакованный в bytea (float32 или float16).
+		:param face_x: Face box on the profile picture (face_x, face_y, face_w, face_h).
+		:param face_confidence: Detector confidence of the face.
+		:param face_centroid: Mean of the embeddings of all faces of the client, matched first by the embedding index.
+		:param face_count: Number of faces in the centroid.
+		:param face_vector: Centroid in pgvector column (FACE_STORAGE = 'pgvector'). Deferred, never loaded with the client.
+			Declared only with this storage.
+		:param faces: Faces of the client, one per stored image (at most CLIENT_FACES_LIMIT).
 		:param visits: List of visits of this client.
 	"""
 
@@ -20,6 +29,47 @@ class Client(Base):
 	profile_picture_id: Mapped[int] = Column(ForeignKey('images.id', ondelete='SET NULL'), nullable=True)
 	profile_picture: Mapped['Image'] = relationship('Image', lazy='joined', passive_deletes=True)
 
-	face_encoding: Mapped[np.ndarray] = Column(JSON, nullable=False)
+	face_embedding: Mapped[np.ndarray] = Column(Embedding, nullable=False)
+	face_x: Mapped[int | None] = Column(Integer, nullable=True)
+	face_y: Mapped[int | None] = Column(Integer, nullable=True)
+	face_w: Mapped[int | None] = Column(Integer, nullable=True)
+	face_h: Mapped[int | None] = Column(Integer, nullable=True)
+	face_confidence: Mapped[float | None] = Column(Float, nullable=True)
+	face_centroid: Mapped[np.ndarray] = Column(Embedding, nullable=False)
+	face_count: Mapped[int] = Column(Integer, nullable=False, default=1, server_default='1')
+	if FACE_STORAGE == 'pgvector':  # The column exists only with the pgvector migration branch
+		face_vector: Mapped[np.ndarray | None] = deferred(Column(Vector(EMBEDDING_SIZE), nullable=True))
+
+	faces: Mapped[list['FaceEmbedding']] = relationship('FaceEmbedding', back_populates='client', passive_deletes=True)
 
 	visits: Mapped[list['Visit']] = relationship('Visit', back_populates='client', passive_deletes=True, cascade='all, delete')
+
+	@property
+	def face_encoding(self) -> dict:
+		""" Face in the DeepFace.represent format """
+
+		return {
+			'embedding': self.face_embedding,
+			'facial_area': {'x': self.face_x, 'y': self.face_y, 'w': self.face_w, 'h': self.face_h},
+			'face_confidence': self.face_confidence,
+		}
+
+	@face_encoding.setter
+	def face_encoding(self, face: dict) -> None:
+		for column, value in self.face_columns(face).items():
+			setattr(self, column, value)
+
+	@staticmethod
+	def face_columns(face: dict) -> dict:
+		""" Split a face in the DeepFace.represent format to the column values """
+
+		facial_area = face.get('facial_area') or {}
+
+		return {
+			'face_embedding': face['embedding'],
+			'face_x': facial_area.get('x'),
+			'face_y': facial_area.get('y'),
+			'face_w': facial_area.get('w'),
+			'face_h': facial_area.get('h'),
+			'face_confidence': face.get('face_confidence'),
+		}
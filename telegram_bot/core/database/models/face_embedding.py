@@ -0,0 +1,33 @@
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, relationship
+
+from core.database.models import Base
+from .types import Embedding
+
+if TYPE_CHECKING:
+	# noinspection PyUnusedImports
+	from core.database.models import Client, Image
+
+
+class FaceEmbedding(Base):
+	"""
+		Таблица лиц клиентов: эмбеддинг лица с каждого сохранённого изображения клиента.
+		:param client_id: Foreign key to Client.
+		:param image_id: Foreign key to Image the face was found on. Its null when the image is deleted.
+		:param embedding: Эмбеддинг лица, упакованный в bytea (float32 или float16).
+	"""
+
+	__tablename__ = 'face_embeddings'
+
+	id: Mapped[int] = Column(Integer, primary_key=True)
+
+	client_id: Mapped[int] = Column(ForeignKey('clients.id', ondelete='CASCADE'), nullable=False, index=True)
+	client: Mapped['Client'] = relationship('Client', back_populates='faces', passive_deletes=True)
+
+	image_id: Mapped[int | None] = Column(ForeignKey('images.id', ondelete='SET NULL'), nullable=True)
+	image: Mapped[Optional['Image']] = relationship('Image', passive_deletes=True)
+
+	embedding: Mapped[np.ndarray] = Column(Embedding, nullable=False)
@@ -0,0 +1,71 @@
+import numpy as np
+from sqlalchemy import Float, LargeBinary, cast
+from sqlalchemy.dialects.postgresql import ARRAY, REAL
+from sqlalchemy.types import TypeDecorator, UserDefinedType
+
+from core.embeddings.codec import decode_embedding, encode_embedding
+
+
+class Embedding(TypeDecorator):
+	""" Face embedding packed to bytea (see core.embeddings.codec), loaded as a read-only numpy view """
+
+	impl = LargeBinary
+	cache_ok = True
+
+	def process_bind_param(self, value, dialect):
+		if value is None:
+			return None
+
+		return encode_embedding(value)
+
+	def process_result_value(self, value, dialect):
+		if value is None:
+			return None
+
+		return decode_embedding(value)
+
+
+class Vector(UserDefinedType):
+	"""
+		pgvector's vector(dim) column.
+		Values are sent as real[] and cast to vector on the server, so no driver codec is needed.
+	"""
+
+	cache_ok = True
+
+	def __init__(self, dim: int):
+		self.dim = dim
+
+	def get_col_spec(self, **kw) -> str:
+		return f'vector({self.dim})'
+
+	def bind_processor(self, dialect):
+		def process(value):
+			if value is None:
+				return None
+
+			return np.asarray(value, dtype=np.float32).reshape(-1).tolist()
+
+		return process
+
+	def bind_expression(self, bindvalue):
+		return cast(cast(bindvalue, ARRAY(REAL)), self)
+
+	def result_processor(self, dialect, coltype):
+		def process(value):
+			if value is None or isinstance(value, np.ndarray):
+				return value
+
+			if isinstance(value, str):
+				value = value.strip('[]').split(',')
+
+			return np.asarray(value, dtype=np.float32)
+
+		return process
+
+	class comparator_factory(UserDefinedType.Comparator):
+		def cosine_distance(self, other):
+			return self.op('<=>', return_type=Float)(other)
+
+		def l2_distance(self, other):
+			return self.op('<->', return_type=Float)(other)
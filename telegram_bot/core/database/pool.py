@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+from core.config import POOL_METRICS_INTERVAL, POOL_SLOW_WAIT
+
+
+class PoolMetrics:
+	"""
+		Counters of the connection pool: checkouts, time spent waiting for a connection
+		(opening a new one and pre-ping are included), timeouts.
+		Connections in use are read from the pool itself.
+	"""
+
+	def __init__(self, slow_wait: float = POOL_SLOW_WAIT, interval: float = POOL_METRICS_INTERVAL):
+		self.slow_wait = slow_wait
+		self.interval = interval
+		self.pool: AsyncAdaptedQueuePool | None = None
+
+		self.checkouts = 0
+		self.timeouts = 0
+		self.wait_total = 0.
+		self.wait_max = 0.
+
+		self._logger: asyncio.Task | None = None
+
+	def record(self, wait: float, timeout=False) -> None:
+		if timeout:
+			self.timeouts += 1
+		else:
+			self.checkouts += 1
+
+		self.wait_total += wait
+		self.wait_max = max(self.wait_max, wait)
+
+		if wait > self.slow_wait:
+			logging.warning(f'Waited {wait:.3f}s for a db connection: {self.pool.status() if self.pool else ""}')
+
+	def snapshot(self) -> dict[str, float]:
+		stats = {
+			'checkouts': self.checkouts,
+			'timeouts': self.timeouts,
+			'wait_avg': self.wait_total / max(self.checkouts + self.timeouts, 1),
+			'wait_max': self.wait_max,
+		}
+
+		if self.pool is not None:
+			stats |= {
+				'in_use': self.pool.checkedout(),
+				'idle': self.pool.checkedin(),
+				'overflow': max(self.pool.overflow(), 0),
+				'size': self.pool.size(),
+			}
+
+		return stats
+
+	async def start(self) -> None:
+		if self._logger is None:
+			self._logger = asyncio.create_task(self._log_periodically())
+
+	async def close(self) -> None:
+		if self._logger is not None:
+			self._logger.cancel()
+			self._logger = None
+
+	async def _log_periodically(self) -> None:
+		checkouts = 0
+		while True:
+			await asyncio.sleep(self.interval)
+			if self.checkouts == checkouts:
+				continue
+
+			checkouts = self.checkouts
+			logging.info('DB pool: ' + ', '.join(
+				f'{k} {v:.3f}s' if k.startswith('wait') else f'{k} {v}' for k, v in self.snapshot().items()
+			))
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+	""" AsyncAdaptedQueuePool measuring how long every checkout waits for a connection (pool_metrics) """
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		pool_metrics.pool = self
+
+	def connect(self) -> PoolProxiedConnection:
+		start = time.perf_counter()
+		try:
+			connection = super().connect()
+		except exc.TimeoutError:
+			pool_metrics.record(time.perf_counter() - start, timeout=True)
+			raise
+
+		pool_metrics.record(time.perf_counter() - start)
+		return connection
@@ -0,0 +1,6 @@
+from .codec import encode_embedding, decode_embedding
+from .exact import EmbeddingIndex, nearest, similarity2distance
+from .cluster import pairwise_distances, cluster_by_threshold, is_tight
+from .gallery import FaceGallery
+from .ivf import IVFIndex
+from .main import create_index, embedding_index, face_gallery
@@ -0,0 +1,49 @@
+from typing import Iterable
+
+import numpy as np
+
+from core.config import DISTANCE_METRIC, EMBEDDING_SIZE
+from core.embeddings.exact import similarity2distance
+
+
+def pairwise_distances(embeddings: Iterable[Iterable[float]], distance_metric: str = DISTANCE_METRIC) -> np.ndarray:
+	""" Returns the (n, n) matrix of distances between all embeddings (one matrix product) """
+
+	vectors = np.asarray(list(embeddings), dtype=np.float32).reshape(-1, EMBEDDING_SIZE)
+	norms = np.linalg.norm(vectors, axis=1)
+	normalized = vectors / np.maximum(norms, 1e-12)[:, None]
+
+	similarity = normalized @ normalized.T
+	return similarity2distance(similarity, norms[None, :], norms[:, None], distance_metric)
+
+
+def cluster_by_threshold(distances: np.ndarray, threshold: float) -> list[list[int]]:
+	"""
+		Group items connected by distances below threshold (union-find over the pairs).
+		Returns clusters as lists of indexes in ascending order, clusters are ordered by their first item.
+	"""
+
+	parent = list(range(distances.shape[0]))
+
+	def find(i: int) -> int:
+		while parent[i] != i:
+			parent[i] = parent[parent[i]]
+			i = parent[i]
+		return i
+
+	for i, j in zip(*np.nonzero(np.triu(distances < threshold, k=1))):
+		root_i, root_j = find(int(i)), find(int(j))
+		if root_i != root_j:
+			parent[max(root_i, root_j)] = min(root_i, root_j)
+
+	clusters: dict[int, list[int]] = {}
+	for i in range(len(parent)):
+		clusters.setdefault(find(i), []).append(i)
+
+	return list(clusters.values())
+
+
+def is_tight(distances: np.ndarray, cluster: list[int], threshold: float) -> bool:
+	""" All items of the cluster are closer than threshold to each other (not only chained through others) """
+
+	return bool((distances[np.ix_(cluster, cluster)] < threshold).all())
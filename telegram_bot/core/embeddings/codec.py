@@ -0,0 +1,29 @@
+from typing import Iterable
+
+import numpy as np
+
+from core.config import EMBEDDING_DTYPE, EMBEDDING_SIZE
+
+EMBEDDING_DTYPES = {
+	np.dtype(np.float32).itemsize: np.float32,
+	np.dtype(np.float16).itemsize: np.float16,
+}
+
+
+def encode_embedding(embedding: Iterable[float], dtype: str = EMBEDDING_DTYPE) -> bytes:
+	""" Pack the embedding to little-endian float32/float16 bytes """
+
+	return np.asarray(embedding, dtype=np.dtype(dtype).newbyteorder('<')).reshape(-1).tobytes()
+
+
+def decode_embedding(data: bytes, dim: int = EMBEDDING_SIZE) -> np.ndarray:
+	"""
+		Read-only view of the packed embedding (no copy).
+		The precision is taken from the data length, so float32 and float16 rows can be mixed.
+	"""
+
+	itemsize, remainder = divmod(len(data), dim)
+	if remainder or itemsize not in EMBEDDING_DTYPES:
+		raise ValueError(f'Cannot decode {len(data)} bytes as an embedding of {dim} dimensions')
+
+	return np.frombuffer(data, dtype=np.dtype(EMBEDDING_DTYPES[itemsize]).newbyteorder('<'))
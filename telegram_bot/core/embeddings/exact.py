@@ -0,0 +1,235 @@
+import logging
+import os
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from core.config import DISTANCE_METRIC, EMBEDDING_SIZE
+
+
+def similarity2distance(similarity: np.ndarray, norms: np.ndarray, query_norm: float | np.ndarray, distance_metric: str) -> np.ndarray:
+	""" Convert cosine similarity of normalized vectors to the distance_metric (norms are needed for 'euclidean') """
+
+	match distance_metric:
+		case 'cosine':
+			return 1 - similarity
+		case 'euclidean_l2':
+			return np.sqrt(np.maximum(2 - 2 * similarity, 0))
+		case 'euclidean':
+			return np.sqrt(np.maximum(norms ** 2 + query_norm ** 2 - 2 * norms * query_norm * similarity, 0))
+		case _:
+			raise ValueError("Invalid distance_metric passed - ", distance_metric)
+
+
+def nearest(rows: np.ndarray, distances: np.ndarray, top_k: int | None) -> tuple[np.ndarray, np.ndarray]:
+	""" Select top_k rows with the smallest distances (partial selection) and sort them ascending """
+
+	if top_k is not None and rows.shape[0] > top_k:
+		top = np.argpartition(distances, top_k - 1)[:top_k]
+		rows, distances = rows[top], distances[top]
+
+	order = np.argsort(distances, kind='stable')
+	return rows[order], distances[order]
+
+
+class EmbeddingIndex:
+	"""
+		Process-wide index of the clients face embeddings (exact brute-force search).
+		Embeddings are stored l2-normalized in one contiguous float32 matrix with a parallel array of client ids,
+		so the whole gallery is compared with a face by a single matrix-vector product.
+		Rows are removed by moving the last row in place of the deleted one.
+		Every embedding has a version (face_count of the client centroid): a restored index is compared with db by them.
+	"""
+
+	backend = 'exact'
+
+	def __init__(self, dim: int = EMBEDDING_SIZE, capacity: int = 1024):
+		self._dim = dim
+		self._size = 0
+
+		self._vectors = np.empty((capacity, dim), dtype=np.float32)
+		self._norms = np.empty(capacity, dtype=np.float32)
+		self._ids = np.empty(capacity, dtype=np.int64)
+		self._versions = np.empty(capacity, dtype=np.int64)
+
+		self._rows: dict[int, int] = {}  # client_id -> row in the matrix
+		self.loaded = False
+
+	def __len__(self) -> int:
+		return self._size
+
+	def __contains__(self, client_id: int) -> bool:
+		return client_id in self._rows
+
+	@property
+	def ids(self) -> np.ndarray:
+		return self._ids[:self._size]
+
+	@property
+	def versions(self) -> np.ndarray:
+		""" Versions of the embeddings in order of self.ids """
+
+		return self._versions[:self._size]
+
+	def load(self, faces: Iterable[tuple[int, Iterable[float]] | tuple[int, Iterable[float], int]]) -> None:
+		""" Replace the index content with (client_id, embedding) pairs or (client_id, embedding, version) """
+
+		faces = list(faces)
+
+		self._size = 0
+		self._rows.clear()
+		self._reserve(len(faces))
+
+		for client_id, embedding, *version in faces:
+			self._add(client_id, embedding, *version)
+
+		self.loaded = True
+
+	def add(self, client_id: int, embedding: Iterable[float], version: int = 0) -> None:
+		""" Add or replace the client embedding """
+
+		self._add(client_id, embedding, version)
+
+	def remove(self, client_id: int) -> None:
+		""" Remove the client embedding if it is in the index """
+
+		row = self._rows.pop(client_id, None)
+		if row is None:
+			return
+
+		last = self._size - 1
+		if row != last:
+			moved_id = int(self._ids[last])
+			self._move_row(last, row)
+			self._rows[moved_id] = row
+
+		self._size = last
+
+	def distances(self, embedding: Iterable[float], distance_metric: str = DISTANCE_METRIC) -> np.ndarray:
+		""" Returns distances from the embedding to every face in the index (in order of self.ids) """
+
+		query, query_norm = self._normalize(embedding)
+		similarity = self._vectors[:self._size] @ query
+
+		return similarity2distance(similarity, self._norms[:self._size], query_norm, distance_metric)
+
+	def search(self, embedding: Iterable[float], threshold: float,
+	           distance_metric: str = DISTANCE_METRIC, top_k: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+		""" Returns ids and distances (ascending) of at most top_k clients whose faces are closer than threshold """
+
+		if self._size == 0:
+			return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+		distances = self.distances(embedding, distance_metric)
+		rows = np.flatnonzero(distances < threshold)
+
+		rows, distances = nearest(rows, distances[rows], top_k)
+		return self._ids[rows], distances
+
+	def save(self, path: Path) -> None:
+		""" Atomically dump the index to the .npz file """
+
+		temp_path = path.with_name(path.name + '.tmp')
+		with temp_path.open('wb') as f:
+			np.savez(f, **self._state())
+
+		os.replace(temp_path, path)
+
+	def restore(self, path: Path) -> bool:
+		""" Load the index from the .npz file. Returns False if the file is missing or incompatible. """
+
+		if not path.exists():
+			return False
+
+		try:
+			with np.load(path) as state:
+				if str(state['backend']) != self.backend or state['vectors'].shape[1] != self._dim:
+					logging.warning(f'Embedding index file {path} was built for another backend or model')
+					return False
+
+				self._set_state(state)
+		except (OSError, KeyError, ValueError) as e:
+			logging.warning(f'Cannot restore embedding index from {path}: {e}')
+			return False
+
+		self._rows = {int(client_id): row for row, client_id in enumerate(self.ids)}
+		self.loaded = True
+
+		return True
+
+	def _add(self, client_id: int, embedding: Iterable[float], version: int = 0) -> int:
+		vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+		if vector.shape[0] != self._dim:
+			raise ValueError(f'Embedding of client {client_id} has {vector.shape[0]} dimensions, expected {self._dim}')
+
+		row = self._rows.get(client_id)
+		if row is None:
+			self._reserve(self._size + 1)
+
+			row = self._size
+			self._size += 1
+
+			self._rows[client_id] = row
+			self._ids[row] = client_id
+
+		norm = np.linalg.norm(vector)
+		self._norms[row] = norm
+		self._vectors[row] = vector / norm if norm > 0 else vector
+		self._versions[row] = version
+
+		return row
+
+	def _move_row(self, src: int, dst: int) -> None:
+		self._vectors[dst] = self._vectors[src]
+		self._norms[dst] = self._norms[src]
+		self._ids[dst] = self._ids[src]
+		self._versions[dst] = self._versions[src]
+
+	def _reserve(self, size: int) -> None:
+		""" Grow the buffers geometrically to fit size rows """
+
+		capacity = self._vectors.shape[0]
+		if size > capacity:
+			self._grow(max(size, capacity * 2))
+
+	def _grow(self, capacity: int) -> None:
+		vectors = np.empty((capacity, self._dim), dtype=np.float32)
+		vectors[:self._size] = self._vectors[:self._size]
+
+		norms = np.empty(capacity, dtype=np.float32)
+		norms[:self._size] = self._norms[:self._size]
+
+		ids = np.empty(capacity, dtype=np.int64)
+		ids[:self._size] = self._ids[:self._size]
+
+		versions = np.empty(capacity, dtype=np.int64)
+		versions[:self._size] = self._versions[:self._size]
+
+		self._vectors, self._norms, self._ids, self._versions = vectors, norms, ids, versions
+
+	def _state(self) -> dict[str, np.ndarray]:
+		return {
+			'backend': np.array(self.backend),
+			'vectors': self._vectors[:self._size],
+			'norms': self._norms[:self._size],
+			'ids': self.ids,
+			'versions': self.versions,
+		}
+
+	def _set_state(self, state) -> None:
+		self._vectors = np.ascontiguousarray(state['vectors'], dtype=np.float32)
+		self._norms = np.ascontiguousarray(state['norms'], dtype=np.float32)
+		self._ids = np.ascontiguousarray(state['ids'], dtype=np.int64)
+		self._versions = np.ascontiguousarray(state['versions'], dtype=np.int64)
+		self._size = self._ids.shape[0]
+
+	@staticmethod
+	def _normalize(embedding: Iterable[float]) -> tuple[np.ndarray, float]:
+		query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+		query_norm = float(np.linalg.norm(query))
+
+		if query_norm > 0:
+			query = query / query_norm
+
+		return query, query_norm
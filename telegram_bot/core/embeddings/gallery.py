@@ -0,0 +1,88 @@
+from typing import Iterable
+
+import numpy as np
+
+from core.config import DISTANCE_METRIC, EMBEDDING_SIZE
+from core.embeddings.exact import nearest, similarity2distance
+
+
+class FaceGallery:
+	"""
+		Individual face embeddings of the clients that have several faces (one per stored image).
+		The embedding index holds a centroid per client and finds candidates; the gallery re-ranks them
+		by the nearest individual face, so a search touches only the faces of the candidates.
+		Faces are kept l2-normalized in float16 (half of the index precision) with float32 norms.
+		A client with a single face isn't stored: its centroid is the face itself.
+	"""
+
+	def __init__(self, dim: int = EMBEDDING_SIZE):
+		self._dim = dim
+		self._faces: dict[int, tuple[np.ndarray, np.ndarray]] = {}  # client_id -> (vectors, norms)
+		self.loaded = False
+
+	def __len__(self) -> int:
+		return len(self._faces)
+
+	def __contains__(self, client_id: int) -> bool:
+		return client_id in self._faces
+
+	def load(self, faces: Iterable[tuple[int, Iterable[float]]]) -> None:
+		""" Replace the gallery content with (client_id, embedding) pairs, several per client """
+
+		grouped: dict[int, list] = {}
+		for client_id, embedding in faces:
+			grouped.setdefault(client_id, []).append(embedding)
+
+		self._faces.clear()
+		for client_id, embeddings in grouped.items():
+			self.set(client_id, embeddings)
+
+		self.loaded = True
+
+	def set(self, client_id: int, embeddings: Iterable[Iterable[float]]) -> None:
+		""" Replace the client faces """
+
+		vectors = np.asarray(list(embeddings), dtype=np.float32).reshape(-1, self._dim)
+		if vectors.shape[0] < 2:
+			self._faces.pop(client_id, None)
+			return
+
+		norms = np.linalg.norm(vectors, axis=1)
+		vectors = vectors / np.maximum(norms, 1e-12)[:, None]
+
+		self._faces[client_id] = vectors.astype(np.float16), norms.astype(np.float32)
+
+	def remove(self, client_id: int) -> None:
+		self._faces.pop(client_id, None)
+
+	def rerank(self, clients_id: np.ndarray, distances: np.ndarray, embedding: Iterable[float], threshold: float,
+	           distance_metric: str = DISTANCE_METRIC, top_k: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+		"""
+			Replace centroid distances of the candidates by the distance to their nearest face.
+			Returns ids and distances (ascending) of at most top_k clients closer than threshold.
+		"""
+
+		clients_id = np.asarray(clients_id, dtype=np.int64)
+		distances = np.array(distances, dtype=np.float32)
+
+		rows = [row for row, client_id in enumerate(clients_id.tolist()) if client_id in self._faces]
+		if rows:
+			query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+			query_norm = float(np.linalg.norm(query))
+			if query_norm > 0:
+				query = query / query_norm
+
+			faces = [self._faces[int(clients_id[row])] for row in rows]
+			vectors = np.concatenate([vectors for vectors, _ in faces])
+			norms = np.concatenate([norms for _, norms in faces])
+
+			# One product for the faces of all candidates, then the minimum per client
+			similarity = vectors.astype(np.float32) @ query
+			face_distances = similarity2distance(similarity, norms, query_norm, distance_metric)
+
+			starts = np.cumsum([0] + [vectors.shape[0] for vectors, _ in faces[:-1]])
+			distances[rows] = np.minimum.reduceat(face_distances, starts)
+
+		rows = np.flatnonzero(distances < threshold)
+		rows, distances = nearest(rows, distances[rows], top_k)
+		return clients_id[rows], distances
@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import time
+from typing import Iterable
+
+import numpy as np
+
+from core.config import DISTANCE_METRIC, EMBEDDING_SIZE, IVF_NLIST, IVF_NPROBE, IVF_TOP_K
+from core.embeddings.exact import EmbeddingIndex, nearest, similarity2distance
+
+_CHUNK_SIZE = 16384  # Rows assigned to centroids at once (limits temporary memory)
+_TRAIN_PER_LIST = 32  # Training sample size per cluster
+_MIN_PER_LIST = 8  # Do not train until there are enough faces per cluster
+
+
+class IVFIndex(EmbeddingIndex):
+	"""
+		Approximate embedding index (inverted file).
+		Faces are split into nlist clusters by spherical k-means, every cluster keeps the list of its rows;
+		a query scans only the lists of nprobe nearest clusters.
+		The top_k candidates by cosine similarity are re-ranked exactly by distance_metric and cut by threshold.
+		Until the index is trained (too few faces) it scans everything like EmbeddingIndex.
+		When the index doubles it is retrained in a thread (if there is a running event loop), meanwhile
+		the old clusters are used; rows changed during the training are reassigned when the new clusters are set.
+		:param nlist: Number of clusters.
+		:param nprobe: Clusters scanned per query. Higher gives better recall and slower search.
+		:param top_k: Candidates re-ranked exactly.
+	"""
+
+	backend = 'ivf'
+
+	def __init__(self, dim: int = EMBEDDING_SIZE, capacity: int = 1024,
+	             *, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE, top_k: int = IVF_TOP_K):
+		super().__init__(dim, capacity)
+
+		self.nlist = nlist
+		self.nprobe = nprobe
+		self.top_k = top_k
+
+		self._assign = np.empty(capacity, dtype=np.int32)  # cluster of each row
+		self._position = np.empty(capacity, dtype=np.int64)  # position of each row in its list
+		self._lists: list[list[int]] = []  # rows of each cluster
+		self._centroids: np.ndarray | None = None
+		self._trained_size = 0
+
+		self._training: asyncio.Task | None = None
+		self._changed: set[int] | None = None  # Rows changed during the background training
+
+	@property
+	def trained(self) -> bool:
+		return self._centroids is not None
+
+	@property
+	def training(self) -> asyncio.Task | None:
+		""" Background training in progress """
+
+		return self._training
+
+	def load(self, faces: Iterable[tuple[int, Iterable[float]] | tuple[int, Iterable[float], int]]) -> None:
+		self._cancel_training()
+		self._centroids = None
+		super().load(faces)
+		self.train()
+
+	def add(self, client_id: int, embedding: Iterable[float], version: int = 0) -> None:
+		replaced = client_id in self._rows
+		row = self._add(client_id, embedding, version)
+
+		if self._changed is not None:
+			self._changed.add(row)
+
+		if self.trained:
+			if replaced:
+				self._unlist(row)
+			self._list(row, self._nearest(self._vectors[row:row + 1])[0])
+
+		# Retrain when the index doubled since the last training
+		if self._size >= max(2 * self._trained_size, self.nlist * _MIN_PER_LIST):
+			self._train_later()
+
+	def remove(self, client_id: int) -> None:
+		row = self._rows.get(client_id)
+		if row is not None and self.trained:
+			self._unlist(row)
+
+		super().remove(client_id)
+
+	def train(self, iterations: int = 10, seed: int = 0) -> None:
+		""" Fit clusters with spherical k-means on a sample and assign every face (blocks the caller) """
+
+		self._cancel_training()
+		self._set_centroids(*self._fit(self._vectors[:self._size], iterations, seed), set())
+
+	async def train_async(self, iterations: int = 10, seed: int = 0) -> None:
+		""" train() in a thread: the index is searched and changed meanwhile """
+
+		self._changed = set()
+		try:
+			centroids, assign = await asyncio.to_thread(self._fit, self._vectors[:self._size], iterations, seed)
+			changed = self._changed
+		finally:
+			self._changed = None
+
+		self._set_centroids(centroids, assign, changed)
+
+	def search(self, embedding: Iterable[float], threshold: float,
+	           distance_metric: str = DISTANCE_METRIC, top_k: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+		"""
+			Returns ids and distances (ascending) of at most top_k clients whose faces are closer than threshold.
+			Results are also limited by the top_k of the index (candidates re-ranked exactly).
+		"""
+
+		if self._size == 0:
+			return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+		query, query_norm = self._normalize(embedding)
+
+		if self.trained:
+			nprobe = min(self.nprobe, self.nlist)
+			probe = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+			rows = np.concatenate([np.asarray(self._lists[cluster], dtype=np.int64) for cluster in probe])
+		else:
+			rows = np.arange(self._size)
+
+		# Select top_k candidates by cosine similarity
+		similarity = self._vectors[rows] @ query
+		if rows.shape[0] > self.top_k:
+			top = np.argpartition(-similarity, self.top_k - 1)[:self.top_k]
+			rows, similarity = rows[top], similarity[top]
+
+		# Exact re-ranking against the threshold
+		distances = similarity2distance(similarity, self._norms[rows], query_norm, distance_metric)
+		mask = distances < threshold
+
+		rows, distances = nearest(rows[mask], distances[mask], top_k)
+		return self._ids[rows], distances
+
+	def _fit(self, vectors: np.ndarray, iterations: int, seed: int) -> tuple[np.ndarray | None, np.ndarray | None]:
+		""" Returns k-means centroids and the cluster of every vector, Nones if there are too few vectors """
+
+		size = vectors.shape[0]
+		if size < self.nlist * _MIN_PER_LIST:
+			return None, None
+
+		tic = time.perf_counter()
+		rng = np.random.default_rng(seed)
+
+		sample_size = min(size, self.nlist * _TRAIN_PER_LIST)
+		sample = vectors[rng.choice(size, sample_size, replace=False)]
+
+		centroids = sample[rng.choice(sample_size, self.nlist, replace=False)].copy()
+		for _ in range(iterations):
+			assign = self._nearest(sample, centroids)
+
+			sums = np.zeros_like(centroids)
+			np.add.at(sums, assign, sample)
+
+			# Reinitialize empty clusters with random faces
+			empty = np.bincount(assign, minlength=self.nlist) == 0
+			sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+
+			norms = np.linalg.norm(sums, axis=1, keepdims=True)
+			centroids = sums / np.maximum(norms, 1e-12)
+
+		centroids = centroids.astype(np.float32)
+		assign = self._nearest(vectors, centroids)
+
+		logging.info(f'IVF index trained: {size} faces, {self.nlist} clusters in {time.perf_counter() - tic:.2f} sec')
+		return centroids, assign
+
+	def _set_centroids(self, centroids: np.ndarray | None, assign: np.ndarray | None, changed: set[int]) -> None:
+		"""
+			Use the fitted clusters. assign holds the clusters of the rows at the fitting time:
+			the changed rows and the rows added after it are assigned again.
+		"""
+
+		if centroids is None:
+			self._centroids, self._lists = None, []
+			return
+
+		fitted = min(assign.shape[0], self._size)
+		self._centroids = centroids
+		self._assign[:fitted] = assign[:fitted]
+
+		stale = np.array(sorted({row for row in changed if row < fitted} | set(range(fitted, self._size))), dtype=np.int64)
+		if stale.shape[0]:
+			self._assign[stale] = self._nearest(self._vectors[stale])
+
+		self._trained_size = self._size
+		self._build_lists()
+
+	def _train_later(self) -> None:
+		""" Retrain in a thread, right away without a running event loop (scripts) """
+
+		if self._training is not None and not self._training.done():
+			return
+
+		try:
+			asyncio.get_running_loop()
+		except RuntimeError:
+			self.train()
+			return
+
+		self._training = asyncio.create_task(self.train_async())
+		self._training.add_done_callback(self._log_training)
+
+	def _cancel_training(self) -> None:
+		""" The result of the running training would be stale: the index content is replaced """
+
+		if self._training is not None:
+			self._training.cancel()
+			self._training = None
+
+	@staticmethod
+	def _log_training(task: asyncio.Task) -> None:
+		if not task.cancelled() and task.exception() is not None:
+			logging.error(f'IVF index training failed: {task.exception()}')
+
+	def _nearest(self, vectors: np.ndarray, centroids: np.ndarray | None = None) -> np.ndarray:
+		""" Returns the nearest centroid of each vector """
+
+		if centroids is None:
+			centroids = self._centroids
+
+		result = np.empty(vectors.shape[0], dtype=np.int32)
+		for start in range(0, vectors.shape[0], _CHUNK_SIZE):
+			chunk = vectors[start:start + _CHUNK_SIZE]
+			result[start:start + _CHUNK_SIZE] = np.argmax(chunk @ centroids.T, axis=1)
+
+		return result
+
+	def _build_lists(self) -> None:
+		""" Inverted lists from the clusters of the rows """
+
+		assign = self._assign[:self._size]
+		order = np.argsort(assign, kind='stable')
+		counts = np.bincount(assign, minlength=self.nlist)
+		starts = np.cumsum(counts) - counts
+
+		self._position[order] = np.arange(self._size) - np.repeat(starts, counts)
+
+		rows = order.tolist()
+		self._lists = [rows[start:start + count] for start, count in zip(starts.tolist(), counts.tolist())]
+
+	def _list(self, row: int, cluster: int) -> None:
+		self._assign[row] = cluster
+		self._position[row] = len(self._lists[cluster])
+		self._lists[cluster].append(row)
+
+	def _unlist(self, row: int) -> None:
+		""" Remove the row from its list by moving the last row of the list in its place """
+
+		rows, position = self._lists[self._assign[row]], self._position[row]
+
+		last = rows.pop()
+		if last != row:
+			rows[position] = last
+			self._position[last] = position
+
+	def _move_row(self, src: int, dst: int) -> None:
+		super()._move_row(src, dst)
+		self._assign[dst] = self._assign[src]
+
+		if self.trained:
+			position = self._position[src]
+			self._lists[self._assign[src]][position] = dst
+			self._position[dst] = position
+
+		if self._changed is not None:
+			self._changed.add(dst)
+
+	def _grow(self, capacity: int) -> None:
+		assign = np.empty(capacity, dtype=np.int32)
+		assign[:self._size] = self._assign[:self._size]
+
+		position = np.empty(capacity, dtype=np.int64)
+		position[:self._size] = self._position[:self._size]
+
+		super()._grow(capacity)
+		self._assign, self._position = assign, position
+
+	def _state(self) -> dict[str, np.ndarray]:
+		state = super()._state()
+
+		if self.trained:
+			state['centroids'] = self._centroids
+			state['assign'] = self._assign[:self._size]
+			state['trained_size'] = np.array(self._trained_size)
+
+		return state
+
+	def _set_state(self, state) -> None:
+		self._cancel_training()
+		super()._set_state(state)
+
+		self._position = np.empty(self._size, dtype=np.int64)
+		if 'centroids' in state and state['centroids'].shape[0] == self.nlist:
+			self._centroids = np.ascontiguousarray(state['centroids'], dtype=np.float32)
+			self._assign = np.ascontiguousarray(state['assign'], dtype=np.int32)
+			self._trained_size = int(state['trained_size'])
+			self._build_lists()
+		else:
+			self._assign = np.empty(self._size, dtype=np.int32)
+			self.train()
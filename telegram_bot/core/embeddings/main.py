@@ -0,0 +1,22 @@
+from core.config import INDEX_BACKEND
+from core.embeddings.exact import EmbeddingIndex
+from core.embeddings.gallery import FaceGallery
+from core.embeddings.ivf import IVFIndex
+
+INDEX_BACKENDS: dict[str, type[EmbeddingIndex]] = {
+	EmbeddingIndex.backend: EmbeddingIndex,
+	IVFIndex.backend: IVFIndex,
+}
+
+
+def create_index(backend: str = INDEX_BACKEND) -> EmbeddingIndex:
+	""" Create an embedding index by the backend name """
+
+	if backend not in INDEX_BACKENDS:
+		raise ValueError(f'Unknown embedding index backend: {backend}')
+
+	return INDEX_BACKENDS[backend]()
+
+
+embedding_index = create_index()
+face_gallery = FaceGallery()
@@ -20,6 +20,16 @@ class PostgresKeys:
 
 	URL: Final[str] = f'postgresql+asyncpg://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}'
 
+	# Connection pool of the bot
+	POOL_SIZE: Final[int] = int(environ.get('POSTGRES_POOL_SIZE', 5))
+	MAX_OVERFLOW: Final[int] = int(environ.get('POSTGRES_MAX_OVERFLOW', 10))  # Connections above POOL_SIZE under load
+	POOL_TIMEOUT: Final[float] = float(environ.get('POSTGRES_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+	POOL_PRE_PING: Final[bool] = environ.get('POSTGRES_POOL_PRE_PING', 'false').lower() == 'true'
+
+	# Server-side prepared statements of asyncpg, disable them behind pgbouncer in transaction mode
+	PREPARED_STATEMENTS: Final[bool] = environ.get('POSTGRES_PREPARED_STATEMENTS', 'true').lower() == 'true'
+	STATEMENT_CACHE_SIZE: Final[int] = int(environ.get('POSTGRES_STATEMENT_CACHE_SIZE', 100))  # Per connection
+
 
 class RedisKeys:
 	HOST: Final[str] = environ.get('REDIS_HOST', default='localhost')
@@ -1 +1,3 @@
-from .main import find_faces_with_match, compare_faces, find_faces
+from core.inference import find_faces, find_faces_batch
+from .main import (find_faces_with_match, search_similar_clients, match_confidence,
+                   recognise_faces, add_image_face, load_embedding_index, save_embedding_index)
@@ -1,27 +1,27 @@
+import asyncio
 import logging
+import time
 from pathlib import Path
+from typing import Awaitable, Callable
 
-from PIL import Image
+import numpy as np
 from aiogram import types
 from aiogram.enums import ParseMode
-import numpy as np
-from deepface import DeepFace
 from deepface.modules import verification as dst
 
-from core.config import BACKEND, DISTANCE_METRIC, MODEL
-from core.database.methods.client import get_all_clients
-from core.database.models import Client
+from core.config import CENTROID_CANDIDATES, CENTROID_MARGIN, DISTANCE_METRIC, FACE_STORAGE, INDEX_PATH, MATCH_TOP_K, MODEL
+from core.database.methods.client import (add_client_face, get_all_face_centroids, get_clients_face_count, get_clients_faces,
+                                          get_clients_profile_paths, find_similar_clients)
+from core.embeddings import FaceGallery, embedding_index, face_gallery
+from core.inference import InferenceCanceled, InferenceQueueFull, detect_faces, load_image, recognition_executor
 from core.handlers.utils import TokenCancelCheck
 from core.keyboards.inline import cancel_keyboard
+from core.match_result import MatchResult
+from core.misc.adapters import str2int
+from core.misc.face_cache import face_cache
+from core.misc.images import pixels_digest
 
-
-def find_faces(image_path: Path) -> list[dict]:
-	img = Image.open(image_path)
-	np_img = np.array(img)
-	img.close()
-
-	embeddings = DeepFace.represent(np_img, model_name=MODEL, detector_backend=BACKEND, enforce_detection=False)
-	return list(filter(lambda e: e['face_confidence'] > .75, embeddings))
+RELOAD_CHUNK_SIZE = 10000  # Clients whose centroids are read by one query when the restored index is synchronized
 
 
 def get_distance(distance_metric, embedding1, embedding2) -> int:
@@ -37,22 +37,167 @@ def get_distance(distance_metric, embedding1, embedding2) -> int:
 		raise ValueError("Invalid distance_metric passed - ", distance_metric)
 
 
-def compare_faces(known_faces: list[dict], face2compare: dict) -> list[bool]:
+async def load_embedding_index() -> None:
+	"""
+		Load face centroids of the clients to the embedding index and faces of the clients with several faces to the gallery.
+		Restores the index from INDEX_PATH and synchronizes it with db, otherwise loads all centroids from db.
+		Centroids whose version (face_count) differs from db are reloaded: the file may be stale, e.g. after a crash.
+		The gallery is always loaded from db.
+	"""
+
+	if FACE_STORAGE == 'pgvector':
+		return  # Faces are matched in postgres
+
+	tic = time.perf_counter()
+
+	if embedding_index.restore(INDEX_PATH):
+		db_versions = dict(await get_clients_face_count())
+		index_versions = dict(zip(embedding_index.ids.tolist(), embedding_index.versions.tolist()))
+
+		removed = index_versions.keys() - db_versions.keys()
+		for client_id in removed:
+			embedding_index.remove(client_id)
+
+		# New clients and the clients whose centroids moved since the file was saved
+		stale = [client_id for client_id, version in db_versions.items() if index_versions.get(client_id) != version]
+		for start in range(0, len(stale), RELOAD_CHUNK_SIZE):
+			for client_id, face_centroid, face_count in await get_all_face_centroids(stale[start:start + RELOAD_CHUNK_SIZE]):
+				embedding_index.add(client_id, face_centroid, face_count)
+
+		logging.info(f'Embedding index restored from {INDEX_PATH}: '
+		             f'{len(removed)} removed, {len(stale)} added or updated')
+	else:
+		embedding_index.load(await get_all_face_centroids())
+
+	face_gallery.load(await get_clients_faces())
+
+	save_embedding_index()
+	logging.info(f'Embedding index ({embedding_index.backend}) loaded: {len(embedding_index)} clients, '
+	             f'{len(face_gallery)} with several faces in {time.perf_counter() - tic:.2f} sec')
+
+
+def save_embedding_index() -> None:
+	""" Dump the embedding index to INDEX_PATH """
+
+	if not embedding_index.loaded:
+		return
+
+	try:
+		embedding_index.save(INDEX_PATH)
+	except OSError as e:
+		logging.error(f'Cannot save embedding index to {INDEX_PATH}: {e}')
+
+
+def match_confidence(distance: float) -> int:
+	""" Percent of the MODEL threshold left to the distance: 100 - same face, 0 - at the threshold """
+
+	threshold = dst.find_threshold(MODEL, DISTANCE_METRIC)
+	return max(0, round(100 * (1 - distance / threshold)))
+
+
+async def search_similar_clients(embedding: list[float], top_k: int = MATCH_TOP_K) -> tuple[list[int], list[float]]:
 	"""
-		:param known_faces: list of known face encodings
-		:param face2compare: face encoding to find similar faces
+		Returns ids and distances of at most top_k clients whose faces are closer than the MODEL threshold, nearest first.
+		Candidates are found by the client centroids with a wider threshold and re-ranked by their nearest face.
 	"""
+
 	threshold = dst.find_threshold(MODEL, DISTANCE_METRIC)
 
-	return [
-		get_distance(DISTANCE_METRIC, face['embedding'], face2compare['embedding']) < threshold
-		for face in known_faces
-	]
+	if FACE_STORAGE == 'pgvector':
+		similar = await find_similar_clients(embedding, threshold * CENTROID_MARGIN, limit=CENTROID_CANDIDATES)
+		clients_id = [client_id for client_id, _ in similar]
+
+		gallery = FaceGallery()
+		gallery.load(await get_clients_faces(clients_id) if clients_id else [])
+		clients_id, distances = gallery.rerank(clients_id, [distance for _, distance in similar], embedding, threshold, top_k=top_k)
+		return clients_id.tolist(), distances.tolist()
+
+	if not embedding_index.loaded:
+		await load_embedding_index()
+
+	clients_id, distances = embedding_index.search(embedding, threshold * CENTROID_MARGIN, top_k=CENTROID_CANDIDATES)
+	clients_id, distances = face_gallery.rerank(clients_id, distances, embedding, threshold, top_k=top_k)
+	return clients_id.tolist(), distances.tolist()
+
+
+async def add_image_face(client_id: int | str, image_id: int | str, image: Path | bytes, file_unique_id: str = None) -> bool:
+	"""
+		Add the face on a new image of the client (e.g. of a visit) to the client faces.
+		The face is added only if it is the only face on the image and it matches the client.
+	"""
 
+	client_id, image_id = str2int(client_id, image_id)
+
+	faces = await recognise_faces(image, file_unique_id)
+	if len(faces) != 1:
+		return False
+
+	clients_id, _ = await search_similar_clients(faces[0]['embedding'])
+	if client_id not in clients_id:
+		return False
+
+	result = await add_client_face(client_id, faces[0]['embedding'], image_id)
+	if result is None:
+		return False
+
+	centroid, face_count, embeddings = result
+	if embedding_index.loaded:
+		embedding_index.add(client_id, centroid, face_count)
+		face_gallery.set(client_id, embeddings)
+
+	return True
+
+
+async def recognise_faces(image: Path | bytes, file_unique_id: str = None, token_canceled: TokenCancelCheck = None,
+                          on_queue: Callable[[], Awaitable] = None) -> list[dict]:
+	"""
+		Find faces on the image (file or downloaded bytes) by the recognition executor unless they are in the face cache.
+		The image is decoded once: the same downscaled copy is hashed for the cache and passed to the detector.
+		:param file_unique_id: Telegram file_unique_id of the image to skip even decoding of a resent file.
+		:param on_queue: Called before the image waits in the executor queue.
+	"""
+
+	if file_unique_id is not None:
+		faces = await face_cache.get_by_file(file_unique_id)
+		if faces is not None:
+			return faces
+
+	pixels, scale = await asyncio.to_thread(load_image, image)
+	digest = pixels_digest(pixels)
+
+	faces = await face_cache.get(digest)
+	if faces is None:
+		if on_queue is not None and recognition_executor.busy:
+			await on_queue()
+
+		faces = await recognition_executor.submit(detect_faces, pixels, scale, token_canceled=token_canceled)
+
+	await face_cache.set(digest, faces, file_unique_id)
+	return faces
+
+
+async def find_faces_with_match(image: Path | bytes, msg: types.Message, token_canceled: TokenCancelCheck,
+                                file_unique_id: str = None) -> tuple[MatchResult | None, dict | None]:
+	"""
+		Find the only face on the image and the most similar clients.
+		Returns the match result (None if no client is found) and the face encoding with a float32 embedding,
+		or Nones if the message was edited with an error.
+		:param file_unique_id: Telegram file_unique_id of the image for the face cache.
+	"""
+
+	async def show_queue():
+		await msg.edit_text(f'⏳ Фотография в очереди на распознавание \({recognition_executor.queued + 1}\)\.',
+		                    reply_markup=cancel_keyboard(), parse_mode=ParseMode.MARKDOWN_V2)
 
-async def find_faces_with_match(image_path: Path, msg: types.Message, token_canceled: TokenCancelCheck) -> tuple[list[Client] | None, dict | None]:
 	try:
-		embeddings = find_faces(image_path)
+		embeddings = await recognise_faces(image, file_unique_id, token_canceled, on_queue=show_queue)
+	except InferenceQueueFull:
+		await msg.edit_text('Сейчас распознается слишком много фотографий\.\n'
+		                    'Попробуйте отправить фотографию через минуту\.',
+		                    reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
+		return None, None
+	except InferenceCanceled:
+		return None, None
 	except Exception as e:
 		logging.error(str(e))
 		await msg.edit_text('Произошла ошибка обработки фотографии\.\n'
@@ -80,18 +225,11 @@ async def find_faces_with_match(image_path: Path, msg: types.Message, token_canc
 	                    'Поиск совпадений в базе данных\. 🗄',
 	                    reply_markup=cancel_keyboard(), parse_mode=ParseMode.MARKDOWN_V2)
 
-	face = embeddings[0]
-
-	# Get known faces encoding
-	clients = await get_all_clients()
-	known_faces = [client.face_encoding for client in clients]
-
-	if await token_canceled():
-		return None, face
+	face = {**embeddings[0], 'embedding': np.asarray(embeddings[0]['embedding'], dtype=np.float32)}
 
 	# Compare with known faces
 	try:
-		results = compare_faces(known_faces, face)
+		clients_id, distances = await search_similar_clients(face['embedding'])
 	except Exception as e:
 		logging.error(str(e))
 		await msg.edit_text('Произошла ошибка сравнения лица в бд\.\n'
@@ -99,11 +237,18 @@ async def find_faces_with_match(image_path: Path, msg: types.Message, token_canc
 		                    reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
 		return None, None
 
-	# Extract matches
-	indexes = np.nonzero(results)[0]  # axe=0
-
 	# Clients with this face aren't found.
-	if len(indexes) == 0:
+	if len(clients_id) == 0:
 		return None, face  # Return only face encoding
 
-	return [clients[i] for i in indexes], face  # Return an array of clients and face encoding
+	thumbs = await get_clients_profile_paths(clients_id)
+
+	if await token_canceled():
+		return None, face
+
+	found = [(client_id, distance) for client_id, distance in zip(clients_id, distances) if client_id in thumbs]
+	if len(found) == 0:
+		return None, face
+
+	match = MatchResult(*zip(*found), [thumbs[client_id] for client_id, _ in found])
+	return match, face  # Return clients ordered by distance and face encoding
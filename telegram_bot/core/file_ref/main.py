@@ -0,0 +1,21 @@
+from aiogram import types
+
+
+class FileRef:
+	"""
+		Handle of a file sent to the bot kept in the FSM data instead of the whole types.Document:
+		the file is downloaded again by file_id, its bytes are buffered by file_unique_id.
+	"""
+
+	__slots__ = ('file_id', 'file_unique_id')
+
+	def __init__(self, file_id: str, file_unique_id: str):
+		self.file_id = file_id
+		self.file_unique_id = file_unique_id
+
+	@classmethod
+	def of(cls, file: 'types.Document | FileRef') -> 'FileRef':
+		if isinstance(file, FileRef):
+			return file
+
+		return cls(file.file_id, file.file_unique_id)
@@ -3,7 +3,8 @@ from typing import Any
 from aiogram import types
 from aiogram.filters import BaseFilter
 
-from core.database.methods.user import check_if_admin, check_if_moderator, update_username, check_if_moderator_or_admin
+from core.database.methods.user import check_if_admin, check_if_moderator, check_if_moderator_or_admin
+from core.misc.username_tracker import username_tracker
 
 
 class IsModeratorMessageFilter(BaseFilter):
@@ -11,7 +12,7 @@ class IsModeratorMessageFilter(BaseFilter):
 		if not await check_if_moderator(msg.chat.id):
 			return False
 
-		await update_username(msg.chat.id, msg.from_user.username)
+		username_tracker.track(msg.chat.id, msg.from_user.username)
 		return True
 
 
@@ -28,7 +29,7 @@ class IsAdminMessageFilter(BaseFilter):
 		if not await check_if_admin(msg.chat.id):
 			return False
 
-		await update_username(msg.chat.id, msg.from_user.username)
+		username_tracker.track(msg.chat.id, msg.from_user.username)
 		return True
 
 
@@ -45,7 +46,7 @@ class IsAdminOrModeratorMessageFilter(BaseFilter):
 		if not await check_if_moderator_or_admin(msg.chat.id):
 			return False
 
-		await update_username(msg.chat.id, msg.from_user.username)
+		username_tracker.track(msg.chat.id, msg.from_user.username)
 		return True
 
 
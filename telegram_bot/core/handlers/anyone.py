@@ -2,15 +2,14 @@ from aiogram import Router, F, types
 from aiogram.enums import ContentType, ParseMode
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
-from aiogram.types import FSInputFile
 
-from core.database.methods.image import get_image_by_id
 from core.face_recognition import find_faces_with_match
+from core.file_ref import FileRef
 from core.handlers.utils import download_image_document, change_msg, handler_with_token, TokenCancelCheck
 from core.keyboards.inline import anyone_start_menu, cancel_keyboard
 from core.state_machines import AnyoneMenu
 from core.state_machines.clearing import clear_all_in_one
-from core.state_machines.fields import CHECK_FACE_TOKEN, TEMP_PATH_FIELD
+from core.state_machines.fields import CHECK_FACE_TOKEN, TEMP_IMAGE_FIELD
 from core.text import send_me_image
 
 anyone_router = Router()
@@ -48,14 +47,14 @@ async def check_if_exist_face(msg: types.Message, state: FSMContext, token_cance
 	""" Validate and download the provided file. Find a face on it and check if it exists in db. """
 
 	# Download image from the message
-	image_path, message = await download_image_document(msg, state, token_canceled, additional_text='Поиск лица на фотографии\. 🔎')
+	image, message = await download_image_document(msg, state, token_canceled, additional_text='Поиск лица на фотографии\. 🔎')
 
-	if image_path is None or await token_canceled():
+	if image is None or await token_canceled():
 		return
 
-	await state.update_data({TEMP_PATH_FIELD: image_path})
+	await state.update_data({TEMP_IMAGE_FIELD: FileRef.of(msg.document)})
 
-	clients, encoding = await find_faces_with_match(image_path, message, token_canceled)
+	match, encoding = await find_faces_with_match(image, message, token_canceled, msg.document.file_unique_id)
 
 	if await token_canceled():
 		return
@@ -65,17 +64,14 @@ async def check_if_exist_face(msg: types.Message, state: FSMContext, token_cance
 
 	await state.update_data(face_encoding=encoding)
 
-	if clients is None:
+	if match is None:
 		await message.edit_text('Нет в базе\!',
 		                        reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
 		return
 
-	if len(clients) == 1:  # Found 1 face
-		client = clients[0]
-		profile_picture = await get_image_by_id(client.profile_picture_id)
-
+	if len(match) == 1:  # Found 1 face
 		await change_msg(
-			message.answer_photo(FSInputFile(profile_picture.path), caption=f'*id в базе:* `{client.id}`',
+			message.answer_photo(match.thumb_media(0), caption=f'*id в базе:* `{match.clients_id[0]}`',
 			                     reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2),
 			state
 		)
@@ -1,6 +1,6 @@
 from aiogram import Dispatcher, Router
 
-from core.middlewares import DropEmptyButtonMiddleware, ThrottlingMiddleware
+from core.middlewares import DropEmptyButtonMiddleware, ThrottlingMiddleware, StateBufferMiddleware
 from . import moderator_router, admin_router, admin_moderator_router, anyone_router
 
 
@@ -10,6 +10,11 @@ def register_all_handlers(dp: Dispatcher) -> None:
 	# Keep order
 	main_router.include_routers(admin_router, moderator_router, admin_moderator_router, anyone_router)
 
+	# State changes of a handler are written once after it
+	state_buffer_middleware = StateBufferMiddleware()
+	main_router.message.outer_middleware(state_buffer_middleware)
+	main_router.callback_query.outer_middleware(state_buffer_middleware)
+
 	throttling_middleware = ThrottlingMiddleware()
 	main_router.callback_query.outer_middleware(throttling_middleware)
 	main_router.shutdown.register(throttling_middleware.close)  # Close storage
@@ -8,16 +8,18 @@ from aiogram.fsm.context import FSMContext
 
 from core.config import PHONE_NUMBER_REGION
 from core.database.methods.client import client_have_visit, delete_client
-from core.database.methods.image import create_image_from_path
+from core.database.methods.image import create_image
 from core.database.methods.service import create_visit_service
 from core.database.methods.user import get_tg_user_location, check_if_admin
 from core.database.methods.video import create_video_from_path
 from core.database.methods.visit import create_visit, update_visit_name, update_visit_social_media
 from core.database.methods.visit.update import update_visit_phone_number
+from core.face_recognition import add_image_face
 from core.handlers.shared import show_client
 from core.handlers.shared.recogniser import return2start_menu
 from core.handlers.utils import change_msg, download_image_document, download_video, handler_with_token, TokenCancelCheck
 from core.keyboards.inline import add_visit_info_kb, cancel_keyboard, add_visit_kb, yes_no_cancel
+from core.misc.image_buffers import image_buffers
 from core.env import TgKeys
 from core.state_machines import SharedMenu
 from core.state_machines.clearing import cancel_all_tokens
@@ -268,28 +270,37 @@ async def add_visit_service(msg: types.Message, state: FSMContext):
 async def add_visit_images(msg: types.Message, state: FSMContext, token_canceled: TokenCancelCheck):
 	""" Add visit images """
 
-	image_path, message = await download_image_document(msg, state, token_canceled, additional_text='Загрузка изображения на фото хостинг 🔗')
-	if image_path is None or await token_canceled():
-		return
-
-	state_data = await state.get_data()
-	visit_id = state_data.get('visit_id')
-
 	try:
-		await create_image_from_path(image_path, visit_id)
-		await alert2admins(msg.bot, msg.from_user, state)
-	except Exception as e:
-		logging.error(str(e))
-		await change_msg(
-			msg.reply('Не удалось загрузить на хостинг\! 😟\n\n' + add_image_text(),
-			          reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2),
-			state
-		)
-		return
-
-	await message.edit_text('Фотография загружена\!\n'
-	                        'Отправьте ещё или нажмите назад\.',
-	                        reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
+		image, message = await download_image_document(msg, state, token_canceled, additional_text='Загрузка изображения на фото хостинг 🔗')
+		if image is None or await token_canceled():
+			return
+
+		state_data = await state.get_data()
+		visit_id = state_data.get('visit_id')
+
+		try:
+			stored_image = await create_image(image, msg.document.file_unique_id, visit_id)
+			await alert2admins(msg.bot, msg.from_user, state)
+		except Exception as e:
+			logging.error(str(e))
+			await change_msg(
+				msg.reply('Не удалось загрузить на хостинг\! 😟\n\n' + add_image_text(),
+				          reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2),
+				state
+			)
+			return
+
+		await message.edit_text('Фотография загружена\!\n'
+		                        'Отправьте ещё или нажмите назад\.',
+		                        reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
+
+		# The client face on the visit photo improves matching of the client
+		try:
+			await add_image_face(state_data.get('client_id'), stored_image.id, image, msg.document.file_unique_id)
+		except Exception as e:
+			logging.error(f'Cannot add a face of the image {stored_image.id}: {e}')
+	finally:
+		image_buffers.pop(msg.document.file_unique_id)  # Stored or dropped, the photo is not needed
 
 
 # /start -> 'check_face' -> face found -> 'add_visit' -> 'add_videos'
@@ -2,19 +2,21 @@ from aiogram import F, Router, types
 from aiogram.enums import ContentType, ParseMode
 from aiogram.filters import or_f
 from aiogram.fsm.context import FSMContext
-from aiogram.types import FSInputFile
+from aiogram.types import BufferedInputFile
 
 from core.callback_factory import PaginatorFactory
-from core.database.methods.client import create_client, get_client, load_clients_profile_images
+from core.database.methods.client import create_client, get_client
 from core.database.methods.user import check_if_admin, check_if_moderator
 from core.env import TgKeys
 from core.face_recognition import find_faces_with_match
+from core.file_ref import FileRef
 from core.handlers.shared import notify_admins, show_client, show_clients_choosing
 from core.handlers.utils import TokenCancelCheck, change_msg, download_image_document, handler_with_token
 from core.keyboards.inline import add_visit_kb, admin_start_menu, anyone_start_menu, moderator_start_menu, yes_no_cancel
+from core.misc.image_buffers import image_buffers
 from core.state_machines import AdminMenu, AnyoneMenu, ModeratorMenu, SharedMenu
 from core.state_machines.clearing import clear_all_in_one, clear_gallery
-from core.state_machines.fields import CHECK_FACE_TOKEN, TEMP_PATH_FIELD
+from core.state_machines.fields import CHECK_FACE_TOKEN, TEMP_IMAGE_FIELD, CREATING_CLIENT_FIELD
 from core.text import face_info_text
 from core.text.admin import hi_admin_text
 from core.text.moderator import hi_moderator_text
@@ -38,22 +40,22 @@ async def check_face(msg: types.Message, state: FSMContext, token_canceled: Toke
 			msg2admins = await msg.forward(TgKeys.ADMIN_GROUP_ID)
 		except:
 			return await msg.bot.send_document(chat_id=TgKeys.ADMIN_GROUP_ID,
-			                                   document=FSInputFile(image_path),
+			                                   document=BufferedInputFile(image, msg.document.file_name or 'photo.jpg'),
 			                                   caption=text,
 			                                   parse_mode=ParseMode.MARKDOWN_V2)
 
 		return await msg2admins.reply(text, parse_mode=ParseMode.MARKDOWN_V2)
 
 	# Download image from the message
-	image_path, message = await download_image_document(msg, state, token_canceled, additional_text='Поиск лица на фотографии\. 🔎')
+	image, message = await download_image_document(msg, state, token_canceled, additional_text='Поиск лица на фотографии\. 🔎')
 
-	if image_path is None or await token_canceled():
+	if image is None or await token_canceled():
 		return
 
-	await state.update_data({TEMP_PATH_FIELD: image_path})
+	await state.update_data({TEMP_IMAGE_FIELD: FileRef.of(msg.document)})
 
 	# Find face on image and compare with faces in db
-	clients, encoding = await find_faces_with_match(image_path, message, token_canceled)
+	match, encoding = await find_faces_with_match(image, message, token_canceled, msg.document.file_unique_id)
 
 	if await token_canceled():
 		return
@@ -64,7 +66,7 @@ async def check_face(msg: types.Message, state: FSMContext, token_canceled: Toke
 		return
 
 	# Face not found in db
-	if clients is None:
+	if match is None:
 		await notify_admins(f'Модератор `{msg.from_user.username}` \({msg.from_user.id}\) отправил фото для поиска в бд\.\n'
 		                    f'Такого лица нет в базе данных\!\n'
 		                    f'Модератору предложено добавить нового человека\.')
@@ -77,14 +79,12 @@ async def check_face(msg: types.Message, state: FSMContext, token_canceled: Toke
 		                        reply_markup=yes_no_cancel(None), parse_mode=ParseMode.MARKDOWN_V2)
 		return
 
-	# Get the list of possible clients by their ids and update check_face_token
-	clients = await load_clients_profile_images(clients)
-
-	await state.update_data(face_encoding=encoding, possible_clients=clients)
+	# Only ids, distances and profile pictures of the possible clients are kept in the state
+	await state.update_data(face_encoding=encoding, possible_clients=match)
 	await state.set_state(SharedMenu.CHOOSE_FACE)
 
 	await notify_admins(f'Модератор `{msg.from_user.username}` \({msg.from_user.id}\) отправил фото для поиска в бд\.\n'
-	                    f'В базе данных найдено {len(clients)} похожих лиц\!\n'
+	                    f'В базе данных найдено {len(match)} похожих лиц\!\n'
 	                    f'Модератору предложен выбор\.')
 	await show_clients_choosing(message, state)
 
@@ -136,16 +136,17 @@ async def add_new_client(callback: types.CallbackQuery, state: FSMContext):
 		case 'yes':
 			state_data = await state.get_data()
 
-			if state_data.get('creating_client', False):
+			if await state.get_value(CREATING_CLIENT_FIELD, False):
 				await callback.answer('Подождите, клиент создается.')
 				return
 
-			await state.update_data(creating_client=True)
+			await state.update_data({CREATING_CLIENT_FIELD: True})
 
-			face_path_temp = state_data.get(TEMP_PATH_FIELD)
 			face_encoding = state_data.get('face_encoding')
+			file: FileRef = state_data.get(TEMP_IMAGE_FIELD)
+			image = await image_buffers.load(callback.bot, file)
 
-			client = await create_client(face_path_temp, face_encoding)
+			client = await create_client(image, face_encoding, file.file_unique_id)
 
 			await notify_admins(callback, state, client=client)
 
@@ -156,7 +157,7 @@ async def add_new_client(callback: types.CallbackQuery, state: FSMContext):
 			keyboard = await add_visit_kb(user_id=callback.from_user.id)
 			await show_client(callback.message, state, reply_markup=keyboard)
 
-			await state.update_data(creating_client=False)
+			await state.update_data({CREATING_CLIENT_FIELD: False})
 
 
 # /start -> 'check_face' -> document provided -> found some faces
@@ -7,15 +7,17 @@ from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.types import FSInputFile, InputMediaPhoto
 
-from core.database.methods.image import get_client_images
+from core.database.methods.client import get_client_profile
 from core.database.models import Client, Image
 from core.handlers.utils import change_msg
 from core.keyboards.inline import cancel_keyboard
 from core.keyboards.inline.shared import select_clients_kb
 from core.env import TgKeys
+from core.face_recognition import match_confidence
+from core.match_result import MatchResult
+from core.message_ref import MessageRef
 from core.state_machines import SharedMenu
 from core.state_machines.clearing import clear_gallery
-from core.state_machines.fields import TEMP_PATH_FIELD
 from core.text import face_info_text
 from core.text.utils import escape_markdown_v2
 
@@ -33,7 +35,8 @@ async def show_client(msg: types.Message, state: FSMContext,
 	client_images: list[Image] = state_data.get('client_images')
 
 	if client_images is None:
-		client_images = await get_client_images(client_id, limit=10)
+		profile = await get_client_profile(client_id)
+		client_images = profile.images[:10] if profile is not None else []
 		await state.update_data(client_images=client_images)
 
 	if text is None:
@@ -46,7 +49,7 @@ async def show_client(msg: types.Message, state: FSMContext,
 		media_msg = await msg.answer_media_group([
 			InputMediaPhoto(media=FSInputFile(img.path)) for img in client_images
 		])
-		await state.update_data(face_gallery_msg=media_msg)
+		await state.update_data(face_gallery_msg=[MessageRef.of(m) for m in media_msg])
 
 		await change_msg(
 			msg.answer(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN_V2),
@@ -84,8 +87,8 @@ async def show_clients_choosing(msg: types.Message, state: FSMContext,
 	if page is None:
 		page: int = state_data.get('page', 0)
 
-	clients: list[Client] = state_data.get('possible_clients')
-	if clients is None:
+	match: MatchResult | None = state_data.get('possible_clients')
+	if match is None:
 		await change_msg(
 			msg.answer('Что-то пошло не так, повторите попытку\.\n'
 			           'Приносим свои извинения за неудобство 😣',
@@ -94,22 +97,29 @@ async def show_clients_choosing(msg: types.Message, state: FSMContext,
 		)
 		return
 
+	confidence = [match_confidence(distance) for distance in match.distances]
+
 	if delete_gallery:
-		clients2show = clients[page * COLS * ROWS: (page + 1) * COLS * ROWS]
+		page_indexes = range(len(match))[page * COLS * ROWS:(page + 1) * COLS * ROWS]
 
 		try:
 			media_msg = await msg.answer_media_group([
 				InputMediaPhoto(
-					media=FSInputFile(client.profile_picture.path),
-					caption=f'· {client.id} ·',
+					media=match.thumb_media(i),
+					caption=f'· {match.clients_id[i]} · {confidence[i]}% ·',
 					parse_mode=ParseMode.MARKDOWN_V2
-				) for client in clients2show
+				) for i in page_indexes
 			])
-			await state.update_data(face_gallery_msg=media_msg)
+
+			# Next time the pictures are sent by file_id without uploading
+			for i, sent in zip(page_indexes, media_msg):
+				match.file_ids[i] = sent.photo[-1].file_id
+
+			await state.update_data(face_gallery_msg=[MessageRef.of(m) for m in media_msg], possible_clients=match)
 		except TelegramBadRequest as e:
 			logging.warning(f'Cannot send image {e.message}')
 
-			clients_id = [str(client.id) for client in clients2show]
+			clients_id = [str(match.clients_id[i]) for i in page_indexes]
 			await msg.bot.send_message(TgKeys.ADMIN_GROUP_ID,
 			                           f'Произошла ошибка при отправке галереи из клиентов `{"`, `".join(clients_id)}`\!\n' +
 			                           escape_markdown_v2('Лимиты телеграмм: https://core.telegram.org/bots/api#sending-files'),
@@ -126,7 +136,7 @@ async def show_clients_choosing(msg: types.Message, state: FSMContext,
 	await change_msg(
 		msg.answer('Выберите этого человека из нескольких распознанных выше\.\n'
 		           'Если такого человека нет \- нажмите добавить нового',
-		           reply_markup=select_clients_kb(clients, page, cols=COLS, rows=ROWS), parse_mode=ParseMode.MARKDOWN_V2),
+		           reply_markup=select_clients_kb(match.clients_id, page, confidence, cols=COLS, rows=ROWS), parse_mode=ParseMode.MARKDOWN_V2),
 		state
 	)
 
@@ -151,26 +161,26 @@ async def notify_admins(clb: types.CallbackQuery, state: FSMContext, **kwargs):
 	match await state.get_state():
 		case SharedMenu.NOT_CHOSEN:
 			client: Client = kwargs.get('client')
-			face_path_temp = client.profile_picture.path or state_data.get(TEMP_PATH_FIELD)
-			clients: list[Client] = state_data.get('possible_clients')
+			face_path = client.profile_picture.path
+			match: MatchResult | None = state_data.get('possible_clients')
 
-			if isinstance(clients, list) and 0 < len(clients) <= 10:
-				await safe_send_photo(face_path_temp, f"{user_str} создал нового клиента `{client.id}` при выборе:")
+			if isinstance(match, MatchResult) and 0 < len(match) <= 10:
+				await safe_send_photo(face_path, f"{user_str} создал нового клиента `{client.id}` при выборе:")
 
 				await clb.bot.send_media_group(
 					TgKeys.ADMIN_GROUP_ID,
 					media=[InputMediaPhoto(
-						media=FSInputFile(client.profile_picture.path),
-						caption=f'id: `{client.id}`',
+						media=match.thumb_media(i),
+						caption=f'id: `{client_id}`',
 						parse_mode=ParseMode.MARKDOWN_V2
-					) for client in clients]
+					) for i, client_id in enumerate(match.clients_id)]
 				)
 			else:
-				all_clients_str = ('`' + '`, `'.join([clients]) + '`') if clients else 'данные не сохранились'
-				await safe_send_photo(face_path_temp, f'{user_str} создал нового клиента `{client.id}` при выборе:\n{all_clients_str}')
+				all_clients_str = ('`' + '`, `'.join(map(str, match.clients_id)) + '`') if match else 'данные не сохранились'
+				await safe_send_photo(face_path, f'{user_str} создал нового клиента `{client.id}` при выборе:\n{all_clients_str}')
 
 		case SharedMenu.NOT_FOUND:
 			client: Client = kwargs.get('client')
-			face_path_temp = client.profile_picture.path or state_data.get(TEMP_PATH_FIELD)
-			await safe_send_photo(face_path_temp, f'Такое лицо не было найдено в базе данных\n'
+			face_path = client.profile_picture.path
+			await safe_send_photo(face_path, f'Такое лицо не было найдено в базе данных\n'
 			                                      f'{user_str} добавил такое лицо в базу данных')
@@ -1,19 +1,21 @@
-import asyncio
 import functools
 import logging
 from pathlib import Path
 from typing import Callable, Awaitable
 
-from PIL import Image, UnidentifiedImageError, ImageOps, ImageFile
+from PIL import UnidentifiedImageError, ImageFile
 from aiogram import types, methods
 from aiogram.enums import ParseMode
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from pillow_heif import register_heif_opener
 
 from core.cancel_token import CancellationToken
 from core.config import SUPPORTED_IMAGE_TYPES, TEMP_DIR, SUPPORTED_VIDEO_TYPES
 from core.keyboards.inline import cancel_keyboard
+from core.message_ref import MessageRef, message_cleaner
+from core.misc.image_buffers import image_buffers
+from core.misc.locks import message_locks
+from core.misc.images import open_image
 from core.state_machines.clearing import clear_all_in_one, cancel_token, complete_token
 from core.state_machines.fields import LAST_MESSAGE_FIELD
 from core.text import file_downloaded
@@ -23,12 +25,9 @@ register_heif_opener()
 
 TokenCancelCheck = Callable[[], Awaitable[bool]]
 
-change_msg_lock = asyncio.Lock()
-
 
 async def token_is_canceled(token: CancellationToken, token_name: str, state: FSMContext) -> bool:
-	state_data = await state.get_data()
-	t: CancellationToken = state_data.get(token_name)
+	t: CancellationToken = await state.get_value(token_name)
 	return t != token or t.canceled
 
 
@@ -37,10 +36,9 @@ def handler_with_token(token_name: str):
 		@functools.wraps(func)
 		async def wrapper(*args, **kwargs):
 			state: FSMContext = kwargs['state']
-			state_data = await state.get_data()
 
 			# Check if token completed otherwise cancel it
-			token: CancellationToken = state_data.get(token_name)
+			token: CancellationToken = await state.get_value(token_name)
 			if token is not None and not token.completed:
 				await cancel_token(state, token_name)
 
@@ -68,9 +66,10 @@ def handler_with_token(token_name: str):
 async def download_media(msg: types.Message, state: FSMContext,
                          media: types.Video | types.Document,
                          supported_types: dict[str, str],
-                         token_canceled: TokenCancelCheck) -> tuple[Path | None, types.Message]:
+                         token_canceled: TokenCancelCheck,
+                         *, to_memory=False) -> tuple[Path | bytes | None, types.Message]:
 	"""
-		Download the document from the msg.
+		Download the document from the msg to TEMP_DIR or to memory (to_memory, returns bytes).
 		Cancellation token for stop downloading.
 		Editable message for alarm if it can't be downloaded.
 		Media parameter must have the following attributes: mime_type, file_unique_id, file_id
@@ -100,14 +99,21 @@ async def download_media(msg: types.Message, state: FSMContext,
 		state
 	)
 
+	if await token_canceled():
+		return None, message
+
+	if to_memory:
+		data = (await msg.bot.download(media)).getvalue()
+		if await token_canceled():
+			return None, message
+
+		return data, message
+
 	TEMP_DIR.mkdir(exist_ok=True)  # Create temporary directory
 
 	filename = media.file_unique_id + file_suffix
 	document_path = TEMP_DIR / filename
 
-	if await token_canceled():
-		return None, message
-
 	# Download media
 	await msg.bot.download(media, document_path)
 
@@ -127,10 +133,11 @@ async def download_media(msg: types.Message, state: FSMContext,
 
 
 async def download_image_document(msg: types.Message, state: FSMContext, token_canceled: TokenCancelCheck,
-                                  *, additional_text=None, success_keyboard=cancel_keyboard()) -> tuple[Path | None, types.Message]:
+                                  *, additional_text=None, success_keyboard=cancel_keyboard()) -> tuple[bytes | None, types.Message]:
 	"""
-		Download the document from msg to TEMP_DIR, check if it is an image and validate its resolution.
-		Returns a path to image and editable message.
+		Download the document from msg to memory, check if it is an image and validate its resolution.
+		Returns the image bytes (also kept in image_buffers by file_unique_id) and editable message.
+		Nothing is written to disk: the image is decoded for recognition and stored only if it is saved to db.
 		If the task is canceled or errors have occurred, it returns None.
 	"""
 
@@ -142,51 +149,43 @@ async def download_image_document(msg: types.Message, state: FSMContext, token_c
 		)
 		return None, message
 
-	document_path, message = await download_media(msg, state, msg.document, SUPPORTED_IMAGE_TYPES, token_canceled)
+	data, message = await download_media(msg, state, msg.document, SUPPORTED_IMAGE_TYPES, token_canceled, to_memory=True)
+	if data is None:
+		return None, message
 
-	# Check image resolution
+	# Check image resolution (only the header is read)
 	try:
-		image = Image.open(document_path)
-		w, h = image.size
-
-		if w + h > 10000:
-			await message.edit_text('Ширина и высота фотографии в сумме не должны превышать 10000\!',
-			                        reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
-			document_path.unlink(missing_ok=True)
-			return None, message
-
-		if max(w, h) / min(w, h) > 20:
-			await message.edit_text('Соотношение высоты к ширине не должно превышать 20\.',
-			                        reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
-
-			document_path.unlink(missing_ok=True)
-			return None, message
-
-		# Transpose image by exif data
-		ImageOps.exif_transpose(image, in_place=True)
-		image.save(document_path)
-		image.close()
-
+		with open_image(data) as image:
+			w, h = image.size
 	except UnidentifiedImageError as e:
-		logging.warning(f'Open image occurred an error: {document_path} - {e}')
+		logging.warning(f'Open image occurred an error: {msg.document.file_name} - {e}')
 		await message.edit_text('Файл повреждён и не может быть обработан\!\n'
 		                        'Попробуйте другую отправить фотографию\.',
 		                        reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
+		return None, message
 
-		document_path.unlink(missing_ok=True)
+	if w + h > 10000:
+		await message.edit_text('Ширина и высота фотографии в сумме не должны превышать 10000\!',
+		                        reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
+		return None, message
+
+	if max(w, h) / min(w, h) > 20:
+		await message.edit_text('Соотношение высоты к ширине не должно превышать 20\.',
+		                        reply_markup=cancel_keyboard('Назад'), parse_mode=ParseMode.MARKDOWN_V2)
 		return None, message
 
 	if await token_canceled():
-		document_path.unlink(missing_ok=True)
 		return None, message
 
+	image_buffers.put(msg.document.file_unique_id, data)
+
 	text = file_downloaded()
 	if additional_text is not None:
 		text += f'\n{additional_text}'
 
 	await message.edit_text(text, reply_markup=success_keyboard, parse_mode=ParseMode.MARKDOWN_V2)
 
-	return document_path, message
+	return data, message
 
 
 async def download_video(msg: types.Message, state: FSMContext, token_canceled: TokenCancelCheck,
@@ -224,20 +223,15 @@ async def change_msg(awaitable_msg: methods.TelegramMethod[types.Message], state
 		If clear_state is True, then state.clear()
 	"""
 
-	async with change_msg_lock:
-		state_data = await state.get_data()
-
-		last_msg: types.Message = state_data.get(LAST_MESSAGE_FIELD)
+	async with message_locks(state.key):
+		last_msg: MessageRef | None = await state.get_value(LAST_MESSAGE_FIELD)
 		if last_msg is not None:
-			try:
-				await last_msg.delete()
-			except TelegramBadRequest as e:
-				logging.warning(f'Exception during delete last message: {e.message}')
+			message_cleaner.schedule([last_msg])
 
 		if clear_state:
 			await clear_all_in_one(state, clear_state=True)
 
 		msg = await awaitable_msg
-		await state.update_data({LAST_MESSAGE_FIELD: msg})
+		await state.update_data({LAST_MESSAGE_FIELD: MessageRef.of(msg)})
 
 	return msg
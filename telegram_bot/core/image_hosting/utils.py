@@ -2,9 +2,10 @@ from pathlib import Path
 import shutil
 from typing import Any
 
-from PIL import Image, ImageFile
+from PIL import Image, ImageFile, ImageOps
 from pillow_heif import register_heif_opener
 
+from core.misc.images import is_rotated, open_image
 from core.misc.utils import get_available_filepath, prepare_path
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
@@ -33,5 +34,19 @@ def store_image(path: str | Path, dir2copy: str | Path, base_name: str = None) -
 	return new_path
 
 
+def store_image_bytes(data: bytes, dir2copy: str | Path, base_name: str) -> Path:
+	""" Write a downloaded image to media folder as JPEG (re-encoded only if it isn't a JPEG or is rotated by EXIF) """
+
+	new_path = get_available_filepath(dir2copy, base_name, '.jpg')
+
+	with open_image(data) as img:
+		if img.format == 'JPEG' and not is_rotated(img):
+			new_path.write_bytes(data)
+		else:
+			ImageOps.exif_transpose(img).convert('RGB').save(new_path, 'JPEG')
+
+	return new_path
+
+
 def parse_response(response: dict) -> dict[str, Any]:
 	return response.get('data')
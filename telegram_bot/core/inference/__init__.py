@@ -0,0 +1,2 @@
+from .main import detect_faces, find_faces, find_faces_batch, load_image, load_models, warm_up, warm_worker
+from .executor import InferenceCanceled, InferenceQueueFull, RecognitionExecutor, recognition_executor
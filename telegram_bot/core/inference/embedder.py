@@ -0,0 +1,50 @@
+import logging
+from typing import Sequence
+
+import deepface
+import numpy as np
+from deepface import DeepFace
+
+from core.config import MODEL
+
+BATCH_DEEPFACE_VERSION = '0.0.95'  # Batched represent is used only with this deepface version (requirements.txt)
+
+_batched: bool | None = None  # Batched represent works, checked on the first call
+
+
+def embed_faces(faces: Sequence[np.ndarray], model_name: str = MODEL) -> list[np.ndarray]:
+	"""
+		Embeddings of aligned faces (RGB, as DeepFace.extract_faces returns them), the only place that batches DeepFace.
+		The faces go to DeepFace.represent at once with detector_backend='skip': it preprocesses them as single faces
+		and runs one forward pass. With another deepface version, or if the batch call breaks,
+		every face is represented on its own.
+	"""
+
+	global _batched
+
+	if _batched is None:
+		_batched = getattr(deepface, '__version__', None) == BATCH_DEEPFACE_VERSION
+		if not _batched:
+			logging.warning(f'deepface {getattr(deepface, "__version__", None)} is not {BATCH_DEEPFACE_VERSION}: '
+			                f'faces are embedded one by one')
+
+	images = [face[:, :, ::-1] for face in faces]  # represent takes BGR images
+
+	if _batched and len(images) > 1:
+		try:
+			results = DeepFace.represent(images, model_name=model_name, detector_backend='skip', enforce_detection=False)
+			embeddings = [np.asarray(result[0]['embedding'], dtype=np.float32) for result in results]
+			if len(embeddings) != len(images):
+				raise ValueError(f'{len(embeddings)} embeddings are returned for {len(images)} faces')
+
+			return embeddings
+		except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+			logging.warning(f'Batched DeepFace.represent failed, faces are embedded one by one: {e}')
+			_batched = False
+
+	return [_embed_face(image, model_name) for image in images]
+
+
+def _embed_face(image: np.ndarray, model_name: str) -> np.ndarray:
+	result, = DeepFace.represent(image, model_name=model_name, detector_backend='skip', enforce_detection=False)
+	return np.asarray(result['embedding'], dtype=np.float32)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.queues
+import queue
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable
+
+from core.config import INFERENCE_EXECUTOR, INFERENCE_QUEUE_SIZE, INFERENCE_WORKERS
+from core.inference.main import warm_worker
+
+_CANCEL_POLL_INTERVAL = .5  # How often a waiting job checks its cancellation token (sec)
+
+
+class InferenceQueueFull(Exception):
+	""" Too many photos are waiting for recognition """
+
+
+class InferenceCanceled(Exception):
+	""" Job was dropped because its cancellation token was canceled """
+
+
+class RecognitionExecutor:
+	"""
+		Runs face inference out of the event loop.
+		Every worker loads its own copy of the models and runs a dummy inference before its first job (warm_worker initializer).
+		Jobs wait in a bounded queue for a free worker; when the queue is full submit raises InferenceQueueFull.
+		A job whose token is canceled is removed from the queue, a running job is abandoned and its result is ignored.
+		:param kind: 'thread' or 'process' pool.
+		:param workers: Number of parallel inferences.
+		:param max_queue: Max jobs waiting for a worker.
+	"""
+
+	def __init__(self, kind: str = INFERENCE_EXECUTOR, workers: int = INFERENCE_WORKERS, max_queue: int = INFERENCE_QUEUE_SIZE):
+		if kind not in ('thread', 'process'):
+			raise ValueError(f'Unknown inference executor: {kind}')
+
+		self.kind = kind
+		self.workers = workers
+		self.max_queue = max_queue
+
+		self._executor: Executor | None = None
+		self._timings: queue.SimpleQueue | multiprocessing.queues.SimpleQueue | None = None  # Warm-up time of every worker
+		self._pending = 0  # submitted and not finished jobs (running + queued)
+		self.ready = False  # Every worker has warm models
+
+	@property
+	def started(self) -> bool:
+		return self._executor is not None
+
+	@property
+	def busy(self) -> bool:
+		""" New jobs will wait in the queue """
+
+		return self._pending >= self.workers
+
+	@property
+	def queued(self) -> int:
+		""" Number of jobs waiting for a worker """
+
+		return max(self._pending - self.workers, 0)
+
+	def start(self) -> None:
+		if self.started:
+			return
+
+		if self.kind == 'process':
+			# spawn: do not fork the event loop and TensorFlow state of the bot process
+			context = multiprocessing.get_context('spawn')
+			self._timings = context.SimpleQueue()
+			self._executor = ProcessPoolExecutor(self.workers, mp_context=context,
+			                                     initializer=warm_worker, initargs=(self._timings,))
+		else:
+			self._timings = queue.SimpleQueue()
+			self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='inference',
+			                                    initializer=warm_worker, initargs=(self._timings,))
+
+		logging.info(f'Recognition executor started: {self.workers} {self.kind} workers, queue of {self.max_queue} jobs')
+
+	async def warm_up(self) -> None:
+		""" Start all workers and wait until each of them is warm (warm_worker initializer) """
+
+		self.start()
+		tic = time.perf_counter()
+
+		# Workers are started on demand: a job per worker starts all of them, none is idle while it warms up
+		for _ in range(self.workers):
+			self._executor.submit(int)
+
+		timings = []
+		for _ in range(self.workers):
+			timing = await asyncio.to_thread(self._timings.get)
+			if isinstance(timing, Exception):
+				raise timing
+
+			timings.append(timing)
+
+		self.ready = True
+		logging.info(f'Recognition executor is ready in {time.perf_counter() - tic:.2f} sec '
+		             f'(first inference: {", ".join(f"{t:.2f}" for t in timings)} sec)')
+
+	async def shutdown(self) -> None:
+		if not self.started:
+			return
+
+		self.ready = False
+		executor, self._executor = self._executor, None
+		await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+
+	async def submit(self, func: Callable[..., Any], *args, token_canceled: Callable[[], Awaitable[bool]] | None = None) -> Any:
+		"""
+			Run func(*args) in a worker and wait for the result.
+			:param func: Picklable (module level) function for the process pool.
+			:param token_canceled: Checked while the job waits, raises InferenceCanceled when it returns True.
+		"""
+
+		self.start()
+
+		if self._pending >= self.workers + self.max_queue:
+			raise InferenceQueueFull()
+
+		loop = asyncio.get_running_loop()
+
+		future: Future = self._executor.submit(func, *args)
+		self._pending += 1
+		future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._job_done))
+
+		result = asyncio.wrap_future(future)
+		try:
+			while not result.done():
+				await asyncio.wait((result,), timeout=_CANCEL_POLL_INTERVAL)
+
+				if not result.done() and token_canceled is not None and await token_canceled():
+					raise InferenceCanceled()
+		finally:
+			# Removes the job from the queue if it hasn't started yet
+			result.cancel()
+
+		return result.result()
+
+	def _job_done(self) -> None:
+		self._pending -= 1
+
+
+recognition_executor = RecognitionExecutor()
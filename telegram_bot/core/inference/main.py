@@ -0,0 +1,143 @@
+import logging
+import multiprocessing.queues
+import queue
+import time
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+from deepface import DeepFace
+
+from core.config import BACKEND, DETECTOR_MAX_SIDE, INFERENCE_BATCH_SIZE, MODEL
+from core.inference.embedder import embed_faces
+from core.misc.images import load_for_detection
+
+_WARM_UP_IMAGE_SIZE = 224
+
+
+def load_models() -> None:
+	""" Build MODEL and BACKEND in the current process (DeepFace caches them) """
+
+	tic = time.perf_counter()
+
+	DeepFace.build_model(MODEL, task='facial_recognition')
+	DeepFace.build_model(BACKEND, task='face_detector')
+
+	logging.info(f'Models {MODEL}/{BACKEND} loaded in {time.perf_counter() - tic:.2f} sec')
+
+
+def warm_up() -> float:
+	"""
+		Load the models and run a dummy inference (builds TF graphs), so the first photo is processed at full speed.
+		Returns the dummy inference time (sec).
+	"""
+
+	load_models()
+
+	tic = time.perf_counter()
+
+	# No face on a blank image, the whole image goes through MODEL
+	blank = np.zeros((_WARM_UP_IMAGE_SIZE, _WARM_UP_IMAGE_SIZE, 3), dtype=np.uint8)
+	DeepFace.represent(blank, model_name=MODEL, detector_backend=BACKEND, enforce_detection=False)
+
+	return time.perf_counter() - tic
+
+
+def warm_worker(timings: queue.SimpleQueue | multiprocessing.queues.SimpleQueue) -> None:
+	""" Initializer of the inference workers: warm up before the first job, put the warm-up time (or the error) to timings """
+
+	try:
+		timings.put(warm_up())
+	except Exception as e:
+		timings.put(e)
+		raise
+
+
+def load_image(image: Path | bytes, max_side: int = DETECTOR_MAX_SIDE) -> tuple[np.ndarray, float]:
+	""" Returns the working copy of the image file or bytes for detection and its scale to the original (see load_for_detection) """
+
+	return load_for_detection(image, max_side)
+
+
+def scale_facial_area(facial_area: dict, scale: float) -> dict:
+	""" Map the face box (and eyes) found on the working copy back to the original image """
+
+	if scale == 1:
+		return facial_area
+
+	scaled = {}
+	for key, value in facial_area.items():
+		if isinstance(value, (int, float)):
+			value = round(value * scale)
+		elif isinstance(value, (tuple, list)):
+			value = tuple(round(v * scale) for v in value)
+
+		scaled[key] = value
+
+	return scaled
+
+
+def find_faces(image: Path | bytes) -> list[dict]:
+	return detect_faces(*load_image(image))
+
+
+def detect_faces(img: np.ndarray, scale: float = 1) -> list[dict]:
+	""" Find faces on the decoded working copy of an image, boxes are scaled to the original image """
+
+	embeddings = DeepFace.represent(img, model_name=MODEL, detector_backend=BACKEND, enforce_detection=False)
+	embeddings = list(filter(lambda e: e['face_confidence'] > .75, embeddings))
+
+	for embedding in embeddings:
+		embedding['facial_area'] = scale_facial_area(embedding['facial_area'], scale)
+
+	return embeddings
+
+
+def find_faces_batch(image_paths: Sequence[Path], batch_size: int = INFERENCE_BATCH_SIZE) -> list[list[dict]]:
+	"""
+		Batched find_faces for bulk imports.
+		Faces are detected image by image, aligned crops are embedded by embed_faces per batch_size faces.
+		Returns faces of every image in the same order and format as DeepFace.represent.
+		An image that cannot be read gets an empty list.
+	"""
+
+	results: list[list[dict]] = []
+	faces: list[dict] = []  # faces waiting for embedding
+	crops: list[np.ndarray] = []
+
+	def embed_pending():
+		if not crops:
+			return
+
+		for face, embedding in zip(faces, embed_faces(crops), strict=True):
+			face['embedding'] = embedding.tolist()
+
+		faces.clear()
+		crops.clear()
+
+	for image_path in image_paths:
+		try:
+			img, scale = load_image(image_path)
+		except (OSError, ValueError) as e:
+			logging.error(f'Cannot read {image_path}: {e}')
+			results.append([])
+			continue
+
+		image_faces = []
+		for face_obj in DeepFace.extract_faces(img, detector_backend=BACKEND, enforce_detection=False):
+			if face_obj['confidence'] <= .75:
+				continue
+
+			crops.append(face_obj['face'])
+
+			face = {'facial_area': scale_facial_area(face_obj['facial_area'], scale), 'face_confidence': face_obj['confidence']}
+			faces.append(face)
+			image_faces.append(face)
+
+		results.append(image_faces)
+
+		if len(crops) >= batch_size:
+			embed_pending()
+
+	embed_pending()
+	return results
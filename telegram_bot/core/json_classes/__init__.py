@@ -1,2 +1,3 @@
 from .decoders import TGDecoder
 from .encoders import TGEncoder
+from .codec import StateCodec, state_codec
@@ -0,0 +1,142 @@
+import base64
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import orjson
+from aiogram import types
+from sqlalchemy import inspect
+
+from core.bots import bot
+from core.cancel_token import CancellationToken
+from core.database import models
+from core.file_ref import FileRef
+from core.match_result import MatchResult
+from core.message_ref import MessageRef
+from .decoders import TGDecoder
+
+TYPE_KEY = '__t'
+VALUE_KEY = '__v'
+
+
+class StateCodec:
+	"""
+		orjson codec of the FSM data with a registry of the stored types.
+		A registered object is written as {TYPE_KEY: tag, VALUE_KEY: value}, the value holds only what is needed
+		to rebuild the object (columns of a model, fields of a telegram object set). Plain data is parsed by orjson
+		without walking it: the loaded structure is walked only when the payload contains a tag.
+		Only a dict of exactly these two keys with a registered tag is decoded, other dicts are kept as they are.
+		Data written by TGEncoder (the "_type" objects) is read by TGDecoder rules.
+	"""
+
+	def __init__(self):
+		self._encoders: dict[type, tuple[str, Callable[[Any], Any]]] = {}
+		self._decoders: dict[str, Callable[[Any], Any]] = {}
+		self._legacy_hook = TGDecoder().object_hook
+
+	def register(self, cls: type, tag: str, encode: Callable[[Any], Any], decode: Callable[[Any], Any]) -> None:
+		""" Store instances of cls (and its subclasses) as encode(obj), decode(value) restores them """
+
+		self._encoders[cls] = tag, encode
+		self._decoders[tag] = decode
+
+	def dumps(self, value: Any) -> bytes:
+		return orjson.dumps(value, default=self._default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+	def loads(self, data: bytes | str) -> Any:
+		value = orjson.loads(data)
+
+		if isinstance(data, str):
+			data = data.encode()
+
+		if f'"{TYPE_KEY}"'.encode() in data or b'"_type"' in data:
+			return self._decode(value)
+
+		return value
+
+	def _default(self, o: Any) -> Any:
+		for cls in type(o).__mro__:
+			if cls in self._encoders:
+				tag, encode = self._encoders[cls]
+				return {TYPE_KEY: tag, VALUE_KEY: encode(o)}
+
+		if isinstance(o, np.generic):
+			return o.item()
+
+		raise TypeError(f'Type is not serializable: {type(o).__name__}')
+
+	def _decode(self, value: Any) -> Any:
+		if isinstance(value, list):
+			return [self._decode(item) for item in value]
+
+		if not isinstance(value, dict):
+			return value
+
+		if len(value) == 2 and VALUE_KEY in value and isinstance(tag := value.get(TYPE_KEY), str) and tag in self._decoders:
+			return self._decoders[tag](self._decode(value[VALUE_KEY]))
+
+		value = {k: self._decode(v) for k, v in value.items()}
+		return self._legacy_hook(value) if '_type' in value else value
+
+
+def _encode_telegram_object(o: types.TelegramObject) -> list:
+	return [type(o).__name__, {k: v for k, v in o.__dict__.items() if v is not None}]
+
+
+def _decode_telegram_object(value: list) -> types.TelegramObject:
+	name, fields = value
+	o = getattr(types, name)(**fields)
+	o._bot = bot
+	return o
+
+
+def _encode_model(o: models.Base) -> list:
+	""" Only the loaded columns: relationships and the instance state aren't stored """
+
+	columns = {attr.key: v for attr in inspect(o).mapper.column_attrs if (v := o.__dict__.get(attr.key)) is not None}
+	return [type(o).__name__, columns]
+
+
+def _decode_model(value: list) -> models.Base:
+	name, columns = value
+	return getattr(models, name)(**columns)
+
+
+def _decode_token(value: list) -> CancellationToken:
+	token = CancellationToken(_canceled=value[1], _completed=value[2])
+	token._id = value[0]
+	return token
+
+
+state_codec = StateCodec()
+
+state_codec.register(Path, 'path', lambda o: str(o.absolute()), Path)
+state_codec.register(datetime, 'datetime', datetime.isoformat, datetime.fromisoformat)
+state_codec.register(
+	np.ndarray, 'ndarray',
+	lambda o: [o.dtype.str, base64.b64encode(o.tobytes()).decode()],
+	lambda value: np.frombuffer(base64.b64decode(value[1]), dtype=value[0])
+)
+state_codec.register(
+	CancellationToken, 'token',
+	lambda o: [o._id, o._canceled, o._completed],
+	_decode_token
+)
+state_codec.register(
+	MatchResult, 'match',
+	lambda o: [o.clients_id, o.distances, o.thumbs, o.file_ids],
+	lambda value: MatchResult(*value)
+)
+state_codec.register(
+	MessageRef, 'message',
+	lambda o: [o.chat_id, o.message_id],
+	lambda value: MessageRef(*value)
+)
+state_codec.register(
+	FileRef, 'file',
+	lambda o: [o.file_id, o.file_unique_id],
+	lambda value: FileRef(*value)
+)
+state_codec.register(models.Base, 'model', _encode_model, _decode_model)
+state_codec.register(types.TelegramObject, 'aiogram', _encode_telegram_object, _decode_telegram_object)
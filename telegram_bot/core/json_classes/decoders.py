@@ -1,13 +1,16 @@
+import base64
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 from aiogram import types
 
 from core.bots import bot
 from core.cancel_token import CancellationToken
 from core.database import models
+from core.match_result import MatchResult
 
 
 class TGDecoder(json.JSONDecoder):
@@ -29,6 +32,8 @@ class TGDecoder(json.JSONDecoder):
 				o = class_(**o['_value'])
 				o._bot = bot
 				return o
+			case 'numpy.ndarray':
+				return np.frombuffer(base64.b64decode(o['_value']), dtype=o['_dtype'])
 			case 'datetime.datetime':
 				return datetime.fromisoformat(o['_value'])
 			case 'CancellationToken':
@@ -36,6 +41,8 @@ class TGDecoder(json.JSONDecoder):
 				for attr, value in o['_value'].items():
 					setattr(obj, attr, value)
 				return obj
+			case 'MatchResult':
+				return MatchResult(**o['_value'])
 			case _type if _type.startswith('models.') and _type[7:] in models.__all__:
 				class_ = getattr(models, _type[7:])
 				return class_(**o['_value'])
@@ -1,13 +1,16 @@
+import base64
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 from aiogram import types
 from sqlalchemy.orm import InstanceState
 
 from core.cancel_token import CancellationToken
 from core.database import models
+from core.match_result import MatchResult
 
 
 class TGEncoder(json.JSONEncoder):
@@ -34,6 +37,11 @@ class TGEncoder(json.JSONEncoder):
 				"_type": "CancellationToken",
 				"_value": {k: v for k in o.__slots__ if (v := getattr(o, k)) is not None}
 			}
+		elif isinstance(o, MatchResult):
+			return {
+				"_type": "MatchResult",
+				"_value": {k: getattr(o, k) for k in o.__slots__}
+			}
 		elif (_type := type(o).__name__) in models.__all__:
 			_value = {k: v for k, v in o.__dict__.items() if v is not None}
 			_value.pop('_sa_instance_state')
@@ -41,6 +49,12 @@ class TGEncoder(json.JSONEncoder):
 				"_type": f'models.{_type}',
 				"_value": _value
 			}
+		elif isinstance(o, np.ndarray):
+			return {
+				"_type": "numpy.ndarray",
+				"_value": base64.b64encode(o.tobytes()).decode(),
+				"_dtype": o.dtype.str
+			}
 		elif isinstance(o, InstanceState):
 			return None
 
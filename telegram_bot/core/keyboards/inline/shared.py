@@ -2,7 +2,6 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from core.database.methods.user import check_if_admin
-from core.database.models import Client
 from core.keyboards.inline.utils import paginate
 from core.misc.adapters import client2keyboard
 
@@ -46,10 +45,16 @@ def add_visit_info_kb() -> InlineKeyboardMarkup:
 	return builder.as_markup()
 
 
-def select_clients_kb(clients: list[Client], page=0, **kwargs) -> InlineKeyboardMarkup:
-	""" Select the client from a list of clients """
+def select_clients_kb(clients_id: list[int], page=0, confidence: list[int] = None, **kwargs) -> InlineKeyboardMarkup:
+	"""
+		Select the client from a list of clients.
+		:param confidence: Match confidence (percent) of each client, shown on the buttons.
+	"""
 
-	builder = paginate(clients, page, client2keyboard, 'clients_choosing', **kwargs)
+	if confidence is None:
+		builder = paginate(clients_id, page, client2keyboard, 'clients_choosing', **kwargs)
+	else:
+		builder = paginate(list(zip(clients_id, confidence)), page, lambda d: client2keyboard(*d), 'clients_choosing', **kwargs)
 
 	builder.row(InlineKeyboardButton(text='Добавить нового', callback_data='add_new_client'))
 	builder.row(InlineKeyboardButton(text='Назад', callback_data='cancel'))
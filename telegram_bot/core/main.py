@@ -2,6 +2,14 @@ from aiogram import Dispatcher, types
 
 from core.bots import bot
 from core.handlers import register_all_handlers
+# After handlers: core.face_recognition and the handlers import each other
+from core.face_recognition import load_embedding_index, save_embedding_index
+from core.inference import recognition_executor
+from core.message_ref import message_cleaner
+from core.database import pool_metrics
+from core.misc.health import mark_not_ready, mark_ready
+from core.misc.roles_cache import roles_cache
+from core.misc.username_tracker import username_tracker
 from core.misc.utils import get_storage
 
 
@@ -16,7 +24,23 @@ async def set_default_commands(bot):
 async def start_bot():
 	dp = Dispatcher(storage=get_storage())
 	register_all_handlers(dp)
+	dp.startup.register(mark_ready)
+	dp.startup.register(roles_cache.start)
+	dp.startup.register(username_tracker.start)
+	dp.startup.register(pool_metrics.start)
+	dp.shutdown.register(mark_not_ready)
+	dp.shutdown.register(save_embedding_index)
+	dp.shutdown.register(recognition_executor.shutdown)
+	dp.shutdown.register(message_cleaner.close)
+	dp.shutdown.register(roles_cache.close)
+	dp.shutdown.register(username_tracker.close)
+	dp.shutdown.register(pool_metrics.close)
 
+	mark_not_ready()
+
+	# Do not poll until models are loaded, otherwise the first photos wait for them
+	await recognition_executor.warm_up()
+	await load_embedding_index()
 	await set_default_commands(bot)
 
 	# await bot.delete_webhook(drop_pending_updates=True)
@@ -0,0 +1,31 @@
+from typing import Iterable
+
+from aiogram.types import FSInputFile
+
+
+class MatchResult:
+	"""
+		Compact result of a face search kept in the FSM data instead of the found clients.
+		:param clients_id: Candidates, nearest first.
+		:param distances: Distance to the face of every candidate.
+		:param thumbs: Local path of the profile picture of every candidate.
+		:param file_ids: Telegram file_id of every sent profile picture, None until it is sent.
+	"""
+
+	__slots__ = ('clients_id', 'distances', 'thumbs', 'file_ids')
+
+	def __init__(self, clients_id: Iterable[int] = (), distances: Iterable[float] = (), thumbs: Iterable[str] = (),
+	             file_ids: Iterable[str | None] = None):
+		self.clients_id: list[int] = list(clients_id)
+		self.distances: list[float] = list(distances)
+		self.thumbs: list[str] = list(thumbs)
+		self.file_ids: list[str | None] = [None] * len(self.thumbs) if file_ids is None else list(file_ids)
+
+	def __len__(self) -> int:
+		return len(self.clients_id)
+
+	def thumb_media(self, index: int) -> FSInputFile | str:
+		""" Profile picture of the candidate to send: an uploaded file or a file_id of the sent one """
+
+		file_id = self.file_ids[index]
+		return FSInputFile(self.thumbs[index]) if file_id is None else file_id
@@ -0,0 +1,2 @@
+from .main import MessageRef
+from .cleanup import MessageCleaner, message_cleaner
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Iterable
+
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from core.bots import bot
+from core.config import CLEANUP_BACKOFF, CLEANUP_RETRIES
+from .main import MessageRef
+
+DELETE_MESSAGES_LIMIT = 100  # Message ids in one deleteMessages request
+
+
+class MessageCleaner:
+	"""
+		Background deletion of messages. schedule() returns at once: the messages are grouped per chat
+		and deleted by a worker task with deleteMessages requests (up to DELETE_MESSAGES_LIMIT ids each).
+		Failed requests are retried with exponential backoff (retry_after of telegram flood control),
+		messages that can't be deleted are skipped by telegram.
+	"""
+
+	def __init__(self, bot_: Bot, retries: int = CLEANUP_RETRIES, backoff: float = CLEANUP_BACKOFF):
+		self._bot = bot_
+		self._retries = retries
+		self._backoff = backoff
+
+		self._pending: dict[int, list[int]] = {}  # chat_id -> messages_id
+		self._wakeup = asyncio.Event()
+		self._worker: asyncio.Task | None = None
+		self._closing = False
+
+	def schedule(self, messages: Iterable[types.Message | MessageRef]) -> None:
+		for ref in map(MessageRef.of, messages):
+			self._pending.setdefault(ref.chat_id, []).append(ref.message_id)
+
+		if self._pending:
+			self._wakeup.set()
+			if self._worker is None or self._worker.done():
+				self._worker = asyncio.create_task(self._work())
+
+	async def close(self) -> None:
+		""" Stop the worker once its batch is done (retries included) and delete the pending messages """
+
+		if self._worker is not None:
+			self._closing = True
+			self._wakeup.set()
+			try:
+				await self._worker
+			finally:
+				self._worker, self._closing = None, False
+
+		await self._delete_pending()
+
+	async def _work(self) -> None:
+		while not self._closing:
+			await self._wakeup.wait()
+			self._wakeup.clear()
+
+			try:
+				await self._delete_pending()
+			except Exception as e:
+				logging.exception(f'Message cleanup failed: {e}')
+
+	async def _delete_pending(self) -> None:
+		pending, self._pending = self._pending, {}
+
+		# Chats don't wait for each other's retries
+		await asyncio.gather(*(
+			self._delete(chat_id, messages_id[i:i + DELETE_MESSAGES_LIMIT])
+			for chat_id, messages_id in pending.items()
+			for i in range(0, len(messages_id), DELETE_MESSAGES_LIMIT)
+		))
+
+	async def _delete(self, chat_id: int, messages_id: list[int]) -> None:
+		delay = self._backoff
+		for attempt in range(1, self._retries + 1):
+			try:
+				await self._bot.delete_messages(chat_id, messages_id)
+				return
+			except TelegramBadRequest as e:
+				logging.warning(f'Exception during delete messages: {e.message}')
+				return
+			except TelegramRetryAfter as e:
+				wait = e.retry_after
+			except (TelegramNetworkError, TelegramServerError) as e:
+				logging.warning(f'Delete messages attempt {attempt} failed: {e.message}')
+				wait, delay = delay, delay * 2
+
+			if attempt < self._retries:
+				await asyncio.sleep(wait)
+
+		logging.error(f'Messages {messages_id} of chat {chat_id} are not deleted after {self._retries} attempts')
+
+
+message_cleaner = MessageCleaner(bot)
@@ -0,0 +1,22 @@
+from aiogram import types
+
+
+class MessageRef:
+	"""
+		Handle of a sent message kept in the FSM data instead of the whole types.Message:
+		deleting or editing it needs only the chat and the message id.
+	"""
+
+	__slots__ = ('chat_id', 'message_id')
+
+	def __init__(self, chat_id: int, message_id: int):
+		self.chat_id = chat_id
+		self.message_id = message_id
+
+	@classmethod
+	def of(cls, msg: 'types.Message | MessageRef') -> 'MessageRef':
+		if isinstance(msg, MessageRef):
+			return msg
+
+		return cls(msg.chat.id, msg.message_id)
+
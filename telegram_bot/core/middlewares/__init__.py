@@ -1,3 +1,5 @@
 from .empty_callback import DropEmptyButtonMiddleware
 
 from .throttle_callback import ThrottlingMiddleware
+
+from .state_buffer import StateBufferMiddleware
@@ -0,0 +1,29 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram import types
+from aiogram.fsm.context import FSMContext
+
+from core.misc.storage import RedisHashStorage
+from core.state_machines.context import BufferedFSMContext
+from core.state_machines.utils import SHARED_FIELDS
+
+
+class StateBufferMiddleware(BaseMiddleware):
+	""" Give the handler a BufferedFSMContext and write its changes once the handler is done """
+
+	async def __call__(
+			self,
+			handler: Callable[[types.TelegramObject, dict[str, Any]], Awaitable[Any]],
+			event: types.TelegramObject,
+			data: dict[str, Any]
+	) -> Any:
+		state: FSMContext | None = data.get('state')
+		if state is None or not isinstance(state.storage, RedisHashStorage):
+			return await handler(event, data)
+
+		state = data['state'] = BufferedFSMContext(state.storage, state.key, SHARED_FIELDS)
+		try:
+			return await handler(event, data)
+		finally:
+			await state.flush()
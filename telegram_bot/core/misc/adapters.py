@@ -2,7 +2,7 @@ from typing import Iterator
 
 from aiogram.types import InlineKeyboardButton
 
-from core.database.models import Location, User, Client
+from core.database.models import Location, User
 
 
 def location2keyboard(location: Location) -> InlineKeyboardButton:
@@ -13,8 +13,9 @@ def moderator2keyboard(moderator: User) -> InlineKeyboardButton:
 	return InlineKeyboardButton(text=f'{moderator.telegram_id} · {moderator.username}', callback_data=f'{moderator.id}-{moderator.telegram_id}')
 
 
-def client2keyboard(client: Client) -> InlineKeyboardButton:
-	return InlineKeyboardButton(text=f'· {client.id} ·', callback_data=f'{client.id}')
+def client2keyboard(client_id: int, confidence: int = None) -> InlineKeyboardButton:
+	text = f'· {client_id} ·' if confidence is None else f'{client_id} · {confidence}%'
+	return InlineKeyboardButton(text=text, callback_data=f'{client_id}')
 
 
 def str2int(*args) -> Iterator[int]:
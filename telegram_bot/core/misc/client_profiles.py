@@ -0,0 +1,71 @@
+from typing import TYPE_CHECKING
+
+from core.config import CLIENT_PROFILE_CACHE_TTL
+from core.misc.ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+	# noinspection PyUnusedImports
+	from core.database.models import Image, Service, Video, Visit
+
+
+class ClientProfile:
+	"""
+		Everything shown about a client, loaded at once (get_client_profile).
+		:param images: Profile picture first, then the images of the visits.
+		:param visits: Visits with their locations.
+	"""
+
+	__slots__ = ('client_id', 'images', 'videos', 'visits', 'services')
+
+	def __init__(self, client_id: int, images: list['Image'], videos: list['Video'],
+	             visits: list['Visit'], services: list['Service']):
+		self.client_id = client_id
+		self.images = images
+		self.videos = videos
+		self.visits = visits
+		self.services = services
+
+
+class ClientProfiles:
+	"""
+		Short-lived cache of the client profiles. Writes of visits, images, videos and services invalidate the client,
+		by its id or by the id of the visit (the visits of the cached profiles are known).
+		A profile loaded while something was invalidated isn't cached: it could miss the write.
+	"""
+
+	def __init__(self, ttl: float = CLIENT_PROFILE_CACHE_TTL):
+		self._cache = TTLCache(ttl)
+		self._visits: dict[int, int] = {}  # visit_id -> client_id of the cached profiles
+		self.generation = 0  # Number of invalidations
+
+	def get(self, client_id: int) -> ClientProfile | None:
+		return self._cache.get(client_id)
+
+	def set(self, profile: ClientProfile, generation: int) -> None:
+		""" Cache the profile loaded when the generation was current """
+
+		if generation != self.generation:
+			return
+
+		self._cache.set(profile.client_id, profile)
+		self._visits.update((visit.id, profile.client_id) for visit in profile.visits)
+
+	def invalidate(self, client_id: int) -> None:
+		self.generation += 1
+
+		profile = self._cache.get(client_id)
+		if profile is not None:
+			for visit in profile.visits:
+				self._visits.pop(visit.id, None)
+
+		self._cache.pop(client_id)
+
+	def invalidate_visit(self, visit_id: int) -> None:
+		self.generation += 1
+
+		client_id = self._visits.pop(visit_id, None)
+		if client_id is not None:
+			self.invalidate(client_id)
+
+
+client_profiles = ClientProfiles()
@@ -0,0 +1,84 @@
+import logging
+
+import numpy as np
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.config import BACKEND, FACE_CACHE_TTL, MODEL
+from core.misc.utils import get_redis
+
+
+class FaceCache:
+	"""
+		Content-addressed cache of the faces found on a photo (the find_faces result) in redis.
+		Faces are stored by the SHA-256 of the decoded detector working copy (pixels_digest),
+		telegram file_unique_id refers to the digest, so a resent file isn't even decoded.
+		Keys expire after ttl seconds since the last use.
+		Redis errors are logged and treated as a miss: the cache never breaks recognition.
+	"""
+
+	def __init__(self, ttl: int = FACE_CACHE_TTL, prefix: str = f'faces:{MODEL}:{BACKEND}'):
+		self.ttl = ttl
+		self.prefix = prefix
+
+	@property
+	def redis(self) -> Redis:
+		return get_redis()
+
+	async def get_by_file(self, file_unique_id: str) -> list[dict] | None:
+		""" Returns cached faces of the telegram file (None on a miss) """
+
+		try:
+			digest = await self.redis.getex(self._file_key(file_unique_id), ex=self.ttl)
+			if digest is None:
+				return None
+
+			return await self.get(digest.decode())
+		except RedisError as e:
+			logging.warning(f'Face cache is unavailable: {e}')
+			return None
+
+	async def get(self, digest: str) -> list[dict] | None:
+		""" Returns cached faces by the pixels digest (None on a miss) """
+
+		try:
+			data = await self.redis.getex(self._faces_key(digest), ex=self.ttl)
+		except RedisError as e:
+			logging.warning(f'Face cache is unavailable: {e}')
+			return None
+
+		return self._loads(data) if data is not None else None
+
+	async def set(self, digest: str, faces: list[dict], file_unique_id: str = None) -> None:
+		try:
+			async with self.redis.pipeline(transaction=False) as pipe:
+				pipe.set(self._faces_key(digest), self._dumps(faces), ex=self.ttl)
+				if file_unique_id is not None:
+					pipe.set(self._file_key(file_unique_id), digest, ex=self.ttl)
+
+				await pipe.execute()
+		except RedisError as e:
+			logging.warning(f'Face cache is unavailable: {e}')
+
+	def _faces_key(self, digest: str) -> str:
+		return f'{self.prefix}:sha256:{digest}'
+
+	def _file_key(self, file_unique_id: str) -> str:
+		return f'{self.prefix}:file:{file_unique_id}'
+
+	@staticmethod
+	def _dumps(faces: list[dict]) -> bytes:
+		# Embeddings as float32 arrays: the shortest float32 repr is written, numpy scalars of the facial area too
+		return orjson.dumps([{**face, 'embedding': np.asarray(face['embedding'], dtype=np.float32)} for face in faces],
+		                    option=orjson.OPT_SERIALIZE_NUMPY)
+
+	@staticmethod
+	def _loads(data: bytes) -> list[dict]:
+		return [
+			{**face, 'embedding': np.asarray(face['embedding'], dtype=np.float32).tolist()}
+			for face in orjson.loads(data)
+		]
+
+
+face_cache = FaceCache()
@@ -0,0 +1,23 @@
+from core.config import READY_FILE
+
+_ready = False
+
+
+def is_ready() -> bool:
+	""" Models are warm and the bot is polling """
+
+	return _ready
+
+
+def mark_ready() -> None:
+	""" Set the readiness flag and create READY_FILE for container health checks """
+
+	global _ready
+	_ready = True
+	READY_FILE.touch()
+
+
+def mark_not_ready() -> None:
+	global _ready
+	_ready = False
+	READY_FILE.unlink(missing_ok=True)
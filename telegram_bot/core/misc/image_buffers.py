@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+from aiogram import Bot
+
+from core.config import IMAGE_BUFFERS_SIZE
+from core.file_ref import FileRef
+
+
+class ImageBuffers:
+	"""
+		Downloaded photos kept in memory by telegram file_unique_id until they are recognized and stored,
+		so a photo is never written to disk unless it becomes a client image.
+		The least recently used photos are dropped when the total size exceeds max_bytes,
+		load() downloads a dropped photo again by file_id.
+	"""
+
+	def __init__(self, max_bytes: int = IMAGE_BUFFERS_SIZE):
+		self.max_bytes = max_bytes
+		self._size = 0
+		self._buffers: OrderedDict[str, bytes] = OrderedDict()
+
+	def __contains__(self, file_unique_id: str) -> bool:
+		return file_unique_id in self._buffers
+
+	def put(self, file_unique_id: str, data: bytes) -> None:
+		self.pop(file_unique_id)
+
+		self._buffers[file_unique_id] = data
+		self._size += len(data)
+
+		while self._size > self.max_bytes and len(self._buffers) > 1:
+			_, dropped = self._buffers.popitem(last=False)
+			self._size -= len(dropped)
+
+	def get(self, file_unique_id: str) -> bytes | None:
+		data = self._buffers.get(file_unique_id)
+		if data is not None:
+			self._buffers.move_to_end(file_unique_id)
+
+		return data
+
+	def pop(self, file_unique_id: str) -> bytes | None:
+		data = self._buffers.pop(file_unique_id, None)
+		if data is not None:
+			self._size -= len(data)
+
+		return data
+
+	async def load(self, bot: Bot, file: FileRef) -> bytes:
+		""" Returns the photo from memory or downloads it again """
+
+		data = self.get(file.file_unique_id)
+		if data is None:
+			data = (await bot.download(file.file_id)).getvalue()
+			self.put(file.file_unique_id, data)
+
+		return data
+
+
+image_buffers = ImageBuffers()
@@ -0,0 +1,62 @@
+import hashlib
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from PIL import ExifTags, Image, ImageFile, ImageOps
+from pillow_heif import register_heif_opener
+
+ImageFile.LOAD_TRUNCATED_IMAGES = True
+register_heif_opener()
+
+
+def convert_to_jpeg(src: Path, dst: Path) -> Path:
+	""" Decode an image of any supported type (HEIC) and save it as JPEG. Light module for process pools. """
+
+	with Image.open(src) as img:
+		img.convert('RGB').save(dst, 'JPEG')
+
+	return dst
+
+
+def open_image(image: Path | bytes) -> Image.Image:
+	""" Open an image file or downloaded bytes (lazily, only the header is read) """
+
+	return Image.open(BytesIO(image) if isinstance(image, bytes) else image)
+
+
+def pixels_digest(pixels: np.ndarray) -> str:
+	""" SHA-256 of decoded pixels: the same for a photo resent in another file or format without recompression """
+
+	digest = hashlib.sha256(f'{pixels.dtype}:{pixels.shape}:'.encode())
+	digest.update(np.ascontiguousarray(pixels).data)
+
+	return digest.hexdigest()
+
+
+def is_rotated(img: Image.Image) -> bool:
+	""" The image has an EXIF orientation other than normal """
+
+	return img.getexif().get(ExifTags.Base.Orientation, 1) != 1
+
+
+def load_for_detection(image: Path | bytes, max_side: int) -> tuple[np.ndarray, float]:
+	"""
+		Decode a working copy of the image for the face detector: not larger than max_side and rotated by EXIF.
+		JPEG is decoded directly at 1/2..1/8 scale (draft) and reduced by whole factors before resampling,
+		so the full resolution image is never held in memory.
+		Returns RGB pixels and the scale of the original image to the working copy.
+	"""
+
+	with open_image(image) as img:
+		original_side = max(img.size)
+
+		# The smallest JPEG scale still not less than max_side, then exact resampling
+		ratio = min(max_side / original_side, 1)
+		img.draft('RGB', (round(img.width * ratio), round(img.height * ratio)))
+		img.thumbnail((max_side, max_side))
+		img = ImageOps.exif_transpose(img)
+
+		pixels = np.asarray(img.convert('RGB'))
+
+	return pixels, original_side / max(pixels.shape[:2])
@@ -0,0 +1,57 @@
+import asyncio
+import dataclasses
+from typing import AsyncContextManager, Hashable
+from weakref import WeakValueDictionary
+
+from aiogram.fsm.storage.base import StorageKey
+
+from core.config import LOCKS_BACKEND, REDIS_LOCK_TIMEOUT
+from core.misc.utils import get_redis
+
+
+class KeyedLocks:
+	"""
+		asyncio.Lock per key, created on demand.
+		Locks are kept by weak references: a lock disappears as soon as nobody holds or waits for it.
+	"""
+
+	def __init__(self):
+		self._locks: WeakValueDictionary[Hashable, asyncio.Lock] = WeakValueDictionary()
+
+	def __len__(self) -> int:
+		return len(self._locks)
+
+	def __call__(self, key: Hashable) -> asyncio.Lock:
+		lock = self._locks.get(key)
+		if lock is None:
+			lock = self._locks[key] = asyncio.Lock()
+
+		return lock
+
+
+class StateLocks:
+	"""
+		Lock per FSM StorageKey (user in a chat), so different users never wait for each other.
+		:param namespace: Locks of different namespaces are independent (e.g. state data and messages of the same user).
+		:param backend: 'memory' - asyncio locks of this process,
+		                'redis' - redis locks shared by several bot processes (expire after REDIS_LOCK_TIMEOUT).
+	"""
+
+	def __init__(self, namespace: str, backend: str = LOCKS_BACKEND):
+		if backend not in ('memory', 'redis'):
+			raise ValueError(f'Unknown locks backend: {backend}')
+
+		self.namespace = namespace
+		self.backend = backend
+		self._locks = KeyedLocks()
+
+	def __call__(self, key: StorageKey) -> AsyncContextManager:
+		if self.backend == 'redis':
+			name = ':'.join(['lock', self.namespace, *map(str, dataclasses.astuple(key))])
+			return get_redis().lock(name, timeout=REDIS_LOCK_TIMEOUT)
+
+		return self._locks(key)
+
+
+state_locks = StateLocks('state')
+message_locks = StateLocks('message')
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import NamedTuple
+
+from redis.exceptions import RedisError
+
+from core.config import ROLES_BROADCAST, ROLES_CACHE_TTL
+from core.misc.ttl_cache import TTLCache
+from core.misc.utils import get_redis
+
+
+class Roles(NamedTuple):
+	is_admin: bool = False
+	is_moderator: bool = False
+
+
+class RolesCache:
+	"""
+		Roles of telegram users (by telegram id) for ROLES_CACHE_TTL seconds, users that aren't in the db too.
+		Methods changing the roles invalidate the user. With broadcast the invalidation is published
+		to redis and every bot process drops the user (listener started by start()).
+		Roles read from db are cached only if nothing was invalidated during the read (generation).
+	"""
+
+	def __init__(self, ttl: float = ROLES_CACHE_TTL, broadcast: bool = ROLES_BROADCAST, channel: str = 'roles:invalidate'):
+		self._cache = TTLCache(ttl)
+		self.broadcast = broadcast
+		self.channel = channel
+		self._listener: asyncio.Task | None = None
+		self.generation = 0  # Number of invalidations
+
+	def get(self, telegram_id: int) -> Roles | None:
+		return self._cache.get(telegram_id)
+
+	def set(self, telegram_id: int, roles: Roles, generation: int) -> None:
+		""" Cache the roles read when the generation was current """
+
+		if generation != self.generation:
+			return
+
+		self._cache.set(telegram_id, roles)
+
+	async def invalidate(self, telegram_id: int) -> None:
+		self._drop(telegram_id)
+
+		if self.broadcast:
+			try:
+				await get_redis().publish(self.channel, telegram_id)
+			except RedisError as e:
+				logging.warning(f'Roles invalidation is not published: {e}')
+
+	async def start(self) -> None:
+		if self.broadcast and self._listener is None:
+			self._listener = asyncio.create_task(self._listen())
+
+	async def close(self) -> None:
+		if self._listener is not None:
+			self._listener.cancel()
+			self._listener = None
+
+	async def _listen(self) -> None:
+		while True:
+			try:
+				async with get_redis().pubsub() as pubsub:
+					await pubsub.subscribe(self.channel)
+					async for message in pubsub.listen():
+						if message['type'] == 'message':
+							self._drop(int(message['data']))
+			except RedisError as e:
+				logging.warning(f'Roles invalidation listener is disconnected: {e}')
+
+			# Invalidations could be missed while disconnected
+			self.generation += 1
+			self._cache.clear()
+			await asyncio.sleep(5)
+
+	def _drop(self, telegram_id: int) -> None:
+		self.generation += 1
+		self._cache.pop(telegram_id)
+
+
+roles_cache = RolesCache()
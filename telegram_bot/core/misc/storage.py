@@ -0,0 +1,126 @@
+from typing import Any, Callable, Iterable, Mapping
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio.client import Pipeline
+from redis.exceptions import ResponseError, WatchError
+
+UNCHANGED = object()  # update_fields: keep the state as is
+
+
+class RedisHashStorage(RedisStorage):
+	"""
+		Redis FSM storage that keeps the state data as a hash: a field per data key, each value is json of its own.
+		A single field is read or written without a round trip of the whole dict,
+		update_data writes only the given fields, update_fields writes and deletes several fields
+		and sets the state in one transaction.
+		Data written by RedisStorage (the whole dict in a json string) is converted to a hash when it's met.
+	"""
+
+	async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+		if not isinstance(data, dict):
+			raise DataNotDictLikeError(f'Data must be a dict or dict-like object, got {type(data).__name__}')
+
+		await self._execute(key, lambda pipe: self._queue_write(pipe, key, data, replace=True))
+
+	async def get_data(self, key: StorageKey) -> dict[str, Any]:
+		fields, = await self._execute(key, lambda pipe: pipe.hgetall(self._data_key(key)))
+		return self._loads_fields(fields)
+
+	async def get_value(self, storage_key: StorageKey, dict_key: str, default: Any = None) -> Any:
+		value, = await self._execute(storage_key, lambda pipe: pipe.hget(self._data_key(storage_key), dict_key))
+		return default if value is None else self.json_loads(value)
+
+	async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+		""" Write only the given fields and return the new data (one transaction) """
+
+		def queue(pipe: Pipeline):
+			self._queue_write(pipe, key, data)
+			pipe.hgetall(self._data_key(key))
+
+		*_, fields = await self._execute(key, queue)
+		return self._loads_fields(fields)
+
+	async def update_fields(self, key: StorageKey, data: Mapping[str, Any] = None, delete: Iterable[str] = (),
+	                        *, state: StateType | object = UNCHANGED) -> None:
+		"""
+			Write the data fields, delete the delete ones and set the state (unless UNCHANGED) in one transaction.
+			Nothing is sent when there is nothing to change.
+		"""
+
+		data, delete = data or {}, [field for field in delete if field not in (data or {})]
+		if not data and not delete and state is UNCHANGED:
+			return
+
+		def queue(pipe: Pipeline):
+			self._queue_write(pipe, key, data, delete)
+			if state is not UNCHANGED:
+				self._queue_state(pipe, key, state)
+
+		await self._execute(key, queue)
+
+	def dumps_fields(self, data: Mapping[str, Any]) -> dict[str, str]:
+		""" Encoded value of each field, equal encodings mean equal values """
+
+		return {field: self.json_dumps(value) for field, value in data.items()}
+
+	def _data_key(self, key: StorageKey) -> str:
+		return self.key_builder.build(key, 'data')
+
+	def _loads_fields(self, fields: dict[bytes, bytes]) -> dict[str, Any]:
+		return {field.decode(): self.json_loads(value) for field, value in fields.items()}
+
+	def _queue_write(self, pipe: Pipeline, key: StorageKey, data: Mapping[str, Any],
+	                 delete: Iterable[str] = (), *, replace=False) -> None:
+		redis_key = self._data_key(key)
+
+		if replace:
+			pipe.delete(redis_key)
+		elif delete:
+			pipe.hdel(redis_key, *delete)
+
+		if data:
+			pipe.hset(redis_key, mapping=self.dumps_fields(data))
+			if self.data_ttl is not None:
+				pipe.expire(redis_key, self.data_ttl)
+
+	def _queue_state(self, pipe: Pipeline, key: StorageKey, state: StateType) -> None:
+		redis_key = self.key_builder.build(key, 'state')
+		if state is None:
+			pipe.delete(redis_key)
+		else:
+			pipe.set(redis_key, state.state if isinstance(state, State) else state, ex=self.state_ttl)
+
+	async def _execute(self, key: StorageKey, queue: Callable[[Pipeline], Any]) -> list:
+		""" Run the commands queued by queue in a transaction, the data of RedisStorage is converted first """
+
+		for attempt in range(2):
+			async with self.redis.pipeline(transaction=True) as pipe:
+				queue(pipe)
+				try:
+					return await pipe.execute()
+				except ResponseError as e:
+					if attempt or 'WRONGTYPE' not in str(e):
+						raise
+
+			await self._convert(key)
+
+	async def _convert(self, key: StorageKey) -> None:
+		""" Rewrite the json string of RedisStorage as a hash """
+
+		redis_key = self._data_key(key)
+		async with self.redis.pipeline(transaction=True) as pipe:
+			try:
+				await pipe.watch(redis_key)
+				if await pipe.type(redis_key) != b'string':
+					return
+
+				data = self.json_loads(await pipe.get(redis_key))
+
+				pipe.multi()
+				self._queue_write(pipe, key, data, replace=True)
+				await pipe.execute()
+			except WatchError:
+				pass  # Changed concurrently: converted by another call
@@ -0,0 +1,40 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+	""" In-process cache: values expire ttl seconds after they are set, the oldest are dropped above maxsize """
+
+	def __init__(self, ttl: float, maxsize: int = 10_000):
+		self.ttl = ttl
+		self.maxsize = maxsize
+		self._items: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()  # key -> (expires, value)
+
+	def __len__(self) -> int:
+		return len(self._items)
+
+	def get(self, key: Hashable, default: Any = None) -> Any:
+		item = self._items.get(key)
+		if item is None:
+			return default
+
+		expires, value = item
+		if expires < time.monotonic():
+			del self._items[key]
+			return default
+
+		return value
+
+	def set(self, key: Hashable, value: Any) -> None:
+		self._items.pop(key, None)
+		self._items[key] = time.monotonic() + self.ttl, value
+
+		while len(self._items) > self.maxsize:
+			self._items.popitem(last=False)
+
+	def pop(self, key: Hashable) -> None:
+		self._items.pop(key, None)
+
+	def clear(self) -> None:
+		self._items.clear()
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+from core.config import USERNAMES_FLUSH_INTERVAL
+from core.database.methods.user import update_usernames
+
+
+class UsernameTracker:
+	"""
+		Write-behind usernames of the bot users. track() only compares the username with the last known one
+		and keeps the changed ones, they are written by one transaction every interval seconds (and on close).
+	"""
+
+	def __init__(self, interval: float = USERNAMES_FLUSH_INTERVAL):
+		self.interval = interval
+		self._known: dict[int, str | None] = {}
+		self._pending: dict[int, str | None] = {}
+		self._flusher: asyncio.Task | None = None
+
+	def track(self, telegram_id: int, username: str | None) -> None:
+		if telegram_id in self._known and self._known[telegram_id] == username:
+			return
+
+		self._known[telegram_id] = username
+		self._pending[telegram_id] = username
+
+	async def start(self) -> None:
+		if self._flusher is None:
+			self._flusher = asyncio.create_task(self._flush_periodically())
+
+	async def close(self) -> None:
+		if self._flusher is not None:
+			self._flusher.cancel()
+			self._flusher = None
+
+		await self.flush()
+
+	async def flush(self) -> None:
+		if not self._pending:
+			return
+
+		pending, self._pending = self._pending, {}
+
+		try:
+			await update_usernames(pending)
+		except Exception as e:
+			logging.warning(f'Usernames are not updated: {e}')
+			self._pending = pending | self._pending  # Retry with the next flush, newer usernames win
+
+	async def _flush_periodically(self) -> None:
+		while True:
+			await asyncio.sleep(self.interval)
+			await self.flush()
+
+
+username_tracker = UsernameTracker()
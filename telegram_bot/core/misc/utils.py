@@ -1,13 +1,21 @@
-import json
 from datetime import timedelta
+from functools import cache
 from pathlib import Path
 
 from aiogram.fsm.storage.base import BaseStorage
-from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
+from aiogram.fsm.storage.redis import DefaultKeyBuilder
 from redis.asyncio import Redis
 
-from core.json_classes import TGEncoder, TGDecoder
+from core.json_classes import state_codec
 from core.env import RedisKeys
+from core.misc.storage import RedisHashStorage
+
+
+@cache
+def get_redis() -> Redis:
+	""" Redis client shared by the FSM storages and caches """
+
+	return Redis.from_url(RedisKeys.URL)
 
 
 def get_storage(*,
@@ -18,8 +26,8 @@ def get_storage(*,
                 key_builder_with_bot_id: bool = False,
                 key_builder_with_destiny: bool = False,
                 ) -> BaseStorage:
-	return RedisStorage(
-		Redis.from_url(RedisKeys.URL),
+	return RedisHashStorage(
+		get_redis(),
 		key_builder=DefaultKeyBuilder(
 			prefix=key_builder_prefix,
 			separator=key_builder_separator,
@@ -28,8 +36,8 @@ def get_storage(*,
 		),
 		state_ttl=state_ttl,
 		data_ttl=data_ttl,
-		json_dumps=lambda data: json.dumps(data, cls=TGEncoder),
-		json_loads=lambda data: json.loads(data, cls=TGDecoder)
+		json_dumps=state_codec.dumps,
+		json_loads=state_codec.loads
 	)
 
 
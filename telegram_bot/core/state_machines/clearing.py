@@ -1,12 +1,10 @@
-import logging
-from pathlib import Path
-
-from aiogram import types
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 
 from core.cancel_token import CancellationToken
-from core.state_machines.fields import FACE_GALLERY_FIELD, TEMP_PATH_FIELD
+from core.file_ref import FileRef
+from core.message_ref import MessageRef, message_cleaner
+from core.misc.image_buffers import image_buffers
+from core.state_machines.fields import FACE_GALLERY_FIELD, TEMP_IMAGE_FIELD
 from core.state_machines.utils import _with_lock_state, TOKEN_NAMES, ALL_STATE_FIELDS
 
 
@@ -26,8 +24,8 @@ async def clear_gallery(state: FSMContext):
 	await _clear_gallery(state)
 
 
-async def clear_path(state: FSMContext):
-	await _clear_path(state)
+async def clear_image(state: FSMContext):
+	await _clear_image(state)
 
 
 async def clear_state_data(state: FSMContext):
@@ -37,7 +35,7 @@ async def clear_state_data(state: FSMContext):
 async def clear_all_in_one(state: FSMContext, clear_state=False):
 	await cancel_all_tokens(state)
 	await clear_gallery(state)
-	await clear_path(state)
+	await clear_image(state)
 
 	if clear_state:
 		await clear_state_data(state)
@@ -79,19 +77,15 @@ async def _clear_gallery(state_data: dict):
 	if FACE_GALLERY_FIELD not in state_data:
 		return
 
-	face_gallery_msg: list[types.Message] = state_data.pop(FACE_GALLERY_FIELD)
-	for msg in face_gallery_msg:
-		try:
-			await msg.delete()
-		except TelegramBadRequest as e:
-			logging.warning(f'Exception during delete gallery: {e.message}')
+	face_gallery_msg: list[MessageRef] = state_data.pop(FACE_GALLERY_FIELD)
+	message_cleaner.schedule(face_gallery_msg)
 
 
 @_with_lock_state
-async def _clear_path(state_data: dict):
-	document_path = state_data.pop(TEMP_PATH_FIELD, None)
-	if document_path is not None:
-		Path(document_path).unlink(missing_ok=True)
+async def _clear_image(state_data: dict):
+	file: FileRef | None = state_data.pop(TEMP_IMAGE_FIELD, None)
+	if file is not None:
+		image_buffers.pop(file.file_unique_id)
 
 
 @_with_lock_state
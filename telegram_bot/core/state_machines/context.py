@@ -0,0 +1,87 @@
+from typing import Any, Iterable, Mapping
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+
+from core.misc.storage import RedisHashStorage, UNCHANGED
+
+
+class BufferedFSMContext(FSMContext):
+	"""
+		FSM context of one handler call over RedisHashStorage.
+		Data fields and the state set by the handler are kept in memory (dirty) and written by flush() at once,
+		StateBufferMiddleware flushes after the handler. The data is loaded on the first get_data and reused.
+		Shared fields are read and written through right away: concurrent handlers of the user coordinate by them.
+	"""
+
+	storage: RedisHashStorage
+
+	def __init__(self, storage: RedisHashStorage, key: StorageKey, shared_fields: Iterable[str] = ()):
+		super().__init__(storage, key)
+		self.shared_fields = frozenset(shared_fields)
+
+		self._data: dict[str, Any] | None = None  # Loaded data
+		self._dirty: dict[str, Any] = {}
+		self._state: StateType | object = UNCHANGED
+
+	async def set_state(self, state: StateType = None) -> None:
+		self._state = state.state if isinstance(state, State) else state
+
+	async def get_state(self) -> str | None:
+		if self._state is not UNCHANGED:
+			return self._state
+
+		return await super().get_state()
+
+	async def set_data(self, data: Mapping[str, Any]) -> None:
+		""" Replace the data in the storage right away """
+
+		await self.storage.set_data(self.key, data)
+		self._data, self._dirty = dict(data), {}
+
+	async def get_data(self) -> dict[str, Any]:
+		if self._data is None:
+			self._data = await self.storage.get_data(self.key)
+
+		return {**self._data, **self._dirty}
+
+	async def get_value(self, key: str, default: Any = None) -> Any:
+		if key in self.shared_fields:
+			return await self.storage.get_value(self.key, key, default)
+
+		if key in self._dirty:
+			return self._dirty[key]
+
+		if self._data is not None:
+			return self._data.get(key, default)
+
+		return await self.storage.get_value(self.key, key, default)
+
+	async def update_data(self, data: Mapping[str, Any] | None = None, **kwargs: Any) -> dict[str, Any]:
+		if data:
+			kwargs.update(data)
+
+		shared = {field: value for field, value in kwargs.items() if field in self.shared_fields}
+		if shared:
+			await self.storage.update_fields(self.key, shared)
+			if self._data is not None:
+				self._data.update(shared)
+
+		self._dirty.update((field, value) for field, value in kwargs.items() if field not in shared)
+		return await self.get_data()
+
+	async def flush(self) -> None:
+		""" Write the dirty fields and the state in one transaction """
+
+		await self.storage.update_fields(self.key, self._dirty, state=self._state)
+
+		if self._data is not None:
+			self._data.update(self._dirty)
+
+		self._dirty, self._state = {}, UNCHANGED
+
+	def forget(self) -> None:
+		""" Drop the loaded data, it's changed in the storage by someone else """
+
+		self._data = None
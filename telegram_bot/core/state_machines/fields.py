@@ -1,6 +1,7 @@
 FACE_GALLERY_FIELD = 'face_gallery_msg'
-TEMP_PATH_FIELD = 'temp_image_path'
+TEMP_IMAGE_FIELD = 'temp_image'  # FileRef of the downloaded photo, its bytes are in image_buffers
 LAST_MESSAGE_FIELD = 'last_msg'
+CREATING_CLIENT_FIELD = 'creating_client'  # The client of the photo is being created
 
 CHECK_FACE_TOKEN = 'check_face_token'
 
@@ -1,25 +1,49 @@
-import asyncio
 import functools
 
 from aiogram.fsm.context import FSMContext
 
+from core.misc.locks import state_locks
+from core.misc.storage import RedisHashStorage
+from core.state_machines.context import BufferedFSMContext
 from core.state_machines.fields import *
 
-_STATE_LOCK = asyncio.Lock()
-
 TOKEN_NAMES = [CHECK_FACE_TOKEN, ADDING_IMAGE_TOKEN, ADDING_VIDEO_TOKEN]
-ALL_STATE_FIELDS = TOKEN_NAMES + [FACE_GALLERY_FIELD, TEMP_PATH_FIELD, LAST_MESSAGE_FIELD]
+ALL_STATE_FIELDS = TOKEN_NAMES + [FACE_GALLERY_FIELD, TEMP_IMAGE_FIELD, LAST_MESSAGE_FIELD]
+SHARED_FIELDS = ALL_STATE_FIELDS + [CREATING_CLIENT_FIELD]  # Written through by BufferedFSMContext
 
 
 def _with_lock_state(func):
-	""" Decorator to use clear_lock for use state """
+	"""
+		Decorator to change state data under the lock of the user.
+		Only the fields changed by func are written (compared by their encoding) to RedisHashStorage,
+		other storages get the whole data back.
+	"""
 
 	@functools.wraps(func)
 	async def wrapper(state: FSMContext, *args, **kwargs):
-		async with _STATE_LOCK:
-			state_data = await state.get_data()
+		storage = state.storage
+
+		async with state_locks(state.key):
+			if isinstance(state, BufferedFSMContext):
+				await state.flush()  # func must see the fields set by the handler
+
+			state_data = await storage.get_data(state.key)
+			if not isinstance(storage, RedisHashStorage):
+				result = await func(state_data, *args, **kwargs)
+				await storage.set_data(state.key, state_data)
+				return result
+
+			before = storage.dumps_fields(state_data)
+
 			result = await func(state_data, *args, **kwargs)
-			await state.set_data(state_data)
+
+			after = storage.dumps_fields(state_data)
+			changed = {field: state_data[field] for field, value in after.items() if before.get(field) != value}
+			await storage.update_fields(state.key, changed, before.keys() - after.keys())
+
+			if isinstance(state, BufferedFSMContext):
+				state.forget()
+
 			return result
 
 	return wrapper
@@ -1,11 +1,10 @@
 import phonenumbers
 
-from core.database.methods.image import get_client_images
-from core.database.methods.service import get_client_services
+from core.database.methods.client import get_client_profile
 from core.database.methods.user import check_if_admin
-from core.database.methods.video import get_client_videos
-from core.database.methods.visit import get_visit_with_location, get_client_visits_with_location
+from core.database.methods.visit import get_visit_with_location
 from core.database.models import Visit, Service, Image, Video
+from core.misc.client_profiles import ClientProfile
 from core.text.utils import escape_markdown_v2
 
 
@@ -60,17 +59,13 @@ async def face_info_text(
 
 	is_admin = await check_if_admin(user_id) if user_id is not None else False
 
-	if is_admin and images is None:
-		images = await get_client_images(client_id)
+	if None in (images, videos, visits, services):
+		profile = await get_client_profile(client_id) or ClientProfile(client_id, [], [], [], [])
 
-	if videos is None:
-		videos = await get_client_videos(client_id)
-
-	if visits is None:
-		visits = await get_client_visits_with_location(client_id)
-
-	if services is None:
-		services = await get_client_services(client_id)
+		images = profile.images if images is None else images
+		videos = profile.videos if videos is None else videos
+		visits = profile.visits if visits is None else visits
+		services = profile.services if services is None else services
 
 	result = f'*id в базе:* `{client_id}`\n\n'
 
@@ -118,7 +113,8 @@ async def face_info_text(
 		result += ('*Номера телефонов:*\n'
 		           f'{phone_number_str}\n\n')
 
-	# Check if each visit has location
+	# Check if each visit has location (the profile visits have)
+	visits = list(visits)
 	for i in range(len(visits)):
 		if visits[i].location is None:
 			visits[i] = await get_visit_with_location(visits[i].id)
@@ -1,5 +1,13 @@
 from .config import FOLDERS_INFO
 
-from .utils import (find_faces,
-                    get_or_create_location_address, create_visit_with_date,
-                    get_date_taken)
+# utils needs exiftool and the recognition models: it is imported on the first use of its helpers,
+# so the light modules of the package (journal) can be imported alone
+_UTILS_NAMES = ('find_faces', 'match_face', 'get_or_create_location_address', 'create_visit_with_date', 'get_date_taken')
+
+
+def __getattr__(name: str):
+	if name in _UTILS_NAMES:
+		from . import utils
+		return getattr(utils, name)
+
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
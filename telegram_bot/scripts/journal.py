@@ -0,0 +1,129 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from .logger import rootLogger
+
+
+class ImportJournal:
+	"""
+		Crash-safe journal of the processed files of a folder (append-only JSONL, the last record of a file wins).
+		Every write is a single write() of complete lines followed by fsync, a torn last line left by a crash is cut off on open.
+		A folder processed by the old fill_database has processed.json, it is imported on the first open.
+	"""
+
+	FILENAME = 'import_journal.jsonl'
+	LEGACY_FILENAME = 'processed.json'
+
+	def __init__(self, folder: Path):
+		self.path = folder / self.FILENAME
+		self.statuses: dict[str, str] = {}  # [file name] = status
+
+		self._file = None
+
+	def __contains__(self, name: str) -> bool:
+		return name in self.statuses
+
+	def __len__(self) -> int:
+		return len(self.statuses)
+
+	def open(self) -> 'ImportJournal':
+		if self.path.exists():
+			self._load()
+		else:
+			self._import_legacy()
+
+		self._file = self.path.open('a', encoding='utf-8')
+		return self
+
+	def close(self) -> None:
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+
+	def record(self, name: str, status: str) -> None:
+		self.record_many([(name, status)])
+
+	def record_many(self, records: list[tuple[str, str]]) -> None:
+		""" Durably save statuses of the files """
+
+		if not records:
+			return
+
+		self._file.write(self._dumps(records))
+		self._file.flush()
+		os.fsync(self._file.fileno())
+
+		self.statuses.update(records)
+
+	def _load(self) -> None:
+		data = self.path.read_bytes()
+
+		# Cut off a line torn by a crash, otherwise the next record is glued to it
+		end = data.rfind(b'\n') + 1
+		if end != len(data):
+			rootLogger.warning(f'Journal {self.path} has a torn last record, dropping it')
+			with self.path.open('r+b') as f:
+				f.truncate(end)
+
+		for line in data[:end].decode('utf-8').splitlines():
+			if not line:
+				continue
+
+			record = json.loads(line)
+			self.statuses[record['file']] = record['status']
+
+	def _import_legacy(self) -> None:
+		legacy_path = self.path.with_name(self.LEGACY_FILENAME)
+		if not legacy_path.exists():
+			return
+
+		with legacy_path.open('r', encoding='utf-8') as f:
+			processed: dict[str, str] = json.load(f)
+
+		# Write to a temp file and rename, so the journal is either complete or missing
+		temp_path = self.path.with_name(self.path.name + '.tmp')
+		with temp_path.open('w', encoding='utf-8') as f:
+			f.write(self._dumps(list(processed.items())))
+			f.flush()
+			os.fsync(f.fileno())
+
+		os.replace(temp_path, self.path)
+		self.statuses.update(processed)
+
+		rootLogger.info(f'Imported {len(processed)} records from {legacy_path}')
+
+	@staticmethod
+	def _dumps(records: list[tuple[str, str]]) -> str:
+		time = datetime.now().isoformat(timespec='seconds')
+		return ''.join(json.dumps({'file': name, 'status': status, 'time': time}, ensure_ascii=False) + '\n'
+		               for name, status in records)
+
+
+class DuplicatesReport:
+	""" Files of a folder that weren't saved as duplicates (JSONL, for manual review) """
+
+	FILENAME = 'duplicates_report.jsonl'
+
+	def __init__(self, folder: Path):
+		self.path = folder / self.FILENAME
+		self._file = None
+
+	def add(self, name: str, reason: str, **similar) -> None:
+		"""
+			:param reason: 'similar' - the face is already in db or in this import, 'suspected duplicate' - ambiguous cluster.
+			:param similar: Similar clients_id and files.
+		"""
+
+		if self._file is None:
+			self._file = self.path.open('a', encoding='utf-8')
+
+		record = {'file': name, 'reason': reason, 'time': datetime.now().isoformat(timespec='seconds'), **similar}
+		self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+		self._file.flush()
+
+	def close(self) -> None:
+		if self._file is not None:
+			self._file.close()
+			self._file = None
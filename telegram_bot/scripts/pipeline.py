@@ -0,0 +1,376 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+
+from deepface.modules import verification as dst
+
+from core.config import DISTANCE_METRIC, INFERENCE_BATCH_SIZE, MODEL, SUPPORTED_IMAGE_TYPES
+from core.database.methods.client import create_clients
+from core.embeddings import EmbeddingIndex, cluster_by_threshold, is_tight, pairwise_distances
+from core.face_recognition import find_faces_batch, search_similar_clients
+from core.misc.images import convert_to_jpeg
+from .journal import DuplicatesReport, ImportJournal
+from .logger import rootLogger
+from .utils import get_date_taken, get_or_create_location_address
+
+QUEUE_SIZE = 2 * INFERENCE_BATCH_SIZE  # Max files waiting between two stages
+DECODE_WORKERS = os.cpu_count() or 4  # Parallel copies and HEIC decodes (process pool)
+INSERT_BATCH_SIZE = 32  # Files saved to db and journaled at once
+PROGRESS_INTERVAL = 30  # Progress log period (sec)
+
+_DONE = None  # Closes a queue
+
+
+class ImportFolder:
+	""" Folder from FOLDERS_INFO with its location, journal and duplicates report """
+
+	__slots__ = ('path', 'service_title', 'location_id', 'journal', 'report')
+
+	def __init__(self, path: Path, service_title: str, location_id: int):
+		self.path = path
+		self.service_title = service_title
+		self.location_id = location_id
+		self.journal = ImportJournal(path).open()
+		self.report = DuplicatesReport(path)
+
+	def close(self) -> None:
+		self.journal.close()
+		self.report.close()
+
+
+class ImportFile:
+	""" Image passing through the pipeline stages """
+
+	__slots__ = ('seq', 'path', 'folder', 'temp_path', 'date', 'faces')
+
+	def __init__(self, seq: int, path: Path, folder: ImportFolder):
+		self.seq = seq
+		self.path = path
+		self.folder = folder
+
+		self.temp_path: Path | None = None  # JPEG copy for recognition, moved to MEDIA_DIR on insert
+		self.date: datetime | None = None
+		self.faces: list[dict] | None = None
+
+	def record(self, status: str) -> None:
+		self.folder.journal.record(self.path.name, status)
+
+	def report(self, reason: str, **similar) -> None:
+		self.folder.report.add(self.path.name, reason, **similar)
+
+	def discard(self) -> None:
+		if self.temp_path is not None:
+			self.temp_path.unlink(missing_ok=True)
+
+
+async def get_batch(queue: asyncio.Queue, size: int) -> tuple[list, bool]:
+	""" Wait for at least one item and take up to size ready items. Returns the items and if the queue is closed. """
+
+	item = await queue.get()
+	if item is _DONE:
+		return [], True
+
+	batch = [item]
+	while len(batch) < size:
+		try:
+			item = queue.get_nowait()
+		except asyncio.QueueEmpty:
+			break
+
+		if item is _DONE:
+			return batch, True
+
+		batch.append(item)
+
+	return batch, False
+
+
+class ImportPipeline:
+	"""
+		Bulk import of FOLDERS_INFO as concurrent stages connected by bounded queues:
+		discovery -> decode (HEIC in a process pool) -> face embedding (batches) -> matching and clustering -> db insert (batches).
+		Skipped duplicates are written to duplicates_report.jsonl of the folder.
+		Every final file status is written to the folder journal, so a restarted import skips finished files.
+		Files of a failed db insert batch aren't journaled and are retried on the next run.
+		A crash between insert and journal leaves a saved client, on the next run its photo is found as a duplicate.
+	"""
+
+	def __init__(self, folders_info: list[dict]):
+		self.folders_info = folders_info
+		self.stats = Counter()
+		self._start_time = time.perf_counter()
+
+		self._queues = {name: asyncio.Queue(QUEUE_SIZE) for name in ('decode', 'embed', 'match', 'insert')}
+		self._temp_dir: Path | None = None
+		self._decode_pool: ProcessPoolExecutor | None = None
+
+		# Faces matched as new but not saved yet, so duplicates inside the import are found too
+		self._pending = EmbeddingIndex()
+		self._pending_files: dict[int, ImportFile] = {}  # [seq] = file
+		self._threshold = dst.find_threshold(MODEL, DISTANCE_METRIC)
+
+	async def run(self) -> None:
+		self._start_time = time.perf_counter()
+
+		# spawn: workers import only core.misc.images, not TensorFlow
+		self._decode_pool = ProcessPoolExecutor(DECODE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+		td = tempfile.TemporaryDirectory()
+		self._temp_dir = Path(td.name)
+
+		progress = asyncio.create_task(self._log_progress())
+		folders: list[ImportFolder] = []
+
+		try:
+			await asyncio.gather(
+				self._discover(folders),
+				self._run_stage(self._decode, DECODE_WORKERS, 'decode', 'embed'),
+				self._run_stage(self._embed, 1, 'embed', 'match'),
+				self._run_stage(self._match, 1, 'match', 'insert'),
+				self._insert(),
+			)
+		finally:
+			progress.cancel()
+			self._decode_pool.shutdown(cancel_futures=True)
+			td.cleanup()
+
+			for folder in folders:
+				folder.close()
+
+		self._log_stats()
+		rootLogger.info(f'Processed in {time.perf_counter() - self._start_time:.0f} sec')
+
+	async def _run_stage(self, worker, workers: int, inbox: str, outbox: str) -> None:
+		""" Run workers until the inbox is closed, then close the outbox """
+
+		await asyncio.gather(*(worker(self._queues[inbox], self._queues[outbox]) for _ in range(workers)))
+		await self._queues[outbox].put(_DONE)
+
+	async def _discover(self, folders: list[ImportFolder]) -> None:
+		outbox = self._queues['decode']
+		seq = 0
+
+		try:
+			for folder_info in self.folders_info:
+				path = Path(folder_info.get('folder'))
+
+				if not path.exists() or not path.is_dir():
+					rootLogger.error(f"Wrong folder: {folder_info.get('folder')} in FOLDERS_INFO!")
+					continue
+
+				service_title = folder_info.get('service_title')
+				if service_title is None:
+					rootLogger.error(f"Service title cannot be empty!")
+					continue
+
+				location = await get_or_create_location_address(folder_info.get('location_address'))
+
+				folder = ImportFolder(path, service_title, location.id)
+				folders.append(folder)
+
+				rootLogger.info(f'Working with folder: {path} ({len(folder.journal)} files processed before)')
+
+				files = sorted(set(chain.from_iterable(
+					chain(path.glob(f'*{img_type.lower()}'), path.glob(f'*{img_type.upper()}'))
+					for img_type in SUPPORTED_IMAGE_TYPES.values()
+				)))
+
+				for img_path in files:
+					if img_path.name in folder.journal:
+						self.stats['skipped'] += 1
+						continue
+
+					seq += 1
+					self.stats['discovered'] += 1
+					await outbox.put(ImportFile(seq, img_path, folder))
+		finally:
+			await outbox.put(_DONE)
+
+	async def _decode(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+		""" Copy the image to the temp dir as JPEG and read its date """
+
+		loop = asyncio.get_running_loop()
+
+		while (file := await inbox.get()) is not _DONE:
+			file.temp_path = self._temp_dir / f'{file.seq}.jpg'
+
+			try:
+				if file.path.suffix.lower() == '.jpg':
+					await asyncio.to_thread(shutil.copy2, file.path, file.temp_path)
+				else:
+					await loop.run_in_executor(self._decode_pool, convert_to_jpeg, file.path, file.temp_path)
+
+				file.date = await asyncio.to_thread(get_date_taken, file.path)
+			except Exception as e:
+				rootLogger.error(f'Cannot decode {file.path}: {e}')
+				file.discard()
+				file.record('cannot decode')
+				self.stats['failed'] += 1
+				continue
+
+			self.stats['decoded'] += 1
+			await outbox.put(file)
+
+		await inbox.put(_DONE)  # Close for other workers
+
+	async def _embed(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+		""" Find faces on batches of images """
+
+		closed = False
+		while not closed:
+			files, closed = await get_batch(inbox, INFERENCE_BATCH_SIZE)
+			if not files:
+				continue
+
+			batch_faces = await asyncio.to_thread(find_faces_batch, [file.temp_path for file in files])
+
+			for file, faces in zip(files, batch_faces):
+				file.faces = faces
+				self.stats['embedded'] += 1
+				await outbox.put(file)
+
+	async def _match(self, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+		"""
+			Skip images without exactly one face and faces similar to known or already imported ones.
+			New faces of a batch are clustered: a tight cluster becomes one client with several images,
+			a loose one (faces linked only through others) is reported as suspected duplicates and isn't saved.
+		"""
+
+		closed = False
+		while not closed:
+			files, closed = await get_batch(inbox, INFERENCE_BATCH_SIZE)
+
+			new_files: list[ImportFile] = []
+			for file in files:
+				if await self._is_known(file):
+					continue
+
+				new_files.append(file)
+
+			if not new_files:
+				continue
+
+			distances = pairwise_distances(file.faces[0]['embedding'] for file in new_files)
+			for cluster in cluster_by_threshold(distances, self._threshold):
+				group = [new_files[i] for i in cluster]
+
+				if not is_tight(distances, cluster, self._threshold):
+					self._report_cluster(group)
+					continue
+
+				# The most confident face goes to the profile picture
+				group.sort(key=lambda f: f.faces[0].get('face_confidence') or 0, reverse=True)
+				for file in group:
+					self._pending.add(file.seq, file.faces[0]['embedding'])
+					self._pending_files[file.seq] = file
+
+				await outbox.put(group)
+
+	async def _is_known(self, file: ImportFile) -> bool:
+		""" Journal and report the file if it has no single face or the face is already in db or this import """
+
+		if len(file.faces) != 1:
+			rootLogger.error(f'Found {len(file.faces)} faces on {file.path}')
+			file.discard()
+			file.record('found 0 or >1 faces')
+			self.stats['no face'] += 1
+			return True
+
+		embedding = file.faces[0]['embedding']
+
+		clients_id, _ = await search_similar_clients(embedding)
+		pending_seq, _ = self._pending.search(embedding, self._threshold)
+
+		if not clients_id and not len(pending_seq):
+			return False
+
+		rootLogger.warning(f'Face on {file.path} similar with: {clients_id} '
+		                   f'and {len(pending_seq)} images of this import')
+		file.report('similar', clients_id=clients_id,
+		            files=[self._pending_files[seq].path.name for seq in pending_seq.tolist()])
+		file.discard()
+		file.record(f'found {len(clients_id) + len(pending_seq)} similar')
+		self.stats['similar'] += 1
+		return True
+
+	def _report_cluster(self, group: list[ImportFile]) -> None:
+		names = [file.path.name for file in group]
+		rootLogger.warning(f'Suspected duplicates (not saved): {names}')
+
+		for file in group:
+			file.report('suspected duplicate', files=[name for name in names if name != file.path.name])
+			file.discard()
+			file.record('suspected duplicate')
+
+		self.stats['suspected duplicates'] += len(group)
+
+	async def _insert(self) -> None:
+		"""
+			Create a client with a visit and a service for every group of images of one new face, a batch in one transaction.
+			The first image is the profile picture, the others are added to the visit (of the first image folder).
+		"""
+
+		inbox = self._queues['insert']
+
+		closed = False
+		while not closed:
+			groups, closed = await get_batch(inbox, INSERT_BATCH_SIZE)
+			if not groups:
+				continue
+
+			files = [file for group in groups for file in group]
+
+			try:
+				clients_id = await create_clients([{
+					'image_path': group[0].temp_path,
+					'face_encoding': group[0].faces[0],
+					'location_id': group[0].folder.location_id,
+					'date': group[0].date or datetime.utcnow(),
+					'service_title': group[0].folder.service_title,
+					'images': [file.temp_path for file in group[1:]],
+					'faces': [file.faces[0] for file in group[1:]],
+				} for group in groups])
+			except Exception as e:
+				rootLogger.error(f'Cannot save {len(files)} images ({files[0].path} ...): {e}')
+				for file in files:
+					file.discard()
+
+				self.stats['failed'] += len(files)
+				continue
+			finally:
+				for file in files:
+					self._pending.remove(file.seq)
+					self._pending_files.pop(file.seq, None)
+
+			saved: dict[ImportFolder, list[tuple[str, str]]] = {}
+			for group, client_id in zip(groups, clients_id):
+				rootLogger.info(f'Created client ({client_id}) with: {", ".join(str(file.path) for file in group)}')
+
+				for file in group:
+					saved.setdefault(file.folder, []).append((file.path.name, 'success'))
+
+			for folder, records in saved.items():
+				folder.journal.record_many(records)
+
+			self.stats['inserted'] += len(files)
+			self.stats['clients'] += len(groups)
+
+	async def _log_progress(self) -> None:
+		while True:
+			await asyncio.sleep(PROGRESS_INTERVAL)
+			self._log_stats()
+
+	def _log_stats(self) -> None:
+		finished = sum(self.stats[name] for name in ('inserted', 'similar', 'no face', 'failed'))
+		rate = finished / max(time.perf_counter() - self._start_time, 1) * 3600
+
+		stats = ', '.join(f'{name}: {count}' for name, count in self.stats.items())
+		queues = ', '.join(f'{name}: {queue.qsize()}' for name, queue in self._queues.items())
+		rootLogger.info(f'Import progress - {stats or "nothing yet"} | {rate:.0f} files/hour | queues - {queues}')
@@ -2,17 +2,14 @@ from datetime import datetime
 from pathlib import Path
 
 import exiftool
-import numpy as np
 from PIL import ImageFile
-from deepface import DeepFace
 from pillow_heif import register_heif_opener
 from sqlalchemy import select
 
-from core.config import BACKEND, MODEL
 from core.database import session_maker
-from core.database.methods.client import get_all_clients
+from core.database.methods.client import get_clients
 from core.database.models import Location, Visit, Client
-from core.face_recognition import compare_faces
+from core.face_recognition import find_faces_batch, search_similar_clients
 from core.misc.adapters import str2int
 from scripts.logger import rootLogger
 
@@ -21,7 +18,12 @@ register_heif_opener()
 
 
 async def find_faces(image_path: Path) -> tuple[list[Client] | None, dict | None]:
-	embeddings = DeepFace.represent(str(image_path), model_name=MODEL, detector_backend=BACKEND, enforce_detection=False)
+	embeddings, = find_faces_batch([image_path])
+	return await match_face(image_path, embeddings)
+
+
+async def match_face(image_path: Path, embeddings: list[dict]) -> tuple[list[Client] | None, dict | None]:
+	""" Match the only face of the image (embeddings from find_faces_batch) with the known faces """
 
 	if len(embeddings) > 1:
 		rootLogger.error(f'Found {len(embeddings)} faces on {image_path}')
@@ -33,21 +35,14 @@ async def find_faces(image_path: Path) -> tuple[list[Client] | None, dict | None
 
 	face = embeddings[0]
 
-	# Get known faces encoding
-	clients = await get_all_clients()
-	known_faces = [client.face_encoding for client in clients]
-
 	# Compare with known faces
-	results = compare_faces(known_faces, face)
-
-	# Extract matches
-	indexes = np.nonzero(results)[0]  # axe=0
+	clients_id, _ = await search_similar_clients(face['embedding'])
 
 	# Clients with this face aren't found.
-	if len(indexes) == 0:
+	if len(clients_id) == 0:
 		return None, face  # Return only face encoding
 
-	return [clients[i] for i in indexes], face  # Return an array of clients and face encoding
+	return await get_clients(clients_id), face  # Return an array of clients and face encoding
 
 
 async def get_or_create_location_address(address: str) -> Location:
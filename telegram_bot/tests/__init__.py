@@ -0,0 +1,4 @@
+import os
+
+# core.bots builds the Bot at import, unit tests don't talk to telegram
+os.environ.setdefault('TG_API_TOKEN', '123456:TEST')
@@ -0,0 +1,288 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from core.embeddings import (EmbeddingIndex, IVFIndex, cluster_by_threshold, decode_embedding, encode_embedding, is_tight,
+                             pairwise_distances)
+
+DIM = 16
+
+
+def random_vectors(n: int, seed: int = 0) -> np.ndarray:
+	return np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+
+
+def brute_force(vectors: dict[int, np.ndarray], query: np.ndarray, top_k: int) -> list[int]:
+	""" Client ids by cosine distance, nearest first """
+
+	ids = list(vectors)
+	matrix = np.stack([vectors[client_id] / np.linalg.norm(vectors[client_id]) for client_id in ids])
+	distances = 1 - matrix @ (query / np.linalg.norm(query))
+	return [ids[i] for i in np.argsort(distances, kind='stable')[:top_k]]
+
+
+class TestEmbeddingIndex(unittest.TestCase):
+	def setUp(self):
+		self.vectors = random_vectors(100)
+		self.index = EmbeddingIndex(dim=DIM, capacity=4)
+		self.index.load(enumerate(self.vectors))
+
+	def test_search_finds_the_same_face_first(self):
+		ids, distances = self.index.search(self.vectors[42], threshold=2, distance_metric='cosine', top_k=5)
+
+		self.assertEqual(ids[0], 42)
+		self.assertAlmostEqual(float(distances[0]), 0, places=5)
+		self.assertTrue(np.all(np.diff(distances) >= 0))
+
+	def test_search_matches_brute_force(self):
+		query = random_vectors(1, seed=1)[0]
+
+		ids, _ = self.index.search(query, threshold=2, distance_metric='cosine', top_k=10)
+
+		self.assertEqual(ids.tolist(), brute_force(dict(enumerate(self.vectors)), query, 10))
+
+	def test_search_cuts_by_threshold(self):
+		ids, distances = self.index.search(self.vectors[7], threshold=1e-3, distance_metric='cosine')
+		self.assertEqual(ids.tolist(), [7])
+
+	def test_remove_moves_the_last_row(self):
+		self.index.remove(10)
+		self.index.remove(10)  # Missing ids are ignored
+
+		self.assertEqual(len(self.index), 99)
+		self.assertNotIn(10, self.index)
+
+		ids, _ = self.index.search(self.vectors[99], threshold=1e-3, distance_metric='cosine')
+		self.assertEqual(ids.tolist(), [99])
+
+	def test_add_replaces_the_client_embedding(self):
+		self.index.add(5, self.vectors[6])
+
+		self.assertEqual(len(self.index), 100)
+		ids, _ = self.index.search(self.vectors[6], threshold=1e-3, distance_metric='cosine')
+		self.assertEqual(sorted(ids.tolist()), [5, 6])
+
+	def test_save_and_restore(self):
+		with tempfile.TemporaryDirectory() as folder:
+			path = Path(folder) / 'index.npz'
+			self.index.save(path)
+
+			restored = EmbeddingIndex(dim=DIM)
+			self.assertTrue(restored.restore(path))
+			self.assertFalse(EmbeddingIndex(dim=DIM).restore(Path(folder) / 'missing.npz'))
+			self.assertFalse(EmbeddingIndex(dim=DIM + 1).restore(path))
+
+		self.assertTrue(restored.loaded)
+		self.assertEqual(restored.ids.tolist(), self.index.ids.tolist())
+
+		query = random_vectors(1, seed=1)[0]
+		np.testing.assert_array_equal(restored.search(query, 2, 'cosine')[0], self.index.search(query, 2, 'cosine')[0])
+
+	def test_distance_metrics(self):
+		query = self.vectors[3] * 2
+
+		for metric in ('cosine', 'euclidean', 'euclidean_l2'):
+			ids, _ = self.index.search(query, threshold=np.inf, distance_metric=metric, top_k=1)
+			self.assertEqual(ids.tolist(), [3], metric)
+
+
+class TestIVFIndex(unittest.TestCase):
+	def create_index(self, **kwargs) -> IVFIndex:
+		return IVFIndex(dim=DIM, **{'nlist': 8, 'nprobe': 8, 'top_k': 1000, **kwargs})
+
+	def assert_lists_consistent(self, index: IVFIndex):
+		""" Every row is in the inverted list of its cluster exactly once """
+
+		rows = sorted(row for rows in index._lists for row in rows)
+		self.assertEqual(rows, list(range(len(index))))
+
+		for cluster, rows in enumerate(index._lists):
+			for position, row in enumerate(rows):
+				self.assertEqual(index._assign[row], cluster)
+				self.assertEqual(index._position[row], position)
+
+	def test_untrained_index_is_exact(self):
+		index = self.create_index()
+		vectors = random_vectors(20)
+		index.load(enumerate(vectors))
+
+		self.assertFalse(index.trained)
+		ids, _ = index.search(vectors[4], threshold=1e-3, distance_metric='cosine')
+		self.assertEqual(ids.tolist(), [4])
+
+	def test_search_with_all_clusters_probed_matches_brute_force(self):
+		index = self.create_index()
+		vectors = dict(enumerate(random_vectors(500)))
+		index.load(vectors.items())
+
+		self.assertTrue(index.trained)
+		self.assert_lists_consistent(index)
+
+		query = random_vectors(1, seed=3)[0]
+		ids, _ = index.search(query, threshold=2, distance_metric='cosine', top_k=10)
+		self.assertEqual(ids.tolist(), brute_force(vectors, query, 10))
+
+	def test_add_and_remove_keep_the_lists(self):
+		index = self.create_index()
+		vectors = dict(enumerate(random_vectors(300)))
+		index.load(vectors.items())
+
+		new_vectors = random_vectors(50, seed=5)
+		for client_id in range(0, 300, 3):
+			index.remove(client_id)
+			del vectors[client_id]
+		for i, client_id in enumerate(range(1, 300, 6)):
+			index.add(client_id, new_vectors[i])
+			vectors[client_id] = new_vectors[i]
+
+		self.assert_lists_consistent(index)
+
+		query = new_vectors[7]
+		ids, _ = index.search(query, threshold=2, distance_metric='cosine', top_k=10)
+		self.assertEqual(ids.tolist(), brute_force(vectors, query, 10))
+
+	def test_nprobe_limits_scanned_rows(self):
+		index = self.create_index(nprobe=1)
+		vectors = random_vectors(400)
+		index.load(enumerate(vectors))
+
+		ids, _ = index.search(vectors[11], threshold=2, distance_metric='cosine')
+		cluster = index._assign[index._rows[11]]
+		self.assertEqual(sorted(ids.tolist()), sorted(int(index.ids[row]) for row in index._lists[cluster]))
+
+	def test_save_and_restore_keep_the_clusters(self):
+		index = self.create_index()
+		index.load(enumerate(random_vectors(300)))
+
+		with tempfile.TemporaryDirectory() as folder:
+			path = Path(folder) / 'index.npz'
+			index.save(path)
+
+			restored = self.create_index()
+			self.assertTrue(restored.restore(path))
+			self.assertFalse(EmbeddingIndex(dim=DIM).restore(path))  # Another backend
+
+		self.assertTrue(restored.trained)
+		np.testing.assert_array_equal(restored._centroids, index._centroids)
+		self.assert_lists_consistent(restored)
+
+	def test_retrain_runs_in_background(self):
+		async def scenario():
+			index = self.create_index()
+			vectors = random_vectors(200)
+
+			for client_id in range(64):
+				index.add(client_id, vectors[client_id])
+
+			training = index.training
+			self.assertIsNotNone(training)
+			self.assertFalse(index.trained)
+
+			# The index is changed while the clusters are fitted in a thread
+			for client_id in range(64, 200):
+				index.add(client_id, vectors[client_id])
+			for client_id in range(0, 20, 2):
+				index.remove(client_id)
+
+			await training
+			while index.training is not None and not index.training.done():
+				await index.training
+
+			return index
+
+		index = asyncio.run(scenario())
+
+		self.assertTrue(index.trained)
+		self.assertEqual(len(index), 190)
+		self.assert_lists_consistent(index)
+
+
+class TestEmbeddingCodec(unittest.TestCase):
+	def test_float32_round_trip(self):
+		embedding = np.random.default_rng(0).normal(size=512).astype(np.float32)
+
+		data = encode_embedding(embedding, 'float32')
+
+		self.assertEqual(len(data), 512 * 4)
+		np.testing.assert_array_equal(decode_embedding(data), embedding)
+
+	def test_float16_round_trip(self):
+		embedding = np.random.default_rng(0).normal(size=512)
+
+		decoded = decode_embedding(encode_embedding(embedding.tolist(), 'float16'))
+
+		self.assertEqual(decoded.dtype, np.dtype('<f2'))
+		np.testing.assert_allclose(decoded, embedding, rtol=1e-3, atol=1e-3)
+
+	def test_wrong_length_is_rejected(self):
+		with self.assertRaises(ValueError):
+			decode_embedding(b'\0' * 100)
+
+
+class TestClustering(unittest.TestCase):
+	def test_chained_items_are_one_cluster(self):
+		distances = np.array([
+			[0, .1, .9, .9],
+			[.1, 0, .2, .9],
+			[.9, .2, 0, .9],
+			[.9, .9, .9, 0],
+		])
+
+		self.assertEqual(cluster_by_threshold(distances, .3), [[0, 1, 2], [3]])
+		self.assertFalse(is_tight(distances, [0, 1, 2], .3))
+		self.assertTrue(is_tight(distances, [0, 1], .3))
+
+	def test_clusters_are_ordered_by_their_first_item(self):
+		distances = np.full((5, 5), .9)
+		np.fill_diagonal(distances, 0)
+		distances[4, 1] = distances[1, 4] = .1
+		distances[3, 0] = distances[0, 3] = .1
+
+		self.assertEqual(cluster_by_threshold(distances, .3), [[0, 3], [1, 4], [2]])
+
+	def test_pairwise_distances(self):
+		vectors = np.random.default_rng(0).normal(size=(3, 512)).astype(np.float32)
+
+		distances = pairwise_distances(vectors, 'cosine')
+
+		self.assertEqual(distances.shape, (3, 3))
+		np.testing.assert_allclose(np.diag(distances), 0, atol=1e-6)
+		np.testing.assert_allclose(distances, distances.T, atol=1e-6)
+		self.assertEqual(cluster_by_threshold(distances, 1e-3), [[0], [1], [2]])
+
+
+class TestEmbeddingVersions(unittest.TestCase):
+	def test_versions_are_kept_by_add_and_restore(self):
+		index = EmbeddingIndex(dim=DIM)
+		vectors = random_vectors(5)
+		index.load((client_id, vector, 1) for client_id, vector in enumerate(vectors))
+
+		index.add(2, vectors[3], version=4)
+		index.add(7, vectors[4])
+		index.remove(0)
+
+		with tempfile.TemporaryDirectory() as folder:
+			path = Path(folder) / 'index.npz'
+			index.save(path)
+
+			restored = EmbeddingIndex(dim=DIM)
+			self.assertTrue(restored.restore(path))
+
+		versions = dict(zip(restored.ids.tolist(), restored.versions.tolist()))
+		self.assertEqual(versions, {1: 1, 2: 4, 3: 1, 4: 1, 7: 0})
+
+	def test_file_without_versions_is_rejected(self):
+		index = EmbeddingIndex(dim=DIM)
+		index.load(enumerate(random_vectors(5)))
+
+		with tempfile.TemporaryDirectory() as folder:
+			path = Path(folder) / 'index.npz'
+			state = index._state()
+			del state['versions']
+			with path.open('wb') as f:
+				np.savez(f, **state)
+
+			self.assertFalse(EmbeddingIndex(dim=DIM).restore(path))
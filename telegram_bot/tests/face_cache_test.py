@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from redis.exceptions import ConnectionError
+
+from core.misc.face_cache import FaceCache
+from tests.fake_redis import FakeRedis
+
+
+def face(seed: int) -> dict:
+	embedding = np.random.default_rng(seed).normal(size=512).astype(np.float32)
+	return {
+		'embedding': embedding.tolist(),
+		'facial_area': {'x': np.int64(10), 'y': 20, 'w': 30, 'h': 40},
+		'face_confidence': np.float64(.98),
+	}
+
+
+class TestFaceCache(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self.redis = FakeRedis()
+		patch('core.misc.face_cache.get_redis', return_value=self.redis).start()
+		self.addCleanup(patch.stopall)
+
+		self.cache = FaceCache(ttl=100, prefix='faces:test')
+
+	async def test_round_trip(self):
+		faces = [face(0), face(1)]
+
+		await self.cache.set('digest', faces, file_unique_id='AQAD1')
+
+		for cached in (await self.cache.get('digest'), await self.cache.get_by_file('AQAD1')):
+			self.assertEqual(len(cached), 2)
+			for cached_face, original in zip(cached, faces):
+				self.assertEqual(cached_face['embedding'], original['embedding'])  # float32 values are kept exactly
+				self.assertEqual(cached_face['facial_area'], {'x': 10, 'y': 20, 'w': 30, 'h': 40})
+				self.assertEqual(cached_face['face_confidence'], .98)
+
+	async def test_miss(self):
+		await self.cache.set('digest', [face(0)])
+
+		self.assertIsNone(await self.cache.get('other'))
+		self.assertIsNone(await self.cache.get_by_file('AQAD1'))
+		self.assertIsNotNone(await self.cache.get('digest'))
+
+	async def test_no_faces_are_cached(self):
+		await self.cache.set('digest', [])
+		self.assertEqual(await self.cache.get('digest'), [])
+
+	async def test_keys_expire_after_the_last_use(self):
+		with patch('time.monotonic', return_value=1000):
+			await self.cache.set('digest', [face(0)], file_unique_id='AQAD1')
+
+		with patch('time.monotonic', return_value=1090):
+			self.assertIsNotNone(await self.cache.get_by_file('AQAD1'))  # The ttl starts again
+
+		with patch('time.monotonic', return_value=1150):
+			self.assertIsNotNone(await self.cache.get('digest'))
+
+		with patch('time.monotonic', return_value=1300):
+			self.assertIsNone(await self.cache.get_by_file('AQAD1'))
+			self.assertIsNone(await self.cache.get('digest'))
+
+	async def test_redis_errors_are_misses(self):
+		redis = MagicMock()
+		redis.getex = AsyncMock(side_effect=ConnectionError('connection refused'))
+		redis.pipeline.side_effect = ConnectionError('connection refused')
+
+		with patch('core.misc.face_cache.get_redis', return_value=redis), self.assertLogs(level='WARNING'):
+			self.assertIsNone(await self.cache.get('digest'))
+			self.assertIsNone(await self.cache.get_by_file('AQAD1'))
+			await self.cache.set('digest', [face(0)])
@@ -0,0 +1,205 @@
+import time
+from datetime import timedelta
+from typing import Any
+
+from redis.exceptions import ResponseError, WatchError
+
+WRONGTYPE = 'WRONGTYPE Operation against a key holding the wrong kind of value'
+
+
+def _bytes(value: Any) -> bytes:
+	if isinstance(value, bytes):
+		return value
+
+	return str(value).encode()
+
+
+def _seconds(ex: int | timedelta | None) -> float | None:
+	return ex.total_seconds() if isinstance(ex, timedelta) else ex
+
+
+class FakeRedis:
+	"""
+		In-memory stand-in of redis.asyncio.Redis with the commands used by the bot
+		(strings, hashes, expiry, pipelines with WATCH/MULTI, publish), so the redis users are tested without a server.
+		Keys expire by time.monotonic, wrong types raise WRONGTYPE like redis.
+	"""
+
+	def __init__(self):
+		self.data: dict[bytes, bytes | dict[bytes, bytes]] = {}
+		self.expires: dict[bytes, float] = {}
+		self.versions: dict[bytes, int] = {}  # Changes of every key, for WATCH
+		self.published: list[tuple[str, bytes]] = []
+
+	def pipeline(self, transaction: bool = True) -> 'FakePipeline':
+		return FakePipeline(self)
+
+	async def get(self, name: str) -> bytes | None:
+		value = self._get(name)
+		if isinstance(value, dict):
+			raise ResponseError(WRONGTYPE)
+
+		return value
+
+	async def getex(self, name: str, ex: int | timedelta | None = None) -> bytes | None:
+		value = await self.get(name)
+		if value is not None and ex is not None:
+			await self.expire(name, ex)
+
+		return value
+
+	async def set(self, name: str, value: Any, ex: int | timedelta | None = None) -> bool:
+		self._set(name, _bytes(value), ex)
+		return True
+
+	async def delete(self, *names: str) -> int:
+		deleted = 0
+		for name in names:
+			if self._get(name) is not None:
+				self._set(name, None)
+				deleted += 1
+
+		return deleted
+
+	async def type(self, name: str) -> bytes:
+		value = self._get(name)
+		if value is None:
+			return b'none'
+
+		return b'hash' if isinstance(value, dict) else b'string'
+
+	async def expire(self, name: str, time_: int | timedelta) -> bool:
+		if self._get(name) is None:
+			return False
+
+		self.expires[_bytes(name)] = time.monotonic() + _seconds(time_)
+		return True
+
+	async def ttl(self, name: str) -> int:
+		key = _bytes(name)
+		if self._get(name) is None:
+			return -2
+
+		return -1 if key not in self.expires else round(self.expires[key] - time.monotonic())
+
+	async def hset(self, name: str, key: str = None, value: Any = None, mapping: dict = None) -> int:
+		fields = dict(mapping or {})
+		if key is not None:
+			fields[key] = value
+
+		hash_ = dict(self._hash(name) or {})
+		added = sum(_bytes(field) not in hash_ for field in fields)
+		hash_.update((_bytes(field), _bytes(value)) for field, value in fields.items())
+
+		self._set(name, hash_, keep_ttl=True)
+		return added
+
+	async def hget(self, name: str, key: str) -> bytes | None:
+		return (self._hash(name) or {}).get(_bytes(key))
+
+	async def hgetall(self, name: str) -> dict[bytes, bytes]:
+		return dict(self._hash(name) or {})
+
+	async def hdel(self, name: str, *keys: str) -> int:
+		hash_ = dict(self._hash(name) or {})
+		deleted = sum(hash_.pop(_bytes(key), None) is not None for key in keys)
+
+		if deleted:
+			self._set(name, hash_ or None, keep_ttl=True)
+
+		return deleted
+
+	async def publish(self, channel: str, message: Any) -> int:
+		self.published.append((channel, _bytes(message)))
+		return 0
+
+	async def aclose(self, close_connection_pool: bool | None = None) -> None:
+		pass
+
+	def _get(self, name: str) -> bytes | dict[bytes, bytes] | None:
+		key = _bytes(name)
+		if key in self.expires and self.expires[key] <= time.monotonic():
+			self._set(name, None)
+
+		return self.data.get(key)
+
+	def _hash(self, name: str) -> dict[bytes, bytes] | None:
+		value = self._get(name)
+		if value is not None and not isinstance(value, dict):
+			raise ResponseError(WRONGTYPE)
+
+		return value
+
+	def _set(self, name: str, value: bytes | dict | None, ex: int | timedelta | None = None, *, keep_ttl=False) -> None:
+		key = _bytes(name)
+		self.versions[key] = self.versions.get(key, 0) + 1
+
+		if value is None:
+			self.data.pop(key, None)
+			self.expires.pop(key, None)
+			return
+
+		self.data[key] = value
+		if ex is not None:
+			self.expires[key] = time.monotonic() + _seconds(ex)
+		elif not keep_ttl:
+			self.expires.pop(key, None)
+
+
+class FakePipeline:
+	"""
+		Commands are queued and run by execute() one after another, errors are raised after all of them like EXEC does.
+		After watch() commands run immediately until multi(), execute() fails with WatchError if a watched key changed.
+	"""
+
+	def __init__(self, redis: FakeRedis):
+		self._redis = redis
+		self._commands: list[tuple[str, tuple, dict]] = []
+		self._watched: dict[bytes, int] | None = None
+		self._immediate = False
+
+	async def __aenter__(self) -> 'FakePipeline':
+		return self
+
+	async def __aexit__(self, *exc_info) -> None:
+		self._commands, self._watched, self._immediate = [], None, False
+
+	def __getattr__(self, name: str):
+		command = getattr(self._redis, name)
+
+		def call(*args, **kwargs):
+			if self._immediate:
+				return command(*args, **kwargs)
+
+			self._commands.append((name, args, kwargs))
+			return self
+
+		return call
+
+	async def watch(self, *names: str) -> None:
+		self._watched = {_bytes(name): self._redis.versions.get(_bytes(name), 0) for name in names}
+		self._immediate = True
+
+	def multi(self) -> None:
+		self._immediate = False
+
+	async def execute(self) -> list:
+		commands, self._commands = self._commands, []
+
+		if self._watched is not None:
+			watched, self._watched = self._watched, None
+			if any(self._redis.versions.get(key, 0) != version for key, version in watched.items()):
+				raise WatchError('Watched variable changed.')
+
+		results, errors = [], []
+		for name, args, kwargs in commands:
+			try:
+				results.append(await getattr(self._redis, name)(*args, **kwargs))
+			except ResponseError as e:
+				results.append(e)
+				errors.append(e)
+
+		if errors:
+			raise errors[0]
+
+		return results
@@ -0,0 +1,61 @@
+import io
+import unittest
+from unittest.mock import AsyncMock
+
+from core.file_ref import FileRef
+from core.misc.image_buffers import ImageBuffers
+
+
+class TestImageBuffers(unittest.IsolatedAsyncioTestCase):
+	def test_least_recently_used_are_dropped(self):
+		buffers = ImageBuffers(max_bytes=10)
+
+		buffers.put('a', b'aaaa')
+		buffers.put('b', b'bbbb')
+		buffers.get('a')  # Used: b is the oldest now
+		buffers.put('c', b'cccc')
+
+		self.assertIn('a', buffers)
+		self.assertNotIn('b', buffers)
+		self.assertIn('c', buffers)
+
+	def test_a_photo_larger_than_the_limit_is_kept_alone(self):
+		buffers = ImageBuffers(max_bytes=10)
+
+		buffers.put('a', b'aaaa')
+		buffers.put('big', b'x' * 20)
+
+		self.assertNotIn('a', buffers)
+		self.assertEqual(buffers.get('big'), b'x' * 20)
+
+	def test_put_again_and_pop(self):
+		buffers = ImageBuffers(max_bytes=10)
+
+		buffers.put('a', b'aaaaaa')
+		buffers.put('a', b'aa')
+		buffers.put('b', b'bbbbbb')  # 8 bytes in total: nothing is dropped
+
+		self.assertEqual(buffers.get('a'), b'aa')
+		self.assertEqual(buffers.pop('a'), b'aa')
+		self.assertIsNone(buffers.pop('a'))
+		self.assertIsNone(buffers.get('a'))
+
+		buffers.put('c', b'cccc')
+		self.assertIn('b', buffers)
+
+	async def test_load_from_memory(self):
+		buffers = ImageBuffers()
+		bot = AsyncMock()
+		buffers.put('AQAD1', b'photo')
+
+		self.assertEqual(await buffers.load(bot, FileRef('BQACAgI1', 'AQAD1')), b'photo')
+		bot.download.assert_not_awaited()
+
+	async def test_load_downloads_a_dropped_photo(self):
+		buffers = ImageBuffers()
+		bot = AsyncMock()
+		bot.download.return_value = io.BytesIO(b'photo')
+
+		self.assertEqual(await buffers.load(bot, FileRef('BQACAgI1', 'AQAD1')), b'photo')
+		bot.download.assert_awaited_once_with('BQACAgI1')
+		self.assertEqual(buffers.get('AQAD1'), b'photo')
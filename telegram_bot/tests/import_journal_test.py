@@ -0,0 +1,62 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from scripts.journal import ImportJournal
+
+
+class TestImportJournal(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.TemporaryDirectory()
+		self.folder = Path(self._dir.name)
+
+	def tearDown(self):
+		self._dir.cleanup()
+
+	def test_resume_after_reopen(self):
+		journal = ImportJournal(self.folder).open()
+		journal.record('1.jpg', 'saved')
+		journal.record_many([('2.jpg', 'no face'), ('1.jpg', 'duplicate')])
+		journal.close()
+
+		journal = ImportJournal(self.folder).open()
+		journal.close()
+
+		self.assertEqual(journal.statuses, {'1.jpg': 'duplicate', '2.jpg': 'no face'})
+		self.assertIn('2.jpg', journal)
+		self.assertNotIn('3.jpg', journal)
+
+	def test_torn_last_record_is_dropped(self):
+		journal = ImportJournal(self.folder).open()
+		journal.record('1.jpg', 'saved')
+		journal.close()
+
+		with journal.path.open('a', encoding='utf-8') as f:
+			f.write('{"file": "2.jpg", "sta')
+
+		journal = ImportJournal(self.folder).open()
+		journal.record('3.jpg', 'saved')
+		journal.close()
+
+		journal = ImportJournal(self.folder).open()
+		journal.close()
+
+		self.assertEqual(journal.statuses, {'1.jpg': 'saved', '3.jpg': 'saved'})
+
+	def test_legacy_file_is_imported(self):
+		legacy = {'1.jpg': 'saved', '2.jpg': 'no face'}
+		(self.folder / ImportJournal.LEGACY_FILENAME).write_text(json.dumps(legacy), encoding='utf-8')
+
+		journal = ImportJournal(self.folder).open()
+		journal.close()
+
+		self.assertEqual(journal.statuses, legacy)
+		self.assertTrue(journal.path.exists())
+
+		# The legacy file is read only once
+		(self.folder / ImportJournal.LEGACY_FILENAME).write_text(json.dumps({'3.jpg': 'saved'}), encoding='utf-8')
+		journal = ImportJournal(self.folder).open()
+		journal.close()
+
+		self.assertEqual(journal.statuses, legacy)
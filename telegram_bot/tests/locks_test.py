@@ -0,0 +1,53 @@
+import asyncio
+import gc
+import unittest
+
+from aiogram.fsm.storage.base import StorageKey
+
+from core.misc.locks import KeyedLocks, StateLocks
+
+
+class TestKeyedLocks(unittest.IsolatedAsyncioTestCase):
+	async def test_same_lock_per_key(self):
+		locks = KeyedLocks()
+
+		lock = locks('a')
+		self.assertIs(locks('a'), lock)
+		self.assertIsNot(locks('b'), lock)
+
+	async def test_unused_locks_are_dropped(self):
+		locks = KeyedLocks()
+
+		async with locks('a'):
+			self.assertEqual(len(locks), 1)
+
+		gc.collect()
+		self.assertEqual(len(locks), 0)
+
+	async def test_waiters_of_a_key_are_serialized(self):
+		locks = KeyedLocks()
+		events = []
+
+		async def worker(key: str, name: str):
+			async with locks(key):
+				events.append(f'{name} in')
+				await asyncio.sleep(0)
+				events.append(f'{name} out')
+
+		await asyncio.gather(worker('a', '1'), worker('a', '2'), worker('b', '3'))
+		self.assertEqual([event for event in events if event[0] != '3'], ['1 in', '1 out', '2 in', '2 out'])
+		self.assertLess(events.index('3 in'), events.index('1 out'))  # Other keys don't wait
+
+
+class TestStateLocks(unittest.IsolatedAsyncioTestCase):
+	async def test_lock_per_user(self):
+		locks = StateLocks('state', backend='memory')
+		key = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+		self.assertIs(locks(key), locks(StorageKey(bot_id=1, chat_id=2, user_id=2)))
+		self.assertIsNot(locks(key), locks(StorageKey(bot_id=1, chat_id=3, user_id=3)))
+		self.assertIsNot(locks(key), StateLocks('message', backend='memory')(key))
+
+	def test_unknown_backend(self):
+		with self.assertRaises(ValueError):
+			StateLocks('state', backend='file')
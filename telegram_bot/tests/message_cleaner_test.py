@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError, TelegramRetryAfter
+
+from core.message_ref import MessageCleaner, MessageRef
+
+
+class TestMessageCleaner(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self.bot = AsyncMock()
+		self.cleaner = MessageCleaner(self.bot, retries=3, backoff=1)
+
+		self.sleep = patch('core.message_ref.cleanup.asyncio.sleep', new=AsyncMock()).start()
+		self.addCleanup(patch.stopall)
+
+	async def test_messages_are_batched_per_chat(self):
+		self.cleaner.schedule([MessageRef(1, i) for i in range(150)] + [MessageRef(2, 7)])
+		await self.cleaner.close()
+
+		calls = sorted((call.args[0], call.args[1]) for call in self.bot.delete_messages.await_args_list)
+		self.assertEqual(calls, [(1, list(range(100))), (1, list(range(100, 150))), (2, [7])])
+
+	async def test_network_errors_are_retried_with_backoff(self):
+		self.bot.delete_messages.side_effect = [TelegramNetworkError(None, 'timeout'),
+		                                        TelegramNetworkError(None, 'timeout'), True]
+
+		self.cleaner.schedule([MessageRef(1, 1)])
+		await self.cleaner.close()
+
+		self.assertEqual(self.bot.delete_messages.await_count, 3)
+		self.assertEqual([call.args[0] for call in self.sleep.await_args_list], [1, 2])
+
+	async def test_retry_after_is_respected(self):
+		self.bot.delete_messages.side_effect = [TelegramRetryAfter(None, 'flood', retry_after=5), True]
+
+		self.cleaner.schedule([MessageRef(1, 1)])
+		await self.cleaner.close()
+
+		self.assertEqual(self.bot.delete_messages.await_count, 2)
+		self.assertEqual([call.args[0] for call in self.sleep.await_args_list], [5])
+
+	async def test_gives_up_after_retries(self):
+		self.bot.delete_messages.side_effect = TelegramNetworkError(None, 'timeout')
+
+		self.cleaner.schedule([MessageRef(1, 1)])
+		with self.assertLogs(level='ERROR'):
+			await self.cleaner.close()
+
+		self.assertEqual(self.bot.delete_messages.await_count, 3)
+		self.assertEqual(self.sleep.await_count, 2)
+
+	async def test_bad_request_is_not_retried(self):
+		self.bot.delete_messages.side_effect = TelegramBadRequest(None, 'message to delete not found')
+
+		self.cleaner.schedule([MessageRef(1, 1)])
+		await self.cleaner.close()
+
+		self.assertEqual(self.bot.delete_messages.await_count, 1)
+		self.sleep.assert_not_awaited()
+
+	async def test_close_waits_for_the_worker(self):
+		self.cleaner.schedule([MessageRef(1, 1)])
+		worker = self.cleaner._worker
+
+		await self.cleaner.close()
+
+		self.assertTrue(worker.done())
+		self.assertIsNone(self.cleaner._worker)
+		self.bot.delete_messages.assert_awaited_once_with(1, [1])
+
+		# Scheduling after close starts a new worker
+		self.cleaner.schedule([MessageRef(1, 2)])
+		await self.cleaner.close()
+		self.bot.delete_messages.assert_awaited_with(1, [2])
@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from core.database.pool import InstrumentedPool, PoolMetrics
+
+
+class TestPoolMetrics(unittest.TestCase):
+	def test_waits_are_aggregated(self):
+		metrics = PoolMetrics(slow_wait=1)
+
+		metrics.record(.1)
+		metrics.record(.3)
+		metrics.record(.2, timeout=True)
+
+		stats = metrics.snapshot()
+		self.assertEqual((stats['checkouts'], stats['timeouts']), (2, 1))
+		self.assertAlmostEqual(stats['wait_avg'], .2)
+		self.assertAlmostEqual(stats['wait_max'], .3)
+		self.assertNotIn('in_use', stats)  # No pool yet
+
+	def test_slow_wait_is_logged(self):
+		metrics = PoolMetrics(slow_wait=.5)
+
+		with self.assertLogs(level='WARNING'):
+			metrics.record(.6)
+
+
+class TestInstrumentedPool(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self.metrics = PoolMetrics(slow_wait=10)
+		patch('core.database.pool.pool_metrics', self.metrics).start()
+		self.addCleanup(patch.stopall)
+
+		self.pool = InstrumentedPool(MagicMock, pool_size=1, max_overflow=1, timeout=.05)
+
+	async def test_checkouts_and_pool_status(self):
+		first = await greenlet_spawn(self.pool.connect)
+		second = await greenlet_spawn(self.pool.connect)
+
+		stats = self.metrics.snapshot()
+		self.assertIs(self.metrics.pool, self.pool)
+		self.assertEqual(stats['checkouts'], 2)
+		self.assertEqual((stats['in_use'], stats['idle'], stats['overflow'], stats['size']), (2, 0, 1, 1))
+
+		await greenlet_spawn(first.close)
+		await greenlet_spawn(second.close)
+
+		stats = self.metrics.snapshot()
+		self.assertEqual((stats['in_use'], stats['idle']), (0, 1))
+
+	async def test_timeouts_are_counted(self):
+		connections = [await greenlet_spawn(self.pool.connect) for _ in range(2)]
+
+		with self.assertRaises(exc.TimeoutError):
+			await greenlet_spawn(self.pool.connect)
+
+		stats = self.metrics.snapshot()
+		self.assertEqual((stats['checkouts'], stats['timeouts']), (2, 1))
+		self.assertGreaterEqual(stats['wait_max'], .05)
+
+		for connection in connections:
+			await greenlet_spawn(connection.close)
+
+	async def test_logger_task(self):
+		self.metrics.interval = .01
+
+		await self.metrics.start()
+		connection = await greenlet_spawn(self.pool.connect)
+
+		with self.assertLogs(level='INFO') as logs:
+			await asyncio.sleep(.05)
+
+		self.assertTrue(any('DB pool: checkouts 1' in line for line in logs.output))
+
+		await self.metrics.close()
+		self.assertIsNone(self.metrics._logger)
+		await greenlet_spawn(connection.close)
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from core.misc.roles_cache import Roles, RolesCache
+from core.misc.ttl_cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+	def test_values_expire(self):
+		cache = TTLCache(ttl=10)
+
+		with patch('core.misc.ttl_cache.time.monotonic', return_value=100):
+			cache.set('a', 1)
+			self.assertEqual(cache.get('a'), 1)
+
+		with patch('core.misc.ttl_cache.time.monotonic', return_value=109):
+			self.assertEqual(cache.get('a'), 1)
+
+		with patch('core.misc.ttl_cache.time.monotonic', return_value=111):
+			self.assertIsNone(cache.get('a'))
+			self.assertEqual(cache.get('a', 'default'), 'default')
+
+		self.assertEqual(len(cache), 0)
+
+	def test_oldest_are_dropped_above_maxsize(self):
+		cache = TTLCache(ttl=10, maxsize=3)
+
+		for key in 'abcd':
+			cache.set(key, key)
+		cache.set('b', 'B')  # Set again: the newest now
+		cache.set('e', 'e')
+
+		self.assertEqual(len(cache), 3)
+		self.assertIsNone(cache.get('a'))
+		self.assertIsNone(cache.get('c'))
+		self.assertEqual([cache.get(key) for key in 'bde'], ['B', 'd', 'e'])
+
+	def test_pop_and_clear(self):
+		cache = TTLCache(ttl=10)
+		cache.set('a', 1)
+		cache.set('b', 2)
+
+		cache.pop('a')
+		cache.pop('missing')
+		self.assertIsNone(cache.get('a'))
+
+		cache.clear()
+		self.assertEqual(len(cache), 0)
+
+
+class TestRolesCache(unittest.TestCase):
+	def test_stale_read_is_not_cached(self):
+		cache = RolesCache(broadcast=False)
+
+		generation = cache.generation
+		cache._drop(1)  # Roles changed while they were read from db
+		cache.set(1, Roles(is_admin=True), generation)
+
+		self.assertIsNone(cache.get(1))
+
+		cache.set(1, Roles(is_admin=True), cache.generation)
+		self.assertEqual(cache.get(1), Roles(is_admin=True))
+
+	def test_invalidate_drops_the_user(self):
+		cache = RolesCache(broadcast=False)
+		cache.set(1, Roles(is_moderator=True), cache.generation)
+		cache.set(2, Roles(), cache.generation)
+
+		asyncio.run(cache.invalidate(1))
+
+		self.assertIsNone(cache.get(1))
+		self.assertEqual(cache.get(2), Roles())
+
+	def test_broadcast_invalidation_is_published(self):
+		cache = RolesCache(broadcast=True)
+		cache.set(1, Roles(is_admin=True), cache.generation)
+		redis = AsyncMock()
+
+		with patch('core.misc.roles_cache.get_redis', return_value=redis):
+			asyncio.run(cache.invalidate(1))
+
+		self.assertIsNone(cache.get(1))
+		redis.publish.assert_awaited_once_with(cache.channel, 1)
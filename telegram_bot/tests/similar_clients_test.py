@@ -0,0 +1,84 @@
+import math
+import types
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import Column, Integer, MetaData, Table
+from sqlalchemy.dialects import postgresql
+
+from core.database.methods.client.get import find_similar_clients
+from core.database.models.types import Vector
+
+# Client columns of the pgvector storage (face_vector is declared only when FACE_STORAGE is 'pgvector')
+clients = Table('clients', MetaData(), Column('id', Integer, primary_key=True), Column('face_vector', Vector(4)))
+
+
+class FakeSession:
+	""" Keeps the executed query and returns the given rows """
+
+	def __init__(self, rows: list[tuple[int, float]]):
+		self.rows = rows
+		self.query = None
+
+	async def __aenter__(self) -> 'FakeSession':
+		return self
+
+	async def __aexit__(self, *exc_info) -> None:
+		pass
+
+	async def execute(self, query):
+		self.query = query
+		return types.SimpleNamespace(tuples=lambda: types.SimpleNamespace(all=lambda: self.rows))
+
+
+class TestFindSimilarClients(unittest.IsolatedAsyncioTestCase):
+	async def find(self, rows: list[tuple[int, float]], threshold: float, distance_metric: str):
+		session = FakeSession(rows)
+
+		with patch('core.database.methods.client.get.session_maker', return_value=session), \
+				patch('core.database.methods.client.get.Client', types.SimpleNamespace(id=clients.c.id, face_vector=clients.c.face_vector)):
+			similar = await find_similar_clients([1, 0, 0, 0], threshold, distance_metric, limit=5)
+
+		return similar, session.query
+
+	def assert_query(self, query, operator: str, threshold: float):
+		sql = str(query.compile(dialect=postgresql.dialect()))
+
+		self.assertIn(f'clients.face_vector {operator} CAST(CAST(', sql)
+		self.assertIn('ORDER BY', sql)
+		self.assertAlmostEqual(query.whereclause.right.value, threshold)
+		self.assertEqual(query._limit, 5)
+
+	async def test_cosine(self):
+		similar, query = await self.find([(1, .1), (2, .2)], .3, 'cosine')
+
+		self.assertEqual(similar, [(1, .1), (2, .2)])
+		self.assert_query(query, '<=>', .3)
+
+	async def test_euclidean(self):
+		similar, query = await self.find([(3, 10.)], 20, 'euclidean')
+
+		self.assertEqual(similar, [(3, 10.)])
+		self.assert_query(query, '<->', 20)
+
+	async def test_euclidean_l2_is_searched_by_cosine_distance(self):
+		""" For normalized vectors euclidean_l2 = sqrt(2 * cosine distance) """
+
+		similar, query = await self.find([(1, .18), (2, .5)], 1.04, 'euclidean_l2')
+
+		self.assert_query(query, '<=>', 1.04 ** 2 / 2)
+		self.assertEqual([client_id for client_id, _ in similar], [1, 2])
+		self.assertAlmostEqual(similar[0][1], .6)
+		self.assertAlmostEqual(similar[1][1], 1)
+
+	async def test_distances_agree_with_the_threshold(self):
+		""" A centroid at exactly the l2 threshold is at exactly the converted cosine threshold """
+
+		threshold = 1.04
+		similar, _ = await self.find([(1, threshold ** 2 / 2)], threshold, 'euclidean_l2')
+
+		self.assertTrue(math.isclose(similar[0][1], threshold))
+
+	async def test_unknown_metric(self):
+		with self.assertRaises(ValueError):
+			await self.find([], 1, 'manhattan')
@@ -0,0 +1,78 @@
+import json
+import timeit
+from datetime import datetime
+
+import numpy as np
+from aiogram import types
+
+from core.cancel_token import CancellationToken
+from core.database.models import Image
+from core.json_classes import TGDecoder, TGEncoder, state_codec
+from core.match_result import MatchResult
+
+
+def message(message_id: int, *, photo=False) -> types.Message:
+	chat = types.Chat(id=1285638448, type='private', first_name='Test', username='test_user')
+
+	return types.Message(
+		message_id=message_id,
+		date=datetime.now(),
+		chat=chat,
+		from_user=types.User(id=1285638448, is_bot=False, first_name='Test', username='test_user'),
+		text=None if photo else 'Клиент найден\! 🔎\nВыберите действие:',
+		entities=None if photo else [types.MessageEntity(type='bold', offset=0, length=14)],
+		photo=[
+			types.PhotoSize(file_id=f'AgACAgIAAxkBAAI{message_id}{size}', file_unique_id=f'AQAD{message_id}{size}',
+			                width=size, height=size)
+			for size in (90, 320, 800, 1280)
+		] if photo else None,
+		reply_markup=None if photo else types.InlineKeyboardMarkup(inline_keyboard=[
+			[types.InlineKeyboardButton(text=f'Кнопка {i}', callback_data=f'button_{i}')] for i in range(4)
+		])
+	)
+
+
+def state_data() -> dict:
+	""" Data of a user after a photo is recognized and the client is shown """
+
+	return {
+		'check_face_token': CancellationToken(_completed=True),
+		'add_image_token': CancellationToken(),
+		'last_msg': message(100),
+		'face_gallery_msg': [message(101 + i, photo=True) for i in range(10)],
+		'face_encoding': np.random.rand(512).astype(np.float32),
+		'possible_clients': MatchResult(range(20), np.random.rand(20).tolist(), [f'/media/clients/{i}.jpg' for i in range(20)],
+		                                [f'AgACAgIAAxkBAAI{i}' for i in range(20)]),
+		'client_images': [Image(id=i, path=f'/media/clients/{i}.jpg', visit_id=i) for i in range(10)],
+		'client_id': 6,
+		'visit_id': 12,
+	}
+
+
+def benchmark(number=500):
+	data = state_data()
+
+	codecs = {
+		'json + TGEncoder': (lambda value: json.dumps(value, cls=TGEncoder), lambda value: json.loads(value, cls=TGDecoder)),
+		'state_codec': (state_codec.dumps, state_codec.loads),
+	}
+
+	for name, (dumps, loads) in codecs.items():
+		# Per field, as RedisHashStorage stores it
+		encoded = {field: dumps(value) for field, value in data.items()}
+		size = sum(len(value) for value in encoded.values())
+
+		dumps_time = timeit.timeit(lambda: [dumps(value) for value in data.values()], number=number) / number
+		loads_time = timeit.timeit(lambda: [loads(value) for value in encoded.values()], number=number) / number
+
+		print(f'{name:>18}: {size:>7} bytes, dumps {dumps_time * 1e3:.3f} ms, loads {loads_time * 1e3:.3f} ms')
+
+	# Compatibility: the data written by TGEncoder is read by state_codec
+	legacy = {field: state_codec.loads(json.dumps(value, cls=TGEncoder)) for field, value in data.items()}
+	assert legacy['possible_clients'].clients_id == data['possible_clients'].clients_id
+	assert legacy['face_gallery_msg'][3].photo[-1].file_id == data['face_gallery_msg'][3].photo[-1].file_id
+	assert np.array_equal(legacy['face_encoding'], data['face_encoding'])
+
+
+if __name__ == '__main__':
+	benchmark()
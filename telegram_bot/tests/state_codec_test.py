@@ -0,0 +1,106 @@
+import json
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from aiogram import types
+
+from core.cancel_token import CancellationToken
+from core.database.models import Image
+from core.file_ref import FileRef
+from core.json_classes import TGEncoder, state_codec
+from core.json_classes.codec import TYPE_KEY, VALUE_KEY
+from core.match_result import MatchResult
+from core.message_ref import MessageRef
+
+
+def round_trip(value):
+	return state_codec.loads(state_codec.dumps(value))
+
+
+class TestStateCodec(unittest.TestCase):
+	def test_plain_data(self):
+		value = {'client_id': 6, 'names': ['a', 'b'], 'nested': {'x': None, 'y': 1.5}, 'flag': True}
+		self.assertEqual(round_trip(value), value)
+
+	def test_registered_types(self):
+		now = datetime(2024, 5, 1, 12, 30, 15)
+
+		self.assertEqual(round_trip(Path('/media/clients/1.jpg')), Path('/media/clients/1.jpg'))
+		self.assertEqual(round_trip(now), now)
+		self.assertEqual(round_trip({'dates': [now, now]}), {'dates': [now, now]})
+
+		ref = round_trip(MessageRef(10, 20))
+		self.assertIsInstance(ref, MessageRef)
+		self.assertEqual((ref.chat_id, ref.message_id), (10, 20))
+
+		file = round_trip(FileRef('BQACAgI1', 'AQAD1'))
+		self.assertIsInstance(file, FileRef)
+		self.assertEqual((file.file_id, file.file_unique_id), ('BQACAgI1', 'AQAD1'))
+
+	def test_ndarray(self):
+		for array in (np.random.rand(512).astype(np.float32), np.arange(10, dtype=np.int64)):
+			restored = round_trip(array)
+
+			self.assertEqual(restored.dtype, array.dtype)
+			np.testing.assert_array_equal(restored, array)
+
+		self.assertEqual(round_trip(np.float32(1.5)), 1.5)
+
+	def test_cancellation_token(self):
+		token = CancellationToken(_completed=True)
+
+		restored = round_trip(token)
+
+		self.assertEqual(restored._id, token._id)
+		self.assertEqual((restored._canceled, restored._completed), (token._canceled, token._completed))
+
+	def test_match_result(self):
+		match = MatchResult([1, 2], [.1, .2], ['/media/1.jpg', '/media/2.jpg'], [None, 'AgACAgI'])
+
+		restored = round_trip(match)
+
+		self.assertEqual(restored.clients_id, [1, 2])
+		self.assertEqual(restored.distances, [.1, .2])
+		self.assertEqual(restored.thumbs, match.thumbs)
+		self.assertEqual(restored.file_ids, [None, 'AgACAgI'])
+
+	def test_model(self):
+		image = round_trip(Image(id=3, path='/media/clients/3.jpg', visit_id=7))
+
+		self.assertIsInstance(image, Image)
+		self.assertEqual((image.id, image.path, image.visit_id), (3, '/media/clients/3.jpg', 7))
+
+	def test_telegram_object(self):
+		user = types.User(id=1285638448, is_bot=False, first_name='Test', username='test_user')
+
+		restored = round_trip({'user': user})['user']
+
+		self.assertIsInstance(restored, types.User)
+		self.assertEqual(restored.id, user.id)
+		self.assertEqual(restored.username, 'test_user')
+
+	def test_legacy_tg_encoder_data(self):
+		value = {
+			'face_encoding': np.random.rand(8).astype(np.float32),
+			'possible_clients': MatchResult([1], [.1], ['/media/1.jpg']),
+		}
+
+		restored = state_codec.loads(json.dumps(value, cls=TGEncoder))
+
+		np.testing.assert_array_equal(restored['face_encoding'], value['face_encoding'])
+		self.assertEqual(restored['possible_clients'].clients_id, [1])
+
+	def test_type_key_collisions_are_kept(self):
+		""" User data that only looks like a tagged value is not decoded """
+
+		for value in ({TYPE_KEY: 1}, {TYPE_KEY: 'path'}, {TYPE_KEY: 'unknown', VALUE_KEY: 1},
+		              {TYPE_KEY: 'path', VALUE_KEY: '/a', 'extra': 1}, {TYPE_KEY: ['path'], VALUE_KEY: '/a'}):
+			with self.subTest(value=value):
+				self.assertEqual(round_trip(value), value)
+				self.assertEqual(round_trip([value]), [value])
+
+	def test_unknown_type_is_rejected(self):
+		with self.assertRaises(TypeError):
+			state_codec.dumps(object())
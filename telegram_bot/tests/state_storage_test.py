@@ -0,0 +1,180 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from core.json_classes import state_codec
+from core.misc.storage import RedisHashStorage
+from core.state_machines.context import BufferedFSMContext
+from core.state_machines.utils import _with_lock_state
+from tests.fake_redis import FakeRedis
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+class StorageTestCase(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self.redis = FakeRedis()
+		self.storage = RedisHashStorage(self.redis, json_dumps=state_codec.dumps, json_loads=state_codec.loads)
+		self.data_key = self.storage._data_key(KEY)
+
+	async def fields(self) -> dict[str, object]:
+		""" Data fields as they are stored """
+
+		return {field.decode(): state_codec.loads(value) for field, value in (await self.redis.hgetall(self.data_key)).items()}
+
+
+class TestRedisHashStorage(StorageTestCase):
+	async def test_data_round_trip(self):
+		data = {'client_id': 6, 'date': datetime(2024, 5, 1, 12, 30), 'names': ['a', 'b']}
+
+		await self.storage.set_data(KEY, data)
+
+		self.assertEqual(await self.storage.get_data(KEY), data)
+		self.assertEqual(await self.redis.type(self.data_key), b'hash')
+		self.assertEqual(await self.storage.get_value(KEY, 'client_id'), 6)
+		self.assertEqual(await self.storage.get_value(KEY, 'missing', 'default'), 'default')
+
+	async def test_set_data_replaces_the_data(self):
+		await self.storage.set_data(KEY, {'a': 1, 'b': 2})
+		await self.storage.set_data(KEY, {'c': 3})
+		self.assertEqual(await self.storage.get_data(KEY), {'c': 3})
+
+		await self.storage.set_data(KEY, {})
+		self.assertEqual(await self.redis.type(self.data_key), b'none')
+
+		with self.assertRaises(DataNotDictLikeError):
+			await self.storage.set_data(KEY, [('a', 1)])
+
+	async def test_update_data_writes_only_the_given_fields(self):
+		await self.storage.set_data(KEY, {'a': 1, 'b': 2})
+		versions = await self.redis.hgetall(self.data_key)
+
+		self.assertEqual(await self.storage.update_data(KEY, {'b': 3, 'c': 4}), {'a': 1, 'b': 3, 'c': 4})
+		self.assertEqual((await self.redis.hgetall(self.data_key))[b'a'], versions[b'a'])
+
+	async def test_update_fields_in_one_transaction(self):
+		await self.storage.set_data(KEY, {'a': 1, 'b': 2, 'c': 3})
+
+		await self.storage.update_fields(KEY, {'a': 10}, delete=['b', 'a'], state='Menu:start')
+
+		self.assertEqual(await self.fields(), {'a': 10, 'c': 3})  # A written field isn't deleted
+		self.assertEqual(await self.storage.get_state(KEY), 'Menu:start')
+
+		await self.storage.update_fields(KEY, state=None)
+		self.assertIsNone(await self.storage.get_state(KEY))
+
+	async def test_nothing_to_update_sends_nothing(self):
+		await self.storage.set_data(KEY, {'a': 1})
+		versions = dict(self.redis.versions)
+
+		await self.storage.update_fields(KEY)
+		await self.storage.update_fields(KEY, {}, delete=[])
+
+		self.assertEqual(self.redis.versions, versions)
+
+	async def test_data_ttl(self):
+		self.storage.data_ttl = 60
+
+		await self.storage.update_data(KEY, {'a': 1})
+
+		self.assertEqual(await self.redis.ttl(self.data_key), 60)
+
+	async def test_redis_storage_data_is_converted(self):
+		""" RedisStorage kept the whole data as a json string """
+
+		await self.redis.set(self.data_key, json.dumps({'a': 1, 'b': [1, 2]}))
+
+		self.assertEqual(await self.storage.get_value(KEY, 'a'), 1)
+		self.assertEqual(await self.redis.type(self.data_key), b'hash')
+
+		await self.redis.set(self.data_key, json.dumps({'a': 1}))
+		self.assertEqual(await self.storage.update_data(KEY, {'b': 2}), {'a': 1, 'b': 2})
+
+
+class TestBufferedFSMContext(StorageTestCase):
+	def setUp(self):
+		super().setUp()
+		self.context = BufferedFSMContext(self.storage, KEY, shared_fields=['token'])
+
+	async def test_changes_are_written_by_flush(self):
+		await self.storage.set_data(KEY, {'a': 1})
+
+		self.assertEqual(await self.context.update_data(b=2), {'a': 1, 'b': 2})
+		await self.context.set_state('Menu:start')
+
+		self.assertEqual(await self.context.get_value('b'), 2)
+		self.assertEqual(await self.context.get_state(), 'Menu:start')
+		self.assertEqual(await self.fields(), {'a': 1})
+		self.assertIsNone(await self.storage.get_state(KEY))
+
+		await self.context.flush()
+
+		self.assertEqual(await self.fields(), {'a': 1, 'b': 2})
+		self.assertEqual(await self.storage.get_state(KEY), 'Menu:start')
+
+	async def test_data_is_loaded_once(self):
+		await self.storage.set_data(KEY, {'a': 1})
+		self.assertEqual(await self.context.get_data(), {'a': 1})
+
+		await self.redis.hset(self.data_key, 'a', state_codec.dumps(2))  # Changed by someone else
+		self.assertEqual(await self.context.get_value('a'), 1)
+
+		self.context.forget()
+		self.assertEqual(await self.context.get_value('a'), 2)
+
+	async def test_shared_fields_are_written_through(self):
+		await self.context.update_data(token='t1', b=2)
+
+		self.assertEqual(await self.fields(), {'token': 't1'})
+
+		await self.redis.hset(self.data_key, 'token', state_codec.dumps('t2'))
+		self.assertEqual(await self.context.get_value('token'), 't2')
+
+	async def test_set_data_replaces_right_away(self):
+		await self.storage.set_data(KEY, {'a': 1})
+		await self.context.update_data(b=2)
+
+		await self.context.set_data({'c': 3})
+
+		self.assertEqual(await self.fields(), {'c': 3})
+		self.assertEqual(await self.context.get_data(), {'c': 3})
+
+
+@_with_lock_state
+async def _pop_and_set(state_data: dict, pop: str, **fields) -> object:
+	state_data.update(fields)
+	return state_data.pop(pop, None)
+
+
+class TestWithLockState(StorageTestCase):
+	async def test_only_changed_fields_are_written(self):
+		await self.storage.set_data(KEY, {'a': 1, 'b': 2, 'c': [1, 2]})
+
+		with patch.object(self.redis, 'hset', wraps=self.redis.hset) as hset:
+			result = await _pop_and_set(FSMContext(self.storage, KEY), 'a', b=3, c=[1, 2])
+
+		self.assertEqual(result, 1)
+		self.assertEqual(await self.fields(), {'b': 3, 'c': [1, 2]})
+		self.assertEqual(hset.call_args.kwargs['mapping'].keys(), {'b'})  # c is equal: not rewritten
+
+	async def test_buffered_changes_are_seen(self):
+		context = BufferedFSMContext(self.storage, KEY)
+		await context.update_data(a=1)
+
+		self.assertEqual(await _pop_and_set(context, 'a', b=2), 1)
+
+		self.assertEqual(await self.fields(), {'b': 2})
+		self.assertEqual(await context.get_data(), {'b': 2})  # The loaded data is dropped
+
+	async def test_other_storages_get_the_whole_data(self):
+		storage = MemoryStorage()
+		await storage.set_data(KEY, {'a': 1, 'b': 2})
+
+		self.assertEqual(await _pop_and_set(FSMContext(storage, KEY), 'a', c=3), 1)
+		self.assertEqual(await storage.get_data(KEY), {'b': 2, 'c': 3})
@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from core.misc.username_tracker import UsernameTracker
+
+
+class TestUsernameTracker(unittest.IsolatedAsyncioTestCase):
+	def setUp(self):
+		self.update_usernames = patch('core.misc.username_tracker.update_usernames', new=AsyncMock()).start()
+		self.addCleanup(patch.stopall)
+
+		self.tracker = UsernameTracker(interval=.01)
+
+	async def test_only_changed_usernames_are_written(self):
+		self.tracker.track(1, 'alice')
+		self.tracker.track(2, None)
+		await self.tracker.flush()
+
+		self.tracker.track(1, 'alice')
+		self.tracker.track(2, 'bob')
+		self.tracker.track(2, 'bobby')
+		await self.tracker.flush()
+		await self.tracker.flush()  # Nothing is pending
+
+		self.assertEqual([call.args[0] for call in self.update_usernames.await_args_list],
+		                 [{1: 'alice', 2: None}, {2: 'bobby'}])
+
+	async def test_failed_write_is_retried(self):
+		self.update_usernames.side_effect = [ConnectionError('db is down'), None]
+
+		self.tracker.track(1, 'alice')
+		with self.assertLogs(level='WARNING'):
+			await self.tracker.flush()
+
+		self.tracker.track(1, 'alice2')  # Newer than the failed one
+		self.tracker.track(2, 'bob')
+		await self.tracker.flush()
+
+		self.assertEqual(self.update_usernames.await_args.args[0], {1: 'alice2', 2: 'bob'})
+
+	async def test_flushed_periodically_and_on_close(self):
+		await self.tracker.start()
+
+		self.tracker.track(1, 'alice')
+		await asyncio.sleep(.05)
+		self.update_usernames.assert_awaited_once_with({1: 'alice'})
+
+		self.tracker.interval = 60
+		await asyncio.sleep(.02)  # The flusher is sleeping with the new interval
+		self.tracker.track(2, 'bob')
+		await self.tracker.close()
+
+		self.update_usernames.assert_awaited_with({2: 'bob'})
+		self.assertIsNone(self.tracker._flusher)